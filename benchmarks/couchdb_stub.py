@@ -0,0 +1,241 @@
+"""
+An in-process stand-in for a CouchDB server, so the benchmarks can drive
+the real CouchDB repos without one.
+
+StubSession replaces the couchdb.http.Session of a ConnectionManager and
+answers the requests the repos make from memory: document reads and
+writes, _bulk_docs, _all_docs with keys and the views in DESIGN_DOCS.
+Request and response bodies are JSON encoded and decoded exactly as they
+would be for a real server, so everything but the network is measured;
+latency seconds of sleep per request stand in for that.
+"""
+import io
+import itertools
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import couchdb
+
+# query options couchdb-python sends as plain strings; the rest are JSON
+STRING_OPTIONS = ('startkey_docid', 'endkey_docid', 'rev', 'feed', 'filter', 'view')
+
+
+def by_user(doc):
+    if doc.get('type') == 'bookmark':
+        yield [doc['user_id'], doc['date_created']], {
+            'id': doc['_id'],
+            'name': doc['name'],
+            'url': doc['url'],
+            'date_created': doc['date_created'],
+        }
+
+
+def summary(doc):
+    if doc.get('type'):
+        yield doc['_id'], [doc['type'], doc.get('user_id')]
+
+
+# Python versions of the map functions in links.repos.couchdb.DESIGN_DOCS
+VIEWS = {
+    ('bookmarks', 'by_user'): by_user,
+    ('changes', 'summary'): summary,
+}
+
+
+class _Top:
+    """Sorts after any doc id, to bound a range after all rows of a key"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+TOP = _Top()
+
+
+def collate(value):
+    """A sort key following CouchDB's view collation, objects all equal"""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    if isinstance(value, list):
+        return (4, tuple(collate(item) for item in value))
+    return (5,)
+
+
+class ViewIndex:
+    """The rows one map function emits, kept sorted by key and doc id"""
+
+    def __init__(self, map_fn):
+        self.map_fn = map_fn
+        self.order = []
+        self.rows = {}
+        self.by_doc = {}
+
+    def update(self, doc_id, doc):
+        for sort_key in self.by_doc.pop(doc_id, ()):
+            del self.order[bisect_left(self.order, sort_key)]
+            del self.rows[sort_key]
+        if doc is None:
+            return
+        sort_keys = []
+        for key, value in self.map_fn(doc):
+            sort_key = (collate(key), doc_id)
+            insort(self.order, sort_key)
+            self.rows[sort_key] = {'id': doc_id, 'key': key, 'value': value}
+            sort_keys.append(sort_key)
+        self.by_doc[doc_id] = sort_keys
+
+    def query(self, options):
+        descending = options.get('descending', False)
+        first, last = 'startkey', 'endkey'
+        if descending:
+            first, last = last, first
+
+        lo, hi = 0, len(self.order)
+        if first in options:
+            bound = (collate(options[first]),)
+            docid = options.get(first + '_docid')
+            if docid is not None:
+                bound += (docid,)
+            lo = bisect_left(self.order, bound)
+        if last in options:
+            docid = options.get(last + '_docid')
+            if docid is None:
+                hi = bisect_left(self.order, (collate(options[last]), TOP))
+            else:
+                hi = bisect_right(self.order, (collate(options[last]), docid))
+
+        selected = self.order[lo:hi]
+        if descending:
+            selected.reverse()
+        skip = options.get('skip', 0)
+        selected = selected[skip:]
+        if 'limit' in options:
+            selected = selected[:options['limit']]
+        return {
+            'total_rows': len(self.order),
+            'offset': lo + skip,
+            'rows': [self.rows[sort_key] for sort_key in selected],
+        }
+
+
+class StubSession(couchdb.http.Session):
+    """A Session serving one database from memory, whatever its URL"""
+
+    def __init__(self, latency=0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests = 0
+        self.docs = {}
+        self.views = {name: ViewIndex(map_fn) for name, map_fn in VIEWS.items()}
+        self._revisions = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def request(self, method, url, body=None, headers=None, credentials=None,
+                num_redirects=0):
+        if self.latency:
+            time.sleep(self.latency)
+        if body is not None and not isinstance(body, (bytes, str)):
+            body = couchdb.json.encode(body)
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        if body is not None:
+            body = couchdb.json.decode(body)
+
+        parts = urlsplit(url)
+        # the first segment is the database
+        path = [unquote(segment) for segment in parts.path.split('/')[2:]]
+        options = {}
+        for name, value in parse_qsl(parts.query):
+            options[name] = value if name in STRING_OPTIONS else couchdb.json.decode(value)
+
+        with self._lock:
+            self.requests += 1
+            status, data = self.dispatch(method, path, options, body)
+        if method == 'HEAD':
+            return status, {}, io.BytesIO(b'')
+        return status, {'content-type': 'application/json'}, io.BytesIO(
+            couchdb.json.encode(data).encode('utf-8'))
+
+    def dispatch(self, method, path, options, body):
+        if len(path) == 4 and path[0] == '_design' and path[2] == '_view':
+            index = self.views.get((path[1], path[3]))
+            if index is None:
+                raise couchdb.http.ResourceNotFound(('not_found', 'missing_named_view'))
+            if body is not None:
+                options = dict(options, keys=body['keys'])
+            if 'keys' in options:
+                return 200, self.view_keys(index, options)
+            return 200, index.query(options)
+        if path == ['_all_docs']:
+            return 200, self.all_docs(body['keys'])
+        if path == ['_bulk_docs'] and method == 'POST':
+            return 201, [self.bulk_write(doc) for doc in body['docs']]
+        if path == [] and method == 'POST':
+            doc_id = body.setdefault('_id', uuid.uuid4().hex)
+            return 201, self.write(doc_id, body)
+
+        doc_id = '/'.join(path)
+        if method in ('GET', 'HEAD'):
+            doc = self.docs.get(doc_id)
+            if doc is None:
+                raise couchdb.http.ResourceNotFound(('not_found', 'missing'))
+            return 200, doc
+        if method == 'PUT':
+            return 201, self.write(doc_id, dict(body, _id=doc_id))
+        if method == 'DELETE':
+            if doc_id not in self.docs:
+                raise couchdb.http.ResourceNotFound(('not_found', 'missing'))
+            self.check_revision(doc_id, options.get('rev'))
+            del self.docs[doc_id]
+            for index in self.views.values():
+                index.update(doc_id, None)
+            return 200, {'ok': True, 'id': doc_id}
+        raise couchdb.http.ServerError((405, ('method_not_allowed', method)))
+
+    def check_revision(self, doc_id, rev):
+        current = self.docs.get(doc_id)
+        if (current and current['_rev']) != rev:
+            raise couchdb.http.ResourceConflict(('conflict', 'Document update conflict.'))
+
+    def write(self, doc_id, doc):
+        self.check_revision(doc_id, doc.get('_rev'))
+        generation = int(doc['_rev'].split('-')[0]) + 1 if doc.get('_rev') else 1
+        doc['_rev'] = '{}-{:x}'.format(generation, next(self._revisions))
+        self.docs[doc_id] = doc
+        for index in self.views.values():
+            index.update(doc_id, doc)
+        return {'ok': True, 'id': doc_id, 'rev': doc['_rev']}
+
+    def bulk_write(self, doc):
+        try:
+            return self.write(doc['_id'], doc)
+        except couchdb.http.ResourceConflict:
+            return {'id': doc['_id'], 'error': 'conflict', 'reason': 'Document update conflict.'}
+
+    def all_docs(self, keys):
+        rows = []
+        for key in keys:
+            doc = self.docs.get(key)
+            if doc is None:
+                rows.append({'key': key, 'error': 'not_found'})
+            else:
+                rows.append({'id': key, 'key': key, 'value': {'rev': doc['_rev']}})
+        return {'total_rows': len(self.docs), 'offset': 0, 'rows': rows}
+
+    def view_keys(self, index, options):
+        rows = []
+        for key in options['keys']:
+            rows.extend(index.query({'startkey': key, 'endkey': key})['rows'])
+        return {'total_rows': len(index.order), 'offset': 0, 'rows': rows}
@@ -0,0 +1,107 @@
+"""
+Memory footprint of bookmark entities and the models a listing builds from
+them, before and after moving them to __slots__.
+
+    python -m benchmarks.entity_memory [--count 1000000]
+
+"Before" uses dict-backed copies of the classes as they were; "after" uses
+the classes in links. Each case builds count bookmarks, the response model
+and the view model of each, and reports the bytes traced per bookmark.
+"""
+import argparse
+import datetime
+import gc
+import tracemalloc
+
+from links.entities import Bookmark
+from links.usecases.bookmark_details import (
+    BookmarkDetailsReponseModel,
+    BookmarkDetailsViewModel,
+)
+
+
+class DictBookmark:
+
+    def __init__(self, id_, user_id, name, url, date_created=None, revision=None):
+        self.id = id_
+        self.user_id = user_id
+        self.name = name
+        self.url = url
+        self.date_created = date_created
+        self.revision = revision
+
+
+class DictResponseModel:
+
+    def __init__(self):
+        self.bookmark_id = None
+        self.name = None
+        self.url = None
+        self.host = None
+        self.date_created = None
+
+
+class DictViewModel:
+
+    def __init__(self):
+        self.bookmark_id = None
+        self.name = None
+        self.url = None
+        self.host = None
+        self.date_created = None
+        self.date_created_iso = None
+
+
+def build(count, bookmark_cls, response_cls, view_cls):
+    # field values are shared so only the objects themselves are measured
+    name, url, host = 'name', 'http://example.com', 'example.com'
+    date_created = datetime.datetime(2017, 1, 1)
+    objects = []
+    for i in range(count):
+        bookmark = bookmark_cls(i, 'user', name, url, date_created=date_created)
+        response = response_cls()
+        response.bookmark_id = i
+        response.name = name
+        response.url = url
+        response.host = host
+        response.date_created = date_created
+        view = view_cls()
+        view.bookmark_id = i
+        view.name = name
+        view.url = url
+        view.host = host
+        view.date_created = 'Jan 1, 2017'
+        view.date_created_iso = '2017-01-01T00:00:00'
+        objects.append((bookmark, response, view))
+    return objects
+
+
+def measure(count, *classes):
+    gc.collect()
+    tracemalloc.start()
+    objects = build(count, *classes)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    before = measure(args.count, DictBookmark, DictResponseModel, DictViewModel)
+    after = measure(
+        args.count, Bookmark, BookmarkDetailsReponseModel, BookmarkDetailsViewModel)
+
+    print("{:,} bookmarks, each with a response and view model".format(args.count))
+    for label, size in (('dict-backed', before), ('__slots__', after)):
+        print("{:<12} {:>8.1f} MiB  {:>6.0f} bytes/bookmark".format(
+            label, size / 2 ** 20, size / args.count))
+    print("saved        {:>8.1f} MiB  ({:.0%})".format(
+        (before - after) / 2 ** 20, 1 - after / before))
+
+
+if __name__ == '__main__':
+    main()
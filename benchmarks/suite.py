@@ -0,0 +1,281 @@
+"""
+Throughput and latency benchmarks of the use cases.
+
+Each scenario drives one use case, with its real presenter, against freshly
+seeded repos. Two backends are available:
+
+inmemory
+    the in-memory repos
+couchdb-stub
+    the CouchDB repos, talking to the in-process server in
+    benchmarks.couchdb_stub, which waits a fixed delay per request to stand
+    in for a local CouchDB server
+
+Results are plain dicts, so they can be written as JSON and compared across
+commits. Run them with `python -m links.tools bench`.
+"""
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.couchdb_stub import StubSession
+from links import security
+from links.context import context
+from links.entities import Bookmark, User
+from links.repos.couchdb import ConnectionManager, CouchDBBookmarkRepo, CouchDBUserRepo
+from links.repos.inmemory import MemoryBookmarkRepo, MemoryUserRepo
+from links.settings import Settings
+from links.usecases import authenticate_user, bookmark_details, create_bookmark, create_user
+from links.usecases import edit_bookmark, list_bookmarks
+
+BACKENDS = ('inmemory', 'couchdb-stub')
+PASSWORD = 'password'
+# bookmarks written per save_many call while seeding
+SEED_CHUNK_SIZE = 1000
+
+
+class Dataset:
+    """
+    size bookmarks spread evenly over users of per_user bookmarks each.
+    Bookmark n is 'bm<n>' and belongs to 'user<n % users>', so scenarios can
+    pick existing bookmarks and owners without keeping a list of them.
+    """
+
+    def __init__(self, size, per_user=1000, seed=0):
+        self.size = size
+        self.users = max(1, size // per_user)
+        self.random = random.Random(seed)
+
+    def user_id(self, n):
+        return 'user{}'.format(n % self.users)
+
+    def any_bookmark(self):
+        n = self.random.randrange(self.size)
+        return 'bm{}'.format(n), self.user_id(n)
+
+    def any_user(self):
+        return 'user{}'.format(self.random.randrange(self.users))
+
+    def load(self, user_repo, bookmark_repo):
+        password_hash = security.create_password_hash(PASSWORD)
+        for n in range(self.users):
+            user = User('user{}'.format(n))
+            user.password_hash = password_hash
+            user_repo.save(user)
+
+        start = datetime(2017, 1, 1)
+        for first in range(0, self.size, SEED_CHUNK_SIZE):
+            chunk = [
+                Bookmark(
+                    'bm{}'.format(n), self.user_id(n), 'Bookmark {}'.format(n),
+                    'http://example{}.com/page/{}'.format(n % 100, n),
+                    date_created=start + timedelta(seconds=n))
+                for n in range(first, min(first + SEED_CHUNK_SIZE, self.size))
+            ]
+            failed = [r.bookmark_id for r in bookmark_repo.save_many(chunk) if not r.ok]
+            if failed:
+                raise RuntimeError("Seeding failed for {}".format(', '.join(failed)))
+
+
+def install_repos(backend, dataset, latency):
+    """Seed the backend's repos and install them; return the stub session, if any"""
+    session = None
+    if backend == 'inmemory':
+        user_repo = MemoryUserRepo()
+        bookmark_repo = MemoryBookmarkRepo()
+    elif backend == 'couchdb-stub':
+        session = StubSession()
+        connections = ConnectionManager(session=session)
+        user_repo = CouchDBUserRepo(connections)
+        bookmark_repo = CouchDBBookmarkRepo(connections)
+    else:
+        raise ValueError("Unknown backend '{}'".format(backend))
+
+    dataset.load(user_repo, bookmark_repo)
+    if session is not None:
+        # seed without the delay
+        session.latency = latency
+        session.requests = 0
+
+    context.user_repo = user_repo
+    context.bookmark_repo = bookmark_repo
+    return session
+
+
+def create_bookmark_op(dataset):
+    def op(i):
+        usecase = create_bookmark.CreateBookmarkUseCase()
+        usecase.user_id = dataset.any_user()
+        usecase.name = 'New bookmark {}'.format(i)
+        usecase.url = 'http://example.com/new/{}'.format(i)
+        usecase.execute(create_bookmark.CreateBookmarkPresenter())
+    return op
+
+
+def edit_bookmark_op(dataset):
+    def op(i):
+        usecase = edit_bookmark.EditBookmarkUseCase()
+        usecase.bookmark_id, usecase.user_id = dataset.any_bookmark()
+        usecase.name = 'Edited {}'.format(i)
+        usecase.url = 'http://example.com/edited/{}'.format(i)
+        usecase.execute(edit_bookmark.EditBookmarkPresenter())
+    return op
+
+
+def list_bookmarks_op(dataset):
+    def op(i):
+        list_bookmarks.ListBookmarksUseCase().list_bookmarks(
+            dataset.any_user(), list_bookmarks.ListBookmarksPresenter(),
+            limit=Settings.BOOKMARK_PAGE_SIZE)
+    return op
+
+
+def bookmark_details_op(dataset):
+    def op(i):
+        usecase = bookmark_details.BookmarkDetailsUseCase()
+        usecase.bookmark_id, usecase.user_id = dataset.any_bookmark()
+        usecase.execute(bookmark_details.BookmarkDetailsPresenter())
+    return op
+
+
+def create_user_op(dataset):
+    def op(i):
+        usecase = create_user.CreateUserUseCase()
+        usecase.execute(
+            {'username': 'new{}'.format(i), 'password': PASSWORD},
+            create_user.CreateUserPresenter())
+    return op
+
+
+def authenticate_user_op(dataset):
+    def op(i):
+        usecase = authenticate_user.AuthenticateUserUseCase()
+        usecase.user_id = dataset.any_user()
+        usecase.password = PASSWORD
+        usecase.execute(authenticate_user.AuthenticateUserPresenter())
+    return op
+
+
+SCENARIOS = {
+    'create_bookmark': create_bookmark_op,
+    'edit_bookmark': edit_bookmark_op,
+    'list_bookmarks': list_bookmarks_op,
+    'bookmark_details': bookmark_details_op,
+    'create_user': create_user_op,
+    'authenticate_user': authenticate_user_op,
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, int(round(fraction * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def peak_rss_kib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+
+def time_ops(op, ops, warmup=0):
+    for i in range(warmup):
+        op(-1 - i)
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(ops):
+        t0 = time.perf_counter()
+        op(i)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'ops': ops,
+        'seconds': elapsed,
+        'ops_per_sec': ops / elapsed if elapsed else None,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_scenario(name, backend, size, ops=1000, warmup=10, latency=0.001):
+    """Seed fresh repos with size bookmarks and time ops runs of a scenario"""
+    dataset = Dataset(size)
+    seeding = time.perf_counter()
+    session = install_repos(backend, dataset, latency)
+    seeding = time.perf_counter() - seeding
+
+    result = {
+        'scenario': name,
+        'backend': backend,
+        'size': size,
+        'seed_seconds': seeding,
+    }
+    result.update(time_ops(SCENARIOS[name](dataset), ops, warmup=warmup))
+    if session is not None:
+        result['requests_per_op'] = session.requests / (ops + warmup)
+    # peak RSS is per process, so it includes earlier runs' high-water mark
+    result['peak_rss_kib'] = peak_rss_kib()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scenarios=None, backends=('inmemory',), sizes=(1000,), ops=1000, warmup=10,
+        latency=0.001, fast_hash=False):
+    """Run every combination of scenario, backend and size; return a report"""
+    if scenarios is None:
+        scenarios = list(SCENARIOS)
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    unknown += [backend for backend in backends if backend not in BACKENDS]
+    if unknown:
+        raise ValueError("Unknown scenarios or backends: {}".format(', '.join(unknown)))
+
+    saved = (context.user_repo, context.bookmark_repo, context.read_executor)
+    saved_hashing = (security.CONTEXT['PASSWORD_CTX'], security.CONTEXT['ROUNDS'])
+    if fast_hash:
+        security.lower_rounds()
+    password_rounds = security.CONTEXT['ROUNDS']
+    context.read_executor = None
+    results = []
+    try:
+        for size in sizes:
+            for backend in backends:
+                for name in scenarios:
+                    results.append(run_scenario(
+                        name, backend, size, ops=ops, warmup=warmup, latency=latency))
+    finally:
+        context.user_repo, context.bookmark_repo, context.read_executor = saved
+        security.CONTEXT['PASSWORD_CTX'], security.CONTEXT['ROUNDS'] = saved_hashing
+
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': datetime.utcnow().isoformat(),
+        'parameters': {
+            'ops': ops,
+            'warmup': warmup,
+            'latency_ms': latency * 1000,
+            'password_rounds': password_rounds,
+        },
+        'results': results,
+    }
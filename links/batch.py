@@ -0,0 +1,103 @@
+"""
+A columnar representation of a list of bookmarks.
+
+Listing a heavy user's bookmarks one object per bookmark per layer is
+allocation-bound. A BookmarkBatch instead keeps parallel columns of ids,
+names, urls and creation dates, the dates as the ISO 8601 strings the app
+stores. No datetime is built per row: iso_dates() returns the stored
+strings, display dates are formatted once per distinct day, read off the
+date part of each string, so aware dates are shown in the offset they were
+stored with, and hosts are cut out of the urls without urlparse.
+"""
+import re
+from datetime import date, datetime
+
+from links.entities import Bookmark
+from links.formatting import DEFAULT_DATE_FORMAT, hosts_from_urls, parse_date
+
+# the shape datetime.isoformat() writes; anything else is normalised on append
+ISO_DATETIME = re.compile(
+    r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d{6})?(?:[+-]\d\d:\d\d(?::\d\d(?:\.\d{6})?)?)?\Z',
+    re.ASCII)
+
+
+def to_iso(value):
+    """
+    A datetime or stored date string as an ISO 8601 string. Strings already
+    in isoformat's shape are returned as they are. Raises ValueError.
+    """
+    if isinstance(value, str):
+        if ISO_DATETIME.match(value):
+            return value
+        value = parse_date(value)
+    if not isinstance(value, datetime):
+        raise ValueError("Invalid date: {!r}".format(value))
+    return value.isoformat()
+
+
+class BookmarkBatch:
+    """
+    A user's bookmarks as parallel columns, plus the cursor of the batch
+    after it (None if last), like links.paging.Page.
+    """
+
+    __slots__ = ('user_id', 'ids', 'names', 'urls', 'dates', 'next_cursor')
+
+    def __init__(self, user_id, next_cursor=None):
+        self.user_id = user_id
+        self.ids = []
+        self.names = []
+        self.urls = []
+        self.dates = []
+        self.next_cursor = next_cursor
+
+    @classmethod
+    def from_entities(cls, user_id, bookmarks, next_cursor=None):
+        batch = cls(user_id, next_cursor=getattr(bookmarks, 'next_cursor', next_cursor))
+        for bookmark in bookmarks:
+            batch.append(bookmark.id, bookmark.name, bookmark.url, bookmark.raw_date_created)
+        return batch
+
+    def __repr__(self):
+        return 'BookmarkBatch({!r}, {} bookmarks)'.format(self.user_id, len(self))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        """Yield Bookmark entities, for callers that need the row form"""
+        for id_, name, url, date_created in zip(self.ids, self.names, self.urls, self.dates):
+            yield Bookmark(id_, self.user_id, name, url, date_created=date_created)
+
+    def copy(self):
+        """A batch with copies of the columns, safe to hand out or keep"""
+        batch = BookmarkBatch(self.user_id, next_cursor=self.next_cursor)
+        batch.ids = list(self.ids)
+        batch.names = list(self.names)
+        batch.urls = list(self.urls)
+        batch.dates = list(self.dates)
+        return batch
+
+    def append(self, bookmark_id, name, url, date_created):
+        self.ids.append(bookmark_id)
+        self.names.append(name)
+        self.urls.append(url)
+        self.dates.append(to_iso(date_created))
+
+    def iso_dates(self):
+        return list(self.dates)
+
+    def display_dates(self, date_format=DEFAULT_DATE_FORMAT):
+        """The dates as shown where they were stored, in their own offset"""
+        formatted = {}
+        dates = []
+        for iso in self.dates:
+            day = iso[:10]
+            text = formatted.get(day)
+            if text is None:
+                text = formatted[day] = date.fromisoformat(day).strftime(date_format)
+            dates.append(text)
+        return dates
+
+    def hosts(self):
+        return hosts_from_urls(self.urls)
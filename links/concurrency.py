@@ -0,0 +1,49 @@
+"""
+Independent repository reads issued side by side.
+
+A use case that needs, say, a user and a bookmark before it can do any
+work pays for two round-trips if it fetches them one after the other.
+gather() overlaps them on the context's read executor, so the wait is
+roughly that of the slowest read. Without an executor (the default in
+tests and for the in-memory repos) the calls simply run in order.
+"""
+import contextvars
+
+from links.context import context
+
+
+def gather(*calls, return_exceptions=False):
+    """
+    Call each zero-argument callable and return their results in order.
+    The first call runs on the calling thread and the rest on the read
+    executor. If any call raises, the first exception in argument order is
+    re-raised once every call has finished, or with return_exceptions it
+    takes the call's place in the results, as with asyncio.gather.
+    """
+    executor = context.read_executor
+    if executor is None or len(calls) < 2:
+        if return_exceptions:
+            return [_outcome(call) for call in calls]
+        return [call() for call in calls]
+
+    # run each call in a copy of the caller's context, so per-request state
+    # such as the instrumentation trace follows it onto the worker
+    futures = [
+        executor.submit(contextvars.copy_context().run, call) for call in calls[1:]
+    ]
+    try:
+        first = _outcome(calls[0]) if return_exceptions else calls[0]()
+    finally:
+        # don't leave reads running behind the caller's back
+        for future in futures:
+            future.exception()
+    if return_exceptions:
+        return [first] + [future.exception() or future.result() for future in futures]
+    return [first] + [future.result() for future in futures]
+
+
+def _outcome(call):
+    try:
+        return call()
+    except Exception as ex:
+        return ex
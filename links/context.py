@@ -1,10 +1,17 @@
 """
 App-initializing code is responsible for settings context attributes.
 """
+from concurrent.futures import ThreadPoolExecutor
 
+from links import instrumentation
+from links import security
+from links.repos import cache
 from links.repos import couchdb
+from links.repos import couchdb_async
+from links.repos import couchdb_changes
+from links.repos import couchdb_tracing
 from links.repos import inmemory
-from links.settings import Settings
+from links.settings import CouchDBSettings, Settings
 from links.logger import get_logger
 
 LOGGER = get_logger(__name__)
@@ -15,6 +22,15 @@ class AppContext:
     def __init__(self):
         self.user_repo = None
         self.bookmark_repo = None
+        # used by the use cases' execute_async variants
+        self.async_user_repo = None
+        self.async_bookmark_repo = None
+        # overlaps independent sync repo reads, see links.concurrency
+        self.read_executor = None
+        # keeps the caches coherent with writes from other processes
+        self.changes_follower = None
+        # receives request timings, see links.instrumentation
+        self.metrics_sink = None
 
 
 context = AppContext()
@@ -24,6 +40,12 @@ def init_context(settings):
     if settings.DATABASE_PLUGIN == 'couchdb':
         context.user_repo = couchdb.CouchDBUserRepo()
         context.bookmark_repo = couchdb.CouchDBBookmarkRepo()
+        context.async_user_repo = couchdb_async.AsyncCouchDBUserRepo()
+        context.async_bookmark_repo = couchdb_async.AsyncCouchDBBookmarkRepo()
+        if CouchDBSettings.TRACE_REQUESTS:
+            context.user_repo = couchdb_tracing.TracedRepo(context.user_repo, 'user_repo')
+            context.bookmark_repo = couchdb_tracing.TracedRepo(
+                context.bookmark_repo, 'bookmark_repo')
     elif settings.DATABASE_PLUGIN == 'inmemory':
         context.user_repo = inmemory.MemoryUserRepo()
         context.bookmark_repo = inmemory.MemoryBookmarkRepo()
@@ -33,4 +55,86 @@ def init_context(settings):
             .format(settings.DATABASE_PLUGIN)
         )
 
-    LOGGER.info("*** Initialized database plugin '%s' *** ", settings.DATABASE_PLUGIN)
\ No newline at end of file
+    LOGGER.info("*** Initialized database plugin '%s' *** ", settings.DATABASE_PLUGIN)
+
+    context.metrics_sink = instrumentation.make_sink(settings)
+    if context.metrics_sink is not None:
+        # count the backend's calls, beneath any cache
+        context.user_repo = instrumentation.instrument_repo(context.user_repo, 'user_repo')
+        context.bookmark_repo = instrumentation.instrument_repo(
+            context.bookmark_repo, 'bookmark_repo')
+        if settings.DATABASE_PLUGIN == 'couchdb':
+            context.async_user_repo = instrumentation.instrument_repo(
+                context.async_user_repo, 'async_user_repo')
+            context.async_bookmark_repo = instrumentation.instrument_repo(
+                context.async_bookmark_repo, 'async_bookmark_repo')
+        LOGGER.info("*** Recording request timings to %s ***", settings.INSTRUMENTATION)
+
+    if settings.USER_CACHE_SIZE > 0:
+        context.user_repo = cache.CachingUserRepo(
+            context.user_repo,
+            maxsize=settings.USER_CACHE_SIZE,
+            ttl=settings.USER_CACHE_TTL,
+            negative_ttl=settings.USER_CACHE_NEGATIVE_TTL,
+        )
+        LOGGER.info("*** Caching up to %d users ***", settings.USER_CACHE_SIZE)
+
+    if settings.BOOKMARK_CACHE_SIZE > 0:
+        context.bookmark_repo = cache.CachingBookmarkRepo(
+            context.bookmark_repo,
+            maxsize=settings.BOOKMARK_CACHE_SIZE,
+            page_maxsize=settings.BOOKMARK_PAGE_CACHE_SIZE,
+            ttl=settings.BOOKMARK_CACHE_TTL,
+            max_bytes=settings.BOOKMARK_CACHE_MAX_BYTES or None,
+        )
+        LOGGER.info("*** Caching up to %d bookmarks ***", settings.BOOKMARK_CACHE_SIZE)
+
+    if settings.DATABASE_PLUGIN == 'couchdb' and CouchDBSettings.FOLLOW_CHANGES:
+        _follow_changes()
+
+    if settings.DATABASE_PLUGIN == 'inmemory':
+        # share storage (and any cache) with the sync repos
+        context.async_user_repo = inmemory.AsyncMemoryUserRepo(context.user_repo)
+        context.async_bookmark_repo = inmemory.AsyncMemoryBookmarkRepo(context.bookmark_repo)
+
+    if settings.REPO_READ_WORKERS > 0:
+        context.read_executor = ThreadPoolExecutor(
+            max_workers=settings.REPO_READ_WORKERS,
+            thread_name_prefix='links-read')
+
+    if settings.PASSWORD_HASH_WORKERS > 0:
+        security.configure_hashing_pool(
+            workers=settings.PASSWORD_HASH_WORKERS,
+            max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+            timeout=settings.PASSWORD_HASH_TIMEOUT,
+        )
+        LOGGER.info(
+            "*** Hashing passwords in %d worker processes ***",
+            settings.PASSWORD_HASH_WORKERS)
+
+
+def _follow_changes():
+    """Subscribe whichever repo caches are enabled to the _changes feed"""
+    caches = [
+        repo for repo in (context.user_repo, context.bookmark_repo)
+        if isinstance(repo, (cache.CachingUserRepo, cache.CachingBookmarkRepo))
+    ]
+    if not caches:
+        return
+
+    store = None
+    if CouchDBSettings.CHANGES_SINCE_FILE:
+        store = couchdb_changes.FileSequenceStore(CouchDBSettings.CHANGES_SINCE_FILE)
+
+    # both CouchDB repos use the same database
+    # long-polls must return well inside the connection's read timeout
+    follower = couchdb_changes.ChangesFollower(
+        caches[0].repo.db,
+        store=store,
+        poll_timeout=CouchDBSettings.REQUEST_TIMEOUT / 2,
+    )
+    for repo in caches:
+        follower.subscribe(repo.on_change)
+    follower.start()
+    context.changes_follower = follower
+    LOGGER.info("*** Following CouchDB changes for %d caches ***", len(caches))
@@ -1,6 +1,8 @@
 import abc
 from datetime import datetime
 
+from links.formatting import iso_date, parse_date
+
 
 class Entity(metaclass=abc.ABCMeta):
 
@@ -17,6 +19,10 @@ class Entity(metaclass=abc.ABCMeta):
 
 class BookmarkEntity(metaclass=abc.ABCMeta):
 
+    # Entities are created by the thousand for listings, so they use
+    # __slots__ rather than a per-instance __dict__.
+    __slots__ = ()
+
     @abc.abstractmethod
     def belongs_to(self):
         pass
@@ -28,7 +34,9 @@ class BookmarkEntity(metaclass=abc.ABCMeta):
 
 class Bookmark(BookmarkEntity):
 
-    def __init__(self, id_, user_id, name, url, date_created=None):
+    __slots__ = ('id', 'user_id', 'name', 'url', '_date_created', 'revision')
+
+    def __init__(self, id_, user_id, name, url, date_created=None, revision=None):
         self.id = id_
         self.user_id = user_id
         self.name = name
@@ -38,13 +46,35 @@ class Bookmark(BookmarkEntity):
             date_created = datetime.now()
 
         self.date_created = date_created
+        # opaque storage version token, set by repos that track revisions
+        self.revision = revision
+
+    @property
+    def date_created(self):
+        """The creation datetime, parsed from the stored value on first use"""
+        if isinstance(self._date_created, str):
+            self._date_created = parse_date(self._date_created)
+        return self._date_created
+
+    @date_created.setter
+    def date_created(self, value):
+        """Accepts a datetime or a stored ISO 8601 string"""
+        self._date_created = value
+
+    @property
+    def date_created_iso(self):
+        """The creation date as ISO 8601, without parsing a stored string"""
+        return iso_date(self._date_created)
+
+    @property
+    def raw_date_created(self):
+        """The creation date as given: a datetime or a stored ISO string"""
+        return self._date_created
 
     def __repr__(self):
-        output = self.__dict__.copy()
-        output['date_created'] = repr(self.date_created)
         return (
-            "Bookmark('{id}', '{user_id}', '{name}', '{url}', date_created={date_created})"
-            .format(**output)
+            "Bookmark('{}', '{}', '{}', '{}', date_created={!r})"
+            .format(self.id, self.user_id, self.name, self.url, self.date_created)
         )
 
     def belongs_to(self, user_id):
@@ -63,12 +93,20 @@ class Bookmark(BookmarkEntity):
 class NullBookmark(BookmarkEntity):
     """Return a null entity when nothing was found"""
 
+    __slots__ = (
+        'id', 'user_id', 'date_created', 'date_created_iso', 'raw_date_created',
+        'name', 'url', 'revision',
+    )
+
     def __init__(self):
         self.id = None
         self.user_id = None
         self.date_created = None
+        self.date_created_iso = None
+        self.raw_date_created = None
         self.name = ''
         self.url = ''
+        self.revision = None
 
     def __repr__(self):
         return "NullBookmark()"
@@ -82,6 +120,8 @@ class NullBookmark(BookmarkEntity):
 
 class User:
 
+    __slots__ = ('id', 'password_hash')
+
     def __init__(self, id_):
         self.id = id_
         self.password_hash = None
@@ -93,6 +133,8 @@ class User:
 class NullUser(User):
     """Representation of a 'user not found'"""
 
+    __slots__ = ()
+
     def __init__(self):
         # overloaded init
         super().__init__(None)
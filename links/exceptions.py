@@ -28,4 +28,8 @@ class ValidationError(LinksError):
 
 
 class InvalidOperationError(LinksError):
-    pass
\ No newline at end of file
+    pass
+
+
+class HashingPoolBusy(LinksError):
+    pass
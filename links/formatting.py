@@ -1,15 +1,53 @@
+import re
 from datetime import datetime
 from urllib.parse import urlparse
 
+import dateutil.parser
+
 DEFAULT_DATE_FORMAT = '%b %-d, %Y'
 
+# scheme://netloc for the urls urlparse splits the obvious way; others
+# (whitespace, brackets, no scheme) go through urlparse itself
+SIMPLE_URL = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*://([^/?#\s\[\]]*)(?:[/?#]|\Z)', re.ASCII)
+
+
+def parse_date(datestr):
+    """
+    Parse a stored date. Everything this app writes is ISO 8601 as produced
+    by datetime.isoformat, which fromisoformat reads directly; dateutil is
+    only needed for dates written in some other format. Return None if the
+    value can't be parsed.
+    """
+    if not isinstance(datestr, str):
+        return None
+    try:
+        return datetime.fromisoformat(datestr)
+    except ValueError:
+        pass
+    try:
+        return dateutil.parser.parse(datestr)
+    except (ValueError, OverflowError):
+        return None
+
 
 def iso_date(dt):
+    """
+    Format a datetime as ISO 8601. Stored ISO strings are passed through,
+    dates stored in any other format are parsed and reformatted.
+    """
+    if isinstance(dt, str):
+        try:
+            datetime.fromisoformat(dt)
+            return dt
+        except ValueError:
+            dt = parse_date(dt)
     assert isinstance(dt, datetime)
     return dt.isoformat()
 
 
 def display_date(dt):
+    if isinstance(dt, str):
+        dt = parse_date(dt)
     assert isinstance(dt, datetime)
     return dt.strftime(DEFAULT_DATE_FORMAT)
 
@@ -20,3 +58,12 @@ def host_from_url(url):
     except AssertionError:
         host = ''
     return host
+
+
+def hosts_from_urls(urls):
+    """host_from_url for a column of urls, matching urlparse only as needed"""
+    hosts = []
+    for url in urls:
+        match = SIMPLE_URL.match(url) if isinstance(url, str) else None
+        hosts.append(match.group(1) if match else host_from_url(url))
+    return hosts
@@ -0,0 +1,439 @@
+"""
+Per-request timing of the controller -> use case -> presenter -> view chain.
+
+instrument(controller) wraps a controller's use case, presenter and view
+so each request records, per stage, the wall and CPU time spent in that
+stage alone (nested stages are subtracted), and instrument_repo() wraps a
+repo so the calls made on behalf of the request are counted and timed.
+The finished Trace is handed to a MetricsSink.
+
+Nothing is wrapped unless a sink is configured (Settings.INSTRUMENTATION),
+so with instrumentation off the objects are the originals and cost nothing.
+
+Caveats: a stage's time includes the repo calls it makes, which are also
+reported on their own; CPU time is that of the calling thread, so for an
+awaited stage it includes other tasks run by the event loop meanwhile.
+
+A controller returning a generator is traced until the generator is used
+up or closed; the time spent producing its items is the 'stream' stage.
+"""
+import contextvars
+import inspect
+import logging
+import socket
+import threading
+from abc import ABCMeta, abstractmethod
+from bisect import bisect_left
+from time import perf_counter, thread_time
+
+from links.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+# the Trace of the request being handled, if it is instrumented
+_current_trace = contextvars.ContextVar('links_trace', default=None)
+
+
+class Trace:
+    """Stage timings and repo calls of one request, times in seconds"""
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        # stage -> [wall, cpu], excluding nested stages
+        self.stages = {}
+        # repo method -> [calls, wall]
+        self.repo_calls = {}
+        # [requests, wall] of the HTTP requests made to the database
+        self.db_requests = [0, 0.0]
+        # [nested wall, nested cpu] of each running stage
+        self._stack = []
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, wall, cpu):
+        totals = self.stages.setdefault(stage, [0.0, 0.0])
+        totals[0] += wall
+        totals[1] += cpu
+
+    def add_repo_call(self, name, wall):
+        # repo reads may run on the read executor's threads
+        with self._lock:
+            totals = self.repo_calls.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+
+    def add_db_request(self, wall):
+        with self._lock:
+            self.db_requests[0] += 1
+            self.db_requests[1] += wall
+
+    def metrics(self):
+        """Yield (name, value, kind) tuples, kind being 'ms' or 'count'"""
+        yield '{}.wall'.format(self.name), self.wall * 1000, 'ms'
+        yield '{}.cpu'.format(self.name), self.cpu * 1000, 'ms'
+        for stage, (wall, cpu) in self.stages.items():
+            yield '{}.{}.wall'.format(self.name, stage), wall * 1000, 'ms'
+            yield '{}.{}.cpu'.format(self.name, stage), cpu * 1000, 'ms'
+        for method, (calls, wall) in self.repo_calls.items():
+            yield '{}.repo.{}.calls'.format(self.name, method), calls, 'count'
+            yield '{}.repo.{}.wall'.format(self.name, method), wall * 1000, 'ms'
+        requests, wall = self.db_requests
+        if requests:
+            yield '{}.db.requests'.format(self.name), requests, 'count'
+            yield '{}.db.wall'.format(self.name), wall * 1000, 'ms'
+
+
+class MetricsSink(metaclass=ABCMeta):
+
+    @abstractmethod
+    def record(self, trace):
+        """Take the measurements of a finished Trace"""
+        pass
+
+
+class HistogramSink(MetricsSink):
+    """
+    Keeps an in-process histogram per metric. Timings are bucketed by the
+    upper bounds in bounds (milliseconds); counts are summed.
+    """
+
+    DEFAULT_BOUNDS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace):
+        with self._lock:
+            for name, value, kind in trace.metrics():
+                hist = self._histograms.get(name)
+                if hist is None:
+                    hist = self._histograms[name] = {
+                        'count': 0, 'sum': 0.0, 'buckets': [0] * (len(self.bounds) + 1),
+                    }
+                hist['count'] += 1
+                hist['sum'] += value
+                if kind == 'ms':
+                    hist['buckets'][bisect_left(self.bounds, value)] += 1
+
+    def snapshot(self):
+        """Return {metric: {'count', 'sum', 'buckets'}}, the last bucket unbounded"""
+        with self._lock:
+            return {
+                name: dict(hist, buckets=list(hist['buckets']))
+                for name, hist in self._histograms.items()
+            }
+
+    def percentile(self, name, fraction):
+        """The upper bound of the bucket holding the given fraction of a timing"""
+        hist = self.snapshot().get(name)
+        if not hist or not hist['count']:
+            return None
+        rank = fraction * hist['count']
+        seen = 0
+        for bound, count in zip(self.bounds + (float('inf'),), hist['buckets']):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+class StatsDSink(MetricsSink):
+    """Sends each trace as one StatsD datagram; send failures are dropped"""
+
+    KINDS = {'ms': 'ms', 'count': 'c'}
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='links'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def format(self, trace):
+        return '\n'.join(
+            '{}.{}:{:g}|{}'.format(self.prefix, name, value, self.KINDS[kind])
+            for name, value, kind in trace.metrics()
+        )
+
+    def record(self, trace):
+        try:
+            self._sock.sendto(self.format(trace).encode('ascii'), self.address)
+        except OSError as ex:
+            LOGGER.debug("Dropped metrics for %s: %s", trace.name, ex)
+
+    def close(self):
+        self._sock.close()
+
+
+class LogSink(MetricsSink):
+    """Logs one line per trace"""
+
+    def __init__(self, logger=LOGGER, level=logging.INFO):
+        self.logger = logger
+        self.level = level
+
+    def format(self, trace):
+        parts = ['{} wall={:.2f}ms cpu={:.2f}ms'.format(
+            trace.name, trace.wall * 1000, trace.cpu * 1000)]
+        parts.extend(
+            '{}={:.2f}/{:.2f}ms'.format(stage, wall * 1000, cpu * 1000)
+            for stage, (wall, cpu) in trace.stages.items()
+        )
+        parts.extend(
+            '{}={}x/{:.2f}ms'.format(method, calls, wall * 1000)
+            for method, (calls, wall) in trace.repo_calls.items()
+        )
+        requests, wall = trace.db_requests
+        if requests:
+            parts.append('db={}x/{:.2f}ms'.format(requests, wall * 1000))
+        return ' '.join(parts)
+
+    def record(self, trace):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, self.format(trace))
+
+
+def make_sink(settings):
+    """The sink named by settings.INSTRUMENTATION, or None when it's off"""
+    kind = settings.INSTRUMENTATION
+    if not kind:
+        return None
+    if kind == 'histogram':
+        return HistogramSink()
+    if kind == 'statsd':
+        return StatsDSink(settings.STATSD_HOST, settings.STATSD_PORT, settings.STATSD_PREFIX)
+    if kind == 'log':
+        return LogSink()
+    raise RuntimeError("Invalid value for Settings.INSTRUMENTATION: '{}'".format(kind))
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def _run_stage(trace, stage, func, args, kwargs):
+    trace._stack.append([0.0, 0.0])
+    wall, cpu = perf_counter(), thread_time()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        wall, cpu = perf_counter() - wall, thread_time() - cpu
+        nested_wall, nested_cpu = trace._stack.pop()
+        if trace._stack:
+            trace._stack[-1][0] += wall
+            trace._stack[-1][1] += cpu
+        trace.add_stage(stage, wall - nested_wall, cpu - nested_cpu)
+
+
+async def _run_stage_async(trace, stage, func, args, kwargs):
+    trace._stack.append([0.0, 0.0])
+    wall, cpu = perf_counter(), thread_time()
+    try:
+        return await func(*args, **kwargs)
+    finally:
+        wall, cpu = perf_counter() - wall, thread_time() - cpu
+        nested_wall, nested_cpu = trace._stack.pop()
+        if trace._stack:
+            trace._stack[-1][0] += wall
+            trace._stack[-1][1] += cpu
+        trace.add_stage(stage, wall - nested_wall, cpu - nested_cpu)
+
+
+class Proxy:
+    """Forwards attribute access and assignment to the wrapped object"""
+
+    def __init__(self, target):
+        object.__setattr__(self, '_target', target)
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(type(self).__name__, self._target)
+
+
+class TimedStage(Proxy):
+    """Times every public method call on target as the given stage"""
+
+    def __init__(self, target, stage):
+        super().__init__(target)
+        object.__setattr__(self, '_stage', stage)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        stage = self._stage
+        if inspect.iscoroutinefunction(attr):
+            async def timed_async(*args, **kwargs):
+                trace = _current_trace.get()
+                if trace is None:
+                    return await attr(*args, **kwargs)
+                return await _run_stage_async(trace, stage, attr, args, kwargs)
+            return timed_async
+
+        def timed(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return attr(*args, **kwargs)
+            return _run_stage(trace, stage, attr, args, kwargs)
+        return timed
+
+
+class TimedRepo(Proxy):
+    """Counts and times the calls made on a repo during a traced request"""
+
+    def __init__(self, target, name):
+        super().__init__(target)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        method = '{}.{}'.format(self._name, name)
+        if inspect.iscoroutinefunction(attr):
+            async def timed_async(*args, **kwargs):
+                trace = _current_trace.get()
+                if trace is None:
+                    return await attr(*args, **kwargs)
+                start = perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                finally:
+                    trace.add_repo_call(method, perf_counter() - start)
+            return timed_async
+
+        def timed(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return attr(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                trace.add_repo_call(method, perf_counter() - start)
+        return timed
+
+
+class InstrumentedController(Proxy):
+    """Opens a Trace around each request and hands it to the sink"""
+
+    def __init__(self, target, sink, name):
+        super().__init__(target)
+        object.__setattr__(self, '_sink', sink)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    def handle(self, request):
+        trace = Trace(self._name)
+        token = _current_trace.set(trace)
+        wall, cpu = perf_counter(), thread_time()
+        try:
+            result = _run_stage(trace, 'controller', self._target.handle, (request,), {})
+        except BaseException:
+            _current_trace.reset(token)
+            self._finish(trace, wall, thread_time() - cpu)
+            raise
+        _current_trace.reset(token)
+        if inspect.isgenerator(result):
+            # a streaming view does its work as it is iterated
+            return TracedStream(result, trace, self._finish, wall, thread_time() - cpu)
+        self._finish(trace, wall, thread_time() - cpu)
+        return result
+
+    async def handle_async(self, request):
+        trace = Trace(self._name)
+        token = _current_trace.set(trace)
+        wall, cpu = perf_counter(), thread_time()
+        try:
+            return await _run_stage_async(
+                trace, 'controller', self._target.handle_async, (request,), {})
+        finally:
+            _current_trace.reset(token)
+            self._finish(trace, wall, thread_time() - cpu)
+
+    def _finish(self, trace, wall, cpu):
+        trace.wall = perf_counter() - wall
+        trace.cpu = cpu
+        try:
+            self._sink.record(trace)
+        except Exception as ex:
+            LOGGER.exception(ex)
+
+
+class TracedStream:
+    """
+    Iterates a controller's generator with its request's Trace current, and
+    finishes the Trace when the generator is used up or closed.
+    """
+
+    def __init__(self, chunks, trace, finish, wall, cpu):
+        self._chunks = chunks
+        self._trace = trace
+        self._finish = finish
+        self._wall = wall
+        self._cpu = cpu
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        token = _current_trace.set(self._trace)
+        start = thread_time()
+        try:
+            try:
+                return _run_stage(self._trace, 'stream', next, (self._chunks,), {})
+            finally:
+                self._cpu += thread_time() - start
+                _current_trace.reset(token)
+        except BaseException:
+            # StopIteration included
+            self.close()
+            raise
+
+    def close(self):
+        if self._done:
+            return
+        self._done = True
+        self._chunks.close()
+        self._finish(self._trace, self._wall, self._cpu)
+
+
+def instrument(controller, sink, name=None):
+    """
+    Wrap a controller built from (usecase, presenter, view) attributes so
+    its requests are traced into sink, normally context.metrics_sink.
+    Returns the controller untouched when sink is None.
+    """
+    if sink is None:
+        return controller
+
+    for attr, stage in (('usecase', 'usecase'), ('presenter', 'presenter'), ('view', 'view')):
+        value = getattr(controller, attr, None)
+        if value is not None and not isinstance(value, TimedStage):
+            setattr(controller, attr, TimedStage(value, stage))
+
+    if name is None:
+        name = type(controller).__name__
+        if name.endswith('Controller'):
+            name = name[:-len('Controller')]
+    return InstrumentedController(controller, sink, name)
+
+
+def instrument_repo(repo, name):
+    """Wrap a repo so its calls are counted in the current request's Trace"""
+    return TimedRepo(repo, name)
@@ -1,36 +1,224 @@
+import atexit
+import copy
+import itertools
+import json
 import logging
+import queue
 import sys
+import threading
+from collections import OrderedDict
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
 from links.settings import Settings
 
-LOGCONFIG = {
-    'version': 1,
-    'formatters': {
-        'default': {
-            'format': '%(asctime)s - %(levelname)s - %(name)s -- %(message)s'
+# LogRecord attributes that aren't "extra" fields
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime',
+}
+
+_LISTENER = None
+_QUEUE_HANDLER = None
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line. Fields passed with
+    extra=, like the CouchDB slow query log's, are included as they are.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
         }
-    },
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'default',
-            'level': Settings.LOGGING_LEVEL,
-            'stream': sys.stderr,
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and name not in entry:
+                entry[name] = value
+        return json.dumps(entry, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Passes the first and then every nth record of each message at or below
+    level; anything more severe always passes. Messages are told apart by
+    logger and unformatted message, so a busy "Processed %d records" is
+    sampled as one message. Only the max_keys most recently seen messages
+    are counted, as messages formatted before logging are all different.
+    """
+
+    def __init__(self, every=1, level=logging.INFO, max_keys=1000):
+        super().__init__()
+        self.every = every
+        self.level = level
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.every <= 1 or record.levelno > self.level:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = itertools.count()
+                if len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+            return next(counter) % self.every == 0
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    A QueueHandler for a bounded queue. When the queue is full a record is
+    dropped, or with block=True the logging thread waits for room. Dropped
+    records are counted and reported once the queue has room again.
+    """
+
+    def __init__(self, log_queue, block=False):
+        super().__init__(log_queue)
+        self.block = block
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # merge the args and render the traceback now, so the record no
+        # longer refers to objects the caller may go on to change
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.block:
+            self.queue.put(record)
+            return
+        if self.dropped:
+            self._report_dropped()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _report_dropped(self):
+        with self._lock:
+            dropped, self.dropped = self.dropped, 0
+        notice = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Dropped %d log records, the log queue was full", (dropped,), None)
+        try:
+            self.queue.put_nowait(self.prepare(notice))
+        except queue.Full:
+            with self._lock:
+                self.dropped += dropped
+
+
+def build_config(settings):
+    """The dictConfig for settings, writing to stderr as it's logged"""
+    config = {
+        'version': 1,
+        # loggers are created at import, before any reconfiguration
+        'disable_existing_loggers': False,
+        'formatters': {
+            'default': {
+                'format': '%(asctime)s - %(levelname)s - %(name)s -- %(message)s'
+            },
+            'json': {
+                '()': JSONFormatter,
+            },
         },
-    #     'file': {
-    #         'class': 'logging.handlers.WatchedFileHandler',
-    #         'formatter': 'default',
-    #         'level': Settings.LOGGING_LEVEL,
-    #         'filename': 'tmp.log',
-    #     }
-    },
-    'root': {
-        'handlers': ['console'],
-        'level': Settings.LOGGING_LEVEL,
-    },
-}
+        'filters': {},
+        'handlers': {
+            'console': {
+                'class': 'logging.StreamHandler',
+                'formatter': 'json' if settings.LOGGING_FORMAT == 'json' else 'default',
+                'level': settings.LOGGING_LEVEL,
+                'stream': sys.stderr,
+                'filters': [],
+            },
+        #     'file': {
+        #         'class': 'logging.handlers.WatchedFileHandler',
+        #         'formatter': 'default',
+        #         'level': Settings.LOGGING_LEVEL,
+        #         'filename': 'tmp.log',
+        #     }
+        },
+        'root': {
+            'handlers': ['console'],
+            'level': settings.LOGGING_LEVEL,
+        },
+    }
+    if settings.LOGGING_SAMPLE_EVERY > 1:
+        config['filters']['sample'] = {
+            '()': SampleFilter,
+            'every': settings.LOGGING_SAMPLE_EVERY,
+            'level': settings.LOGGING_SAMPLE_LEVEL,
+        }
+        config['handlers']['console']['filters'].append('sample')
+    return config
+
+
+def configure_logging(settings=Settings):
+    """
+    Configure the root logger from settings. With LOGGING_QUEUE_SIZE set,
+    records are put on a bounded queue and written by a background thread,
+    so logging never waits on stderr.
+    """
+    global _LISTENER, _QUEUE_HANDLER
+    stop_logging()
+    dictConfig(build_config(settings))
+    if settings.LOGGING_QUEUE_SIZE <= 0:
+        return
+
+    root = logging.getLogger()
+    console, = root.handlers
+    handler = BoundedQueueHandler(
+        queue.Queue(settings.LOGGING_QUEUE_SIZE),
+        block=settings.LOGGING_QUEUE_OVERFLOW == 'block')
+    # filter before queueing, so sampled out records cost nothing more
+    for log_filter in list(console.filters):
+        handler.addFilter(log_filter)
+        console.removeFilter(log_filter)
+    root.removeHandler(console)
+    root.addHandler(handler)
+    _QUEUE_HANDLER = handler
+    _LISTENER = QueueListener(handler.queue, console, respect_handler_level=True)
+    _LISTENER.start()
+
+
+def stop_logging():
+    """
+    Write out anything still queued, stop the background thread and log
+    straight to the console again, so nothing is left waiting on a queue
+    nobody reads.
+    """
+    global _LISTENER, _QUEUE_HANDLER
+    if _LISTENER is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_QUEUE_HANDLER)
+    _LISTENER.stop()
+    for console in _LISTENER.handlers:
+        for log_filter in _QUEUE_HANDLER.filters:
+            console.addFilter(log_filter)
+        root.addHandler(console)
+    _LISTENER = _QUEUE_HANDLER = None
+
 
-dictConfig(LOGCONFIG)
+atexit.register(stop_logging)
+configure_logging(Settings)
 
 
 def get_logger(name):
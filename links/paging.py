@@ -0,0 +1,38 @@
+"""
+Keyset pagination helpers shared by repos, use cases and presenters.
+
+A cursor is an opaque string identifying the first bookmark of the next page
+by its (date_created, id) key, so fetching a page never needs to skip over
+the rows before it.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from links.exceptions import ValidationError
+
+
+class Page(list):
+    """A list of items plus the cursor of the page after it (None if last)"""
+
+    def __init__(self, items=(), next_cursor=None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(date_created, item_id):
+    if isinstance(date_created, datetime):
+        date_created = date_created.isoformat()
+    raw = json.dumps([date_created, item_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return the (date_created ISO string, item id) pair held by a cursor"""
+    try:
+        date_created, item_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (AttributeError, ValueError, TypeError, binascii.Error):
+        raise ValidationError("Invalid cursor: {!r}".format(cursor))
+    return date_created, item_id
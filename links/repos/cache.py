@@ -0,0 +1,353 @@
+"""
+Read-through caching decorators for the repo interfaces. They wrap any
+backend and are enabled from settings by links.context.init_context.
+"""
+import copy
+import itertools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from links.batch import BookmarkBatch
+from links.entities import NullBookmark, NullUser, User
+from links.paging import Page
+from links.repos.interfaces import BookmarkRepo, UserRepo
+
+# sentinel for "not in the cache", since None is a cacheable value
+MISSING = object()
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded mapping that evicts the least recently used
+    entry when full and drops entries once their time to live has passed.
+    Given a sizeof function and max_bytes, it also evicts until the
+    estimated size of its values is within max_bytes.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic,
+                 max_bytes=None, sizeof=sys.getsizeof):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """Return the cached value for key, or MISSING"""
+        with self._lock:
+            entry = self._data.get(key, MISSING)
+            if entry is not MISSING:
+                value, expires, _ = entry
+                if expires > self.clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return MISSING
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        nbytes = self.sizeof(value) if self.max_bytes else 0
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes and nbytes > self.max_bytes:
+                return
+            self._data[key] = (value, self.clock() + ttl, nbytes)
+            self.nbytes += nbytes
+            while len(self._data) > self.maxsize or (
+                    self.max_bytes and self.nbytes > self.max_bytes):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.nbytes -= evicted
+
+    def invalidate(self, key):
+        self.pop(key)
+
+    def pop(self, key):
+        """Remove key, returning its value (expired or not) or MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            self._remove(key)
+        return MISSING if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'bytes': self.nbytes,
+        }
+
+    def _remove(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[2]
+
+
+class CachingUserRepo(UserRepo):
+    """
+    Caches user lookups from another UserRepo. exists, get and
+    get_password_hash share one cached record per user, so a request that
+    checks a user and then loads it costs at most one backend read. Users
+    that were not found are cached too, for negative_ttl seconds.
+    """
+
+    def __init__(self, repo, maxsize=1024, ttl=60, negative_ttl=5):
+        self.repo = repo
+        self.negative_ttl = negative_ttl
+        self.cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        # bumped by every invalidate, so a read that raced one isn't cached
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def save(self, user):
+        try:
+            self.repo.save(user)
+        finally:
+            self.invalidate(user.id)
+
+    def get(self, user_id):
+        record = self._lookup(user_id)
+        if record is None:
+            return NullUser()
+        # hand out a fresh entity so callers can't modify the cached one
+        user = User(record[0])
+        user.password_hash = record[1]
+        return user
+
+    def exists(self, user_id):
+        return self._lookup(user_id) is not None
+
+    def exists_many(self, user_ids):
+        """
+        Answer from the cache where possible and ask the backend about the
+        rest in one call. Users found missing are cached; users found to
+        exist are not, as their record hasn't been loaded.
+        """
+        user_ids = list(user_ids)
+        result = {}
+        unknown = []
+        for user_id in user_ids:
+            record = self.cache.get(user_id) if user_id is not None else None
+            if record is MISSING:
+                unknown.append(user_id)
+            else:
+                result[user_id] = record is not None
+
+        if unknown:
+            version = self._version
+            for user_id, exists in self.repo.exists_many(unknown).items():
+                result[user_id] = exists
+                if not exists:
+                    self._set(version, user_id, None, ttl=self.negative_ttl)
+        return {user_id: result[user_id] for user_id in user_ids}
+
+    def get_password_hash(self, user_id):
+        record = self._lookup(user_id)
+        if record is None:
+            return None
+        return record[1]
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._version += 1
+        self.cache.invalidate(user_id)
+
+    def on_change(self, change):
+        """Subscriber for links.repos.couchdb_changes.ChangesFollower"""
+        if change.type in (None, 'user'):
+            self.invalidate(change.id)
+
+    def _lookup(self, user_id):
+        """Return a cached (id, password_hash) tuple, or None for no such user"""
+        if user_id is None:
+            return None
+
+        record = self.cache.get(user_id)
+        if record is not MISSING:
+            return record
+
+        version = self._version
+        user = self.repo.get(user_id)
+        if user.id is None:
+            self._set(version, user_id, None, ttl=self.negative_ttl)
+            return None
+
+        record = (user.id, user.password_hash)
+        self._set(version, user_id, record)
+        return record
+
+    def _set(self, version, user_id, record, ttl=None):
+        # invalidate bumps the version before dropping the entry, so either
+        # this sees the bump or the entry set here is dropped afterwards
+        with self._lock:
+            if self._version == version:
+                self.cache.set(user_id, record, ttl=ttl)
+
+
+def bookmark_size(value):
+    """Rough size in bytes of a cached bookmark, a list of them or a batch"""
+    if value is None:
+        return 0
+    if isinstance(value, BookmarkBatch):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(column) + sum(sys.getsizeof(v) for v in column)
+            for column in (value.ids, value.names, value.urls, value.dates))
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(bookmark_size(bm) for bm in value)
+    return sys.getsizeof(value) + sum(
+        sys.getsizeof(v) for v in (
+            value.id, value.user_id, value.name, value.url,
+            value.raw_date_created, value.revision))
+
+
+class CachingBookmarkRepo(BookmarkRepo):
+    """
+    Caches single bookmarks and pages of get_by_user and get_batch_by_user
+    results from another BookmarkRepo. Each user's pages are keyed on their current generation,
+    and any write to one of their bookmarks gives them a new one, so exactly
+    that user's cached pages go stale and age out of the LRU. Generations
+    are drawn from one counter and kept in an LRU of their own, so a user
+    whose generation was forgotten gets a new one rather than an old one.
+    Callers always get copies, so editing a fetched bookmark never changes
+    what is cached.
+
+    Full listings (limit=None) and iter_by_user go straight to the backend;
+    an export streaming every bookmark through the cache would only evict
+    the hot entries.
+    """
+
+    def __init__(self, repo, maxsize=4096, page_maxsize=1024, ttl=300, max_bytes=None):
+        self.repo = repo
+        self.bookmarks = LRUCache(
+            maxsize=maxsize, ttl=ttl, max_bytes=max_bytes, sizeof=bookmark_size)
+        self.pages = LRUCache(
+            maxsize=page_maxsize, ttl=ttl, max_bytes=max_bytes, sizeof=bookmark_size)
+        self._generations = LRUCache(maxsize=page_maxsize, ttl=ttl)
+        self._counter = itertools.count(1)
+        # bumped by every invalidate, so a read that raced one isn't cached
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def save(self, bookmark):
+        try:
+            self.repo.save(bookmark)
+        finally:
+            self.invalidate(bookmark.id, bookmark.user_id)
+
+    def save_many(self, bookmarks):
+        bookmarks = list(bookmarks)
+        try:
+            return self.repo.save_many(bookmarks)
+        finally:
+            for bookmark in bookmarks:
+                self.invalidate(bookmark.id, bookmark.user_id)
+
+    def delete(self, bookmark_id):
+        bookmark = self.get(bookmark_id)
+        try:
+            self.repo.delete(bookmark_id)
+        finally:
+            self.invalidate(bookmark_id, bookmark.user_id)
+
+    def get(self, bookmark_id):
+        if bookmark_id is None:
+            return NullBookmark()
+
+        bookmark = self.bookmarks.get(bookmark_id)
+        if bookmark is MISSING:
+            version = self._version
+            bookmark = self.repo.get(bookmark_id)
+            if bookmark.id is None:
+                return bookmark
+            # invalidate bumps the version before dropping the entry, so
+            # either this sees the bump or the entry is dropped afterwards
+            with self._lock:
+                if self._version == version:
+                    self.bookmarks.set(bookmark_id, copy.copy(bookmark))
+            return bookmark
+
+        return copy.copy(bookmark)
+
+    def get_by_user(self, user_id, limit=None, after=None):
+        if limit is None:
+            return self.repo.get_by_user(user_id, limit=limit, after=after)
+
+        key = (user_id, self._generation(user_id), limit, after)
+        page = self.pages.get(key)
+        if page is MISSING:
+            page = self.repo.get_by_user(user_id, limit=limit, after=after)
+            self.pages.set(key, Page([copy.copy(bm) for bm in page], page.next_cursor))
+            return page
+
+        return Page([copy.copy(bm) for bm in page], page.next_cursor)
+
+    def get_batch_by_user(self, user_id, limit=None, after=None):
+        if limit is None:
+            return self.repo.get_batch_by_user(user_id, limit=limit, after=after)
+
+        key = ('batch', user_id, self._generation(user_id), limit, after)
+        batch = self.pages.get(key)
+        if batch is MISSING:
+            batch = self.repo.get_batch_by_user(user_id, limit=limit, after=after)
+            self.pages.set(key, batch.copy())
+            return batch
+
+        return batch.copy()
+
+    def iter_by_user(self, user_id, batch_size=1000):
+        return self.repo.iter_by_user(user_id, batch_size=batch_size)
+
+    def invalidate(self, bookmark_id, user_id=None):
+        """Forget a bookmark and the pages of its owner and previous owner"""
+        with self._lock:
+            self._version += 1
+        cached = self.bookmarks.pop(bookmark_id)
+        owners = {user_id}
+        if cached is not MISSING:
+            owners.add(cached.user_id)
+        with self._lock:
+            for owner in owners - {None}:
+                self._generations.set(owner, next(self._counter))
+
+    def on_change(self, change):
+        """
+        Subscriber for links.repos.couchdb_changes.ChangesFollower. Deleted
+        documents no longer say who owned them, so unless the bookmark was
+        cached every user's pages are dropped. So are they for any other
+        change whose owner is unknown.
+        """
+        if change.id.startswith('_design/') or change.type == 'user':
+            return
+
+        owner = change.owner
+        cached = self.bookmarks.pop(change.id)
+        if cached is not MISSING:
+            owner = cached.user_id
+        if owner is None:
+            self.pages.clear()
+        self.invalidate(change.id, owner)
+
+    def _generation(self, user_id):
+        with self._lock:
+            generation = self._generations.get(user_id)
+            if generation is MISSING:
+                generation = next(self._counter)
+                self._generations.set(user_id, generation)
+            return generation
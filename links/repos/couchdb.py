@@ -3,78 +3,271 @@ Implementations of the repo interfaces using CouchDB as the storage mechanism
 """
 import datetime
 import json
+import threading
+
 import couchdb
-import dateutil.parser
 
+from links import paging
+from links.batch import BookmarkBatch
 from links.entities import Bookmark, NullBookmark, User, NullUser
+from links.exceptions import InvalidOperationError, RepositoryError
 from links.logger import get_logger
-from links.repos.interfaces import BookmarkRepo, UserRepo
+from links.repos import couchdb_tracing
+from links.repos.interfaces import BookmarkRepo, SaveResult, UserRepo
 from links.settings import CouchDBSettings
 
 LOGGER = get_logger(__name__)
 
+# Design documents the repos depend on. Install or update them with
+# `python -m links.tools install_views`.
+DESIGN_DOCS = [
+    {
+        '_id': '_design/bookmarks',
+        'language': 'javascript',
+        'views': {
+            # Keyed on [user_id, date_created]. The value is a projection of
+            # just the fields a listing needs, so queries don't have to use
+            # include_docs.
+            'by_user': {
+                'map': (
+                    "function (doc) {\n"
+                    "  if (doc.type === 'bookmark') {\n"
+                    "    emit([doc.user_id, doc.date_created], {\n"
+                    "      id: doc._id,\n"
+                    "      name: doc.name,\n"
+                    "      url: doc.url,\n"
+                    "      date_created: doc.date_created\n"
+                    "    });\n"
+                    "  }\n"
+                    "}"
+                ),
+            },
+        },
+    },
+    {
+        '_id': '_design/changes',
+        'language': 'javascript',
+        'views': {
+            # Keyed on doc id, with just the type and owner the caches need
+            # to act on a change, so the changes feed never has to send
+            # documents (user password hashes included) to every worker.
+            'summary': {
+                'map': (
+                    "function (doc) {\n"
+                    "  if (doc.type) {\n"
+                    "    emit(doc._id, [doc.type, doc.user_id || null]);\n"
+                    "  }\n"
+                    "}"
+                ),
+            },
+        },
+    },
+]
+
+
+class CouchDBEncoder(json.JSONEncoder):
+    """Custom JSON encoder class for handling special data types"""
+
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime):
+            return obj.isoformat()
+
+
+def _encode_default(obj):
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    raise TypeError("{!r} is not JSON serializable".format(obj))
+
+
+# Decoding leaves date_created as the stored ISO string; Bookmark parses it
+# only if something asks for the datetime.
+
+
+def _json_codec():
+    return (
+        lambda obj: json.dumps(obj, cls=CouchDBEncoder),
+        json.loads,
+    )
+
+
+def _orjson_codec():
+    import orjson
+    # orjson writes naive datetimes in the same format as isoformat()
+    return (
+        lambda obj: orjson.dumps(obj, default=_encode_default).decode('utf-8'),
+        orjson.loads,
+    )
+
+
+def _ujson_codec():
+    import ujson
+    return (
+        lambda obj: ujson.dumps(obj, default=_encode_default),
+        ujson.loads,
+    )
+
+
+JSON_BACKENDS = {
+    'json': _json_codec,
+    'orjson': _orjson_codec,
+    'ujson': _ujson_codec,
+}
+
+_CODEC = {'name': 'json', 'encode': None, 'decode': None}
+_CODEC['encode'], _CODEC['decode'] = _json_codec()
+
+
+def use_json_backend(name):
+    """
+    Select the JSON library used to talk to CouchDB: 'json', 'orjson' or
+    'ujson'. A backend that isn't installed falls back to json with a
+    warning. Return the name in use.
+
+    For this app's documents orjson measured slower than json, so json is
+    the default and nothing picks another backend unasked.
+    """
+    for candidate in (name, 'json'):
+        try:
+            encode, decode = JSON_BACKENDS[candidate]()
+        except ImportError:
+            if candidate == name:
+                LOGGER.warning("JSON backend %s is not installed, using json", name)
+            continue
+        except KeyError:
+            raise ValueError("Unknown JSON backend '{}'".format(candidate))
+        _CODEC.update(name=candidate, encode=encode, decode=decode)
+        return candidate
+
 
 def json_decoder(json_str):
     """Decoder wrapper for couchdb.json.use"""
-    return json.loads(json_str, cls=CouchDBDecoder)
+    return _CODEC['decode'](json_str)
 
 
 def json_encoder(obj):
     """Encoding wrapper for couchdb.json.use"""
-    return json.dumps(obj, cls=CouchDBEncoder)
-
-
-class CouchDBDecoder(json.JSONDecoder):
-    """Custom JSON decoder class for handlings couchdb data"""
+    return _CODEC['encode'](obj)
+
+
+class PooledConnections(couchdb.http.ConnectionPool):
+    """
+    A couchdb.http connection pool that keeps at most max_size idle
+    keep-alive connections per host, and applies separate connect and read
+    timeouts. Without keep_alive every connection is closed once its
+    response has been read.
+    """
+
+    def __init__(self, max_size, connect_timeout=None, read_timeout=None,
+                 keep_alive=True, disable_ssl_verification=False):
+        super().__init__(connect_timeout, disable_ssl_verification=disable_ssl_verification)
+        self.max_size = max_size
+        self.read_timeout = read_timeout
+        self.keep_alive = keep_alive
+
+    def get(self, url):
+        conn = super().get(url)
+        if conn.sock is not None:
+            conn.sock.settimeout(self.read_timeout)
+        return conn
+
+    def release(self, url, conn):
+        if self.keep_alive:
+            scheme, host = couchdb.util.urlsplit(url, 'http', False)[:2]
+            with self.lock:
+                idle = self.conns.setdefault((scheme, host), [])
+                if len(idle) < self.max_size:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+
+class ConnectionManager:
+    """
+    The process-wide CouchDB server handle, HTTP session and database
+    handles, shared by all the CouchDB repos. Nothing here touches the
+    network: database handles are created on first use without checking
+    that the database exists, so a missing one shows up on the first
+    request instead.
+    """
+
+    def __init__(self, settings=CouchDBSettings, session=None):
+        """
+        :param settings:
+        :param session: the couchdb.http.Session to send requests with,
+          defaults to one with a pool of settings.POOL_SIZE connections
+        """
+        use_json_backend(settings.JSON_BACKEND)
+        couchdb.json.use(encode=json_encoder, decode=json_decoder)
+        if session is None:
+            session = couchdb.http.Session(timeout=settings.CONNECT_TIMEOUT)
+            session.connection_pool = PooledConnections(
+                settings.POOL_SIZE,
+                connect_timeout=settings.CONNECT_TIMEOUT,
+                read_timeout=settings.REQUEST_TIMEOUT,
+                keep_alive=bool(settings.KEEP_ALIVE),
+                disable_ssl_verification=True,
+            )
+        self.server = couchdb.Server(settings.DATABASE_HOST, session=session)
+        if settings.TRACE_REQUESTS:
+            # database handles derive their resources from this one
+            self.server.resource = couchdb_tracing.TracedResource(
+                settings.DATABASE_HOST, session)
+        self.server.resource.credentials = (
+            settings.DATABASE_USER,
+            settings.DATABASE_PASSWORD,
+        )
+        self._databases = {}
+        self._lock = threading.Lock()
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(object_hook=self.object_hook, **kwargs)
+    def database(self, name):
+        with self._lock:
+            db = self._databases.get(name)
+            if db is None:
+                db = couchdb.Database(self.server.resource(name), name)
+                self._databases[name] = db
+            return db
 
-    def object_hook(self, json_dict):
-        if 'date_created' in json_dict:
-            json_dict['date_created'] = self.parsedate(
-                json_dict['date_created'])
 
-        return json_dict
+_MANAGER = None
+_MANAGER_LOCK = threading.Lock()
 
-    def parsedate(self, datestr):
-        try:
-            result = dateutil.parser.parse(datestr)
-        except AttributeError:
-            result = None
-        return result
 
+def get_connection_manager():
+    """Return the shared ConnectionManager, creating it on first use"""
+    global _MANAGER
+    if _MANAGER is None:
+        with _MANAGER_LOCK:
+            if _MANAGER is None:
+                _MANAGER = ConnectionManager()
+    return _MANAGER
 
-class CouchDBEncoder(json.JSONEncoder):
-    """Custom JSON encoder class for handling special data types"""
 
-    def default(self, obj):
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
+def reset_connection_manager():
+    """Drop the shared ConnectionManager, e.g. after settings change or a fork"""
+    global _MANAGER
+    with _MANAGER_LOCK:
+        _MANAGER = None
 
 
 class CouchDBMixin:
     """A mixin class to share commonly used attributes amongst subclasses"""
 
-    def __init__(self):
+    def __init__(self, connections=None):
         LOGGER.debug(
             "%s -> %s/%s",
             self.__class__,
             CouchDBSettings.DATABASE_HOST,
             CouchDBSettings.DATABASE_NAME
         )
-        couchdb.json.use(encode=json_encoder, decode=json_decoder)
+        if connections is None:
+            connections = get_connection_manager()
         self.database = CouchDBSettings.DATABASE_NAME
-        self.server = couchdb.Server(CouchDBSettings.DATABASE_HOST)
-        self.server.resource.credentials = (
-            CouchDBSettings.DATABASE_USER,
-            CouchDBSettings.DATABASE_PASSWORD,
-        )
-        self.server.resource.session.disable_ssl_verification()
-        self.db = self.server[self.database]
+        self.server = connections.server
+        self.db = connections.database(self.database)
 
 
-class CouchDBBookmarkRepo(CouchDBMixin, BookmarkRepo):
+class BookmarkDocumentMixin:
+    """Conversions between bookmark entities, documents and view rows"""
 
     _doc_type = 'bookmark'
 
@@ -84,33 +277,183 @@ class CouchDBBookmarkRepo(CouchDBMixin, BookmarkRepo):
             doc['user_id'],
             doc['name'],
             doc['url'],
-            date_created=doc['date_created']
+            date_created=doc['date_created'],
+            revision=doc.get('_rev')
+        )
+
+    def row_to_entity(self, row):
+        """Build an entity from a by_user view row, without its document"""
+        value = row['value']
+        return Bookmark(
+            value['id'],
+            row['key'][0],
+            value['name'],
+            value['url'],
+            date_created=value['date_created']
+        )
+
+    def to_doc(self, bookmark):
+        doc = {
+            '_id': bookmark.id,
+            'user_id': bookmark.user_id,
+            'name': bookmark.name,
+            'url': bookmark.url,
+            'date_created': bookmark.raw_date_created,
+            'type': self._doc_type,
+        }
+        if bookmark.revision is not None:
+            doc['_rev'] = bookmark.revision
+        return doc
+
+    def by_user_options(self, user_id, after=None):
+        """
+        Query options for the by_user view, newest first. The view is keyed
+        on [user_id, date_created], so the key range alone selects the user's
+        rows, and a cursor holds the key and doc id of a page's first row.
+        """
+        opts = dict(
+            startkey=[user_id, {}],
+            endkey=[user_id],
+            descending=True,
         )
+        if after is not None:
+            date_created, bookmark_id = paging.decode_cursor(after)
+            opts.update(startkey=[user_id, date_created], startkey_docid=bookmark_id)
+        return opts
+
+    def rows_to_page(self, rows, limit):
+        """Turn limit + 1 view rows into a page, using the extra row as cursor"""
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            next_row = rows.pop()
+            next_cursor = paging.encode_cursor(next_row['key'][1], next_row['id'])
+        return paging.Page([self.row_to_entity(row) for row in rows], next_cursor)
+
+    def rows_to_batch(self, user_id, rows, limit):
+        """rows_to_page, filling a BookmarkBatch straight from the row values"""
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            next_row = rows.pop()
+            next_cursor = paging.encode_cursor(next_row['key'][1], next_row['id'])
+        batch = BookmarkBatch(user_id, next_cursor=next_cursor)
+        for row in rows:
+            value = row['value']
+            batch.append(value['id'], value['name'], value['url'], value['date_created'])
+        return batch
+
+
+def exists_in_all_docs(row):
+    """Whether an _all_docs row is a live document, not missing or deleted"""
+    return 'error' not in row and not row['value'].get('deleted', False)
+
+
+class UserDocumentMixin:
+    """Conversions between user entities and documents"""
+
+    _doc_type = 'user'
+
+    def to_entity(self, doc):
+        user = User(doc['_id'])
+        user.password_hash = doc['password_hash']
+        return user
+
+    def to_doc(self, user):
+        return {
+            '_id': user.id,
+            'type': self._doc_type,
+            'password_hash': user.password_hash,
+        }
+
+
+class CouchDBBookmarkRepo(CouchDBMixin, BookmarkDocumentMixin, BookmarkRepo):
 
     def save(self, bookmark):
         """
+        Create or update a bookmark in a single request. Bookmarks loaded
+        through this repo carry their revision and are updated with it;
+        anything else is created. Only a bookmark that already exists but was
+        never loaded costs an extra lookup.
         """
         if bookmark.id is None:
             return
+
+        if bookmark.revision is not None:
+            self.update(bookmark)
+            return
+
         try:
-            doc = self.db[bookmark.id]
-            doc['name'] = bookmark.name
-            doc['url'] = bookmark.url
-            LOGGER.debug("CouchDBBookmarkRepo: updating exising doc")
-        except couchdb.http.ResourceNotFound:
-            LOGGER.debug("CouchDBBookmarkRepo: creating new doc")
-            # fill with entity data
-            doc = {
-                '_id': bookmark.id,
-                'user_id': bookmark.user_id,
-                'name': bookmark.name,
-                'url': bookmark.url,
-                'date_created': bookmark.date_created,
-                'type': self._doc_type,
-            }
-
-        LOGGER.info("Saving to couchdb: %s", doc)
-        self.db.save(doc)
+            self.create(bookmark)
+        except couchdb.http.ResourceConflict:
+            LOGGER.debug("CouchDBBookmarkRepo: %s exists, updating", bookmark.id)
+            bookmark.revision = self.db[bookmark.id]['_rev']
+            self.update(bookmark)
+
+    def create(self, bookmark):
+        """Store a new bookmark. Raises ResourceConflict if the id is taken."""
+        LOGGER.debug("CouchDBBookmarkRepo: creating new doc")
+        self._put(self.to_doc(bookmark), bookmark)
+
+    def update(self, bookmark):
+        """Store a bookmark over the revision it was loaded with"""
+        if bookmark.revision is None:
+            raise InvalidOperationError(
+                "Cannot update bookmark {} without a revision".format(bookmark.id))
+
+        LOGGER.debug("CouchDBBookmarkRepo: updating existing doc")
+        try:
+            self._put(self.to_doc(bookmark), bookmark)
+        except couchdb.http.ResourceConflict:
+            raise RepositoryError(
+                "Bookmark {} was modified by another writer".format(bookmark.id))
+
+    def _put(self, doc, bookmark):
+        LOGGER.debug("Saving to couchdb: %s", doc['_id'])
+        _, rev = self.db.save(doc)
+        bookmark.revision = rev
+
+    def save_many(self, bookmarks, chunk_size=None):
+        """
+        Write bookmarks with _bulk_docs, chunk_size documents per request.
+        Existing documents are not read first; CouchDB itself reports stale
+        or missing revisions as conflicts, see BookmarkRepo.save_many.
+        """
+        if chunk_size is None:
+            chunk_size = CouchDBSettings.BULK_CHUNK_SIZE
+
+        results = []
+        chunk = []
+        for bookmark in bookmarks:
+            if bookmark.id is None:
+                results.append(SaveResult(None, False, 'Bookmark has no id'))
+                continue
+            chunk.append(bookmark)
+            if len(chunk) >= chunk_size:
+                results.extend(self._bulk_save(chunk))
+                chunk = []
+
+        if chunk:
+            results.extend(self._bulk_save(chunk))
+
+        return results
+
+    def _bulk_save(self, bookmarks):
+        LOGGER.debug("CouchDBBookmarkRepo: bulk saving %d docs", len(bookmarks))
+        try:
+            rows = self.db.update([self.to_doc(bm) for bm in bookmarks])
+        except (couchdb.http.HTTPError, OSError) as ex:
+            LOGGER.exception("Bulk save of %d docs failed", len(bookmarks))
+            return [SaveResult(bm.id, False, str(ex)) for bm in bookmarks]
+
+        results = []
+        for bookmark, (success, doc_id, rev_or_exc) in zip(bookmarks, rows):
+            if success:
+                bookmark.revision = rev_or_exc
+                results.append(SaveResult(doc_id, True, None))
+            elif isinstance(rev_or_exc, couchdb.http.ResourceConflict):
+                results.append(SaveResult(doc_id, False, 'conflict'))
+            else:
+                results.append(SaveResult(doc_id, False, str(rev_or_exc)))
+        return results
 
     def delete(self, bookmark_id):
         """
@@ -127,47 +470,65 @@ class CouchDBBookmarkRepo(CouchDBMixin, BookmarkRepo):
             return NullBookmark()
         return self.to_entity(doc)
 
-    def get_by_user(self, user_id, limit=None):
+    def get_by_user(self, user_id, limit=None, after=None):
         """
-        TODO: use a better view
+        Page through the by_user view, newest first. A page is fetched with
+        one extra row, whose key and doc id become the next page's
+        startkey/startkey_docid.
+
+        Entities are built from the view's projected values, so they carry no
+        revision; saving one costs the extra lookup described in save().
         """
         url = '_design/bookmarks/_view/by_user'
-        batch = 1000
-        opts = dict(
-            startkey=[user_id, {}],
-            endkey=[user_id],
-            descending=True,
-            include_docs=True,
-            limit=limit
-        )
-        gen = self.db.iterview(url, batch, **opts)
-        return [
-            self.to_entity(row.doc) for row in gen if row.doc.get('user_id') == user_id
-        ]
+        opts = self.by_user_options(user_id, after)
 
+        if limit is None:
+            rows = self.db.iterview(url, 1000, **opts)
+            return paging.Page([self.row_to_entity(row) for row in rows])
 
-class CouchDBUserRepo(CouchDBMixin, UserRepo):
+        rows = list(self.db.view(url, limit=limit + 1, **opts))
+        return self.rows_to_page(rows, limit)
 
-    _doc_type = 'user'
+    def get_batch_by_user(self, user_id, limit=None, after=None):
+        """get_by_user as a BookmarkBatch, without building entities"""
+        url = '_design/bookmarks/_view/by_user'
+        opts = self.by_user_options(user_id, after)
 
-    def to_entity(self, doc):
-        user = User(doc['_id'])
-        user.password_hash = doc['password_hash']
-        return user
+        if limit is None:
+            rows = list(self.db.iterview(url, 1000, **opts))
+        else:
+            rows = list(self.db.view(url, limit=limit + 1, **opts))
+        return self.rows_to_batch(user_id, rows, limit)
 
-    def save(self, user):
+    def install_views(self):
         """
+        Create or update the design documents in DESIGN_DOCS. Returns the ids
+        of the documents that were written.
         """
-        if self.exists(user.id):
-            LOGGER.info("User %s already exists.")
-            return
+        written = []
+        for design_doc in DESIGN_DOCS:
+            doc = dict(design_doc)
+            existing = self.db.get(doc['_id'])
+            if existing is not None:
+                if existing.get('views') == doc['views']:
+                    continue
+                doc['_rev'] = existing['_rev']
+            self.db.save(doc)
+            written.append(doc['_id'])
+        return written
 
-        doc = {
-            '_id': user.id,
-            'type': self._doc_type,
-            'password_hash': user.password_hash,
-        }
-        self.db.save(doc)
+
+class CouchDBUserRepo(CouchDBMixin, UserDocumentMixin, UserRepo):
+
+    def save(self, user):
+        """
+        Create the user. Writing without a revision fails with a conflict if
+        the user exists, so this needs no separate existence check.
+        """
+        try:
+            self.db.save(self.to_doc(user))
+        except couchdb.http.ResourceConflict:
+            LOGGER.info("User %s already exists.", user.id)
 
     def get(self, user_id):
         """
@@ -191,11 +552,21 @@ class CouchDBUserRepo(CouchDBMixin, UserRepo):
 
     def exists(self, user_id):
         """
+        Check for the user with a HEAD request, so the document itself is
+        never transferred.
         """
-        exists = True
-        try:
-            doc = self.db[user_id]
-            # LOGGER.debug("User exists: %s", doc)
-        except couchdb.http.ResourceNotFound:
-            exists = False
-        return exists
+        if user_id is None:
+            return False
+        return user_id in self.db
+
+    def exists_many(self, user_ids):
+        """Look up all of user_ids in a single _all_docs request"""
+        user_ids = list(user_ids)
+        result = dict.fromkeys(user_ids, False)
+        keys = [user_id for user_id in result if user_id is not None]
+        if not keys:
+            return result
+
+        for row in self.db.view('_all_docs', keys=keys):
+            result[row['key']] = exists_in_all_docs(row)
+        return result
@@ -0,0 +1,257 @@
+"""
+Asynchronous implementations of the repo interfaces using CouchDB, over a
+pooled aiohttp client session. aiohttp is an optional dependency, only
+needed once one of these repos is actually used.
+"""
+from urllib.parse import quote
+
+import couchdb
+
+from links.entities import NullBookmark, NullUser
+from links.exceptions import InvalidOperationError, RepositoryError
+from links.logger import get_logger
+from links.repos.couchdb import (
+    BookmarkDocumentMixin,
+    UserDocumentMixin,
+    exists_in_all_docs,
+    json_decoder,
+    json_encoder,
+)
+from links.repos.interfaces import AsyncBookmarkRepo, AsyncUserRepo, SaveResult
+from links.settings import CouchDBSettings
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+LOGGER = get_logger(__name__)
+
+CLIENT_ERRORS = (couchdb.http.HTTPError, OSError)
+if aiohttp is not None:
+    CLIENT_ERRORS += (aiohttp.ClientError,)
+
+# view options CouchDB expects as JSON values
+JSON_OPTIONS = ('key', 'keys', 'startkey', 'endkey')
+
+
+def encode_options(options):
+    params = {}
+    for name, value in options.items():
+        if value is None:
+            continue
+        if name in JSON_OPTIONS or isinstance(value, bool):
+            value = json_encoder(value)
+        params[name] = str(value)
+    return params
+
+
+class AsyncCouchDBMixin:
+    """
+    Shares one keep-alive connection pool per repo, created on first use
+    inside the running event loop.
+    """
+
+    def __init__(self):
+        self.database = CouchDBSettings.DATABASE_NAME
+        self.base_url = '{}/{}/'.format(
+            CouchDBSettings.DATABASE_HOST.rstrip('/'), quote(self.database, safe=''))
+        self._session = None
+
+    def _get_session(self):
+        if aiohttp is None:
+            raise RuntimeError("The async CouchDB repos require aiohttp")
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=CouchDBSettings.POOL_SIZE, ssl=False),
+                auth=aiohttp.BasicAuth(
+                    CouchDBSettings.DATABASE_USER,
+                    CouchDBSettings.DATABASE_PASSWORD),
+                timeout=aiohttp.ClientTimeout(total=CouchDBSettings.REQUEST_TIMEOUT),
+            )
+        return self._session
+
+    async def request(self, method, path, body=None, **options):
+        """
+        Make a request relative to the database URL and return the decoded
+        response body. Errors are raised as couchdb.http exceptions so they
+        can be handled the same way as in the synchronous repos.
+        """
+        data = None
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            data = json_encoder(body)
+            headers['Content-Type'] = 'application/json'
+
+        session = self._get_session()
+        async with session.request(
+                method, self.base_url + path, data=data, headers=headers,
+                params=encode_options(options)) as response:
+            text = await response.text()
+
+        if response.status == 404:
+            raise couchdb.http.ResourceNotFound(path)
+        if response.status == 409:
+            raise couchdb.http.ResourceConflict(path)
+        if response.status >= 400:
+            raise couchdb.http.ServerError((response.status, text))
+        return json_decoder(text) if text else None
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def doc_path(doc_id):
+        return quote(doc_id, safe='')
+
+
+class AsyncCouchDBBookmarkRepo(AsyncCouchDBMixin, BookmarkDocumentMixin, AsyncBookmarkRepo):
+
+    async def save(self, bookmark):
+        """See CouchDBBookmarkRepo.save"""
+        if bookmark.id is None:
+            return
+
+        if bookmark.revision is not None:
+            await self.update(bookmark)
+            return
+
+        try:
+            await self.create(bookmark)
+        except couchdb.http.ResourceConflict:
+            doc = await self.request('GET', self.doc_path(bookmark.id))
+            bookmark.revision = doc['_rev']
+            await self.update(bookmark)
+
+    async def create(self, bookmark):
+        await self._put(bookmark)
+
+    async def update(self, bookmark):
+        if bookmark.revision is None:
+            raise InvalidOperationError(
+                "Cannot update bookmark {} without a revision".format(bookmark.id))
+        try:
+            await self._put(bookmark)
+        except couchdb.http.ResourceConflict:
+            raise RepositoryError(
+                "Bookmark {} was modified by another writer".format(bookmark.id))
+
+    async def _put(self, bookmark):
+        result = await self.request(
+            'PUT', self.doc_path(bookmark.id), body=self.to_doc(bookmark))
+        bookmark.revision = result['rev']
+
+    async def save_many(self, bookmarks, chunk_size=None):
+        """See CouchDBBookmarkRepo.save_many"""
+        if chunk_size is None:
+            chunk_size = CouchDBSettings.BULK_CHUNK_SIZE
+
+        results = []
+        chunk = []
+        for bookmark in bookmarks:
+            if bookmark.id is None:
+                results.append(SaveResult(None, False, 'Bookmark has no id'))
+                continue
+            chunk.append(bookmark)
+            if len(chunk) >= chunk_size:
+                results.extend(await self._bulk_save(chunk))
+                chunk = []
+
+        if chunk:
+            results.extend(await self._bulk_save(chunk))
+
+        return results
+
+    async def _bulk_save(self, bookmarks):
+        try:
+            rows = await self.request(
+                'POST', '_bulk_docs', body={'docs': [self.to_doc(bm) for bm in bookmarks]})
+        except CLIENT_ERRORS as ex:
+            LOGGER.exception("Bulk save of %d docs failed", len(bookmarks))
+            return [SaveResult(bm.id, False, str(ex)) for bm in bookmarks]
+
+        results = []
+        for bookmark, row in zip(bookmarks, rows):
+            if 'error' not in row:
+                bookmark.revision = row['rev']
+                results.append(SaveResult(row['id'], True, None))
+            elif row['error'] == 'conflict':
+                results.append(SaveResult(row['id'], False, 'conflict'))
+            else:
+                results.append(SaveResult(row['id'], False, row.get('reason', row['error'])))
+        return results
+
+    async def get(self, bookmark_id):
+        if bookmark_id is None:
+            return NullBookmark()
+        try:
+            doc = await self.request('GET', self.doc_path(bookmark_id))
+        except couchdb.http.ResourceNotFound:
+            LOGGER.debug('Bookmark %s does not exist', bookmark_id)
+            return NullBookmark()
+        return self.to_entity(doc)
+
+    async def get_by_user(self, user_id, limit=None, after=None):
+        """See CouchDBBookmarkRepo.get_by_user"""
+        opts = self.by_user_options(user_id, after)
+        if limit is not None:
+            opts['limit'] = limit + 1
+        result = await self.request('GET', '_design/bookmarks/_view/by_user', **opts)
+        return self.rows_to_page(result['rows'], limit)
+
+
+class AsyncCouchDBUserRepo(AsyncCouchDBMixin, UserDocumentMixin, AsyncUserRepo):
+
+    async def save(self, user):
+        """See CouchDBUserRepo.save"""
+        try:
+            await self.request('PUT', self.doc_path(user.id), body=self.to_doc(user))
+        except couchdb.http.ResourceConflict:
+            LOGGER.info("User %s already exists.", user.id)
+
+    async def get(self, user_id):
+        doc = await self._get_doc(user_id)
+        if doc is None:
+            return NullUser()
+        return self.to_entity(doc)
+
+    async def get_password_hash(self, user_id):
+        doc = await self._get_doc(user_id)
+        if doc is None:
+            return ''
+        return doc.get('password_hash', '')
+
+    async def exists(self, user_id):
+        if user_id is None:
+            return False
+        try:
+            await self.request('HEAD', self.doc_path(user_id))
+        except couchdb.http.ResourceNotFound:
+            return False
+        return True
+
+    async def exists_many(self, user_ids):
+        """See CouchDBUserRepo.exists_many"""
+        user_ids = list(user_ids)
+        result = dict.fromkeys(user_ids, False)
+        keys = [user_id for user_id in result if user_id is not None]
+        if not keys:
+            return result
+
+        response = await self.request('POST', '_all_docs', body={'keys': keys})
+        for row in response['rows']:
+            result[row['key']] = exists_in_all_docs(row)
+        return result
+
+    async def _get_doc(self, user_id):
+        if user_id is None:
+            return None
+        try:
+            return await self.request('GET', self.doc_path(user_id))
+        except couchdb.http.ResourceNotFound:
+            LOGGER.debug("User id %s not found", user_id)
+            return None
@@ -0,0 +1,164 @@
+"""
+Follows the CouchDB _changes feed so caches in every worker process learn
+about writes made by the others.
+
+A ChangesFollower long-polls the feed on a background thread and calls each
+subscriber with a Change per updated document. The feed is read without
+documents; each change's type and owner come from the changes/summary view
+in links.repos.couchdb.DESIGN_DOCS instead. The last sequence seen is
+written to a SequenceStore after every batch, so a restarted follower picks
+up where it stopped instead of missing writes or replaying the whole feed.
+"""
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+from links.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+# type and owner are the document's type and user_id, or None when they
+# aren't known, as for deleted documents
+Change = namedtuple('Change', ['seq', 'id', 'deleted', 'type', 'owner'])
+
+
+class MemorySequenceStore:
+    """Keeps the sequence for the life of the process only"""
+
+    def __init__(self, since=None):
+        self.since = since
+
+    def load(self):
+        return self.since
+
+    def save(self, since):
+        self.since = since
+
+
+class FileSequenceStore:
+    """Persists the sequence in a file, replaced atomically on each save"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as fh:
+                return fh.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save(self, since):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.since-')
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                fh.write(str(since))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+class ChangesFollower:
+    """
+    Publishes the changes of a couchdb.Database to subscribers.
+
+    With nothing persisted yet the follower starts from 'now': a process
+    that has just started has nothing cached, so earlier changes can't make
+    anything stale.
+    """
+
+    def __init__(self, db, store=None, poll_timeout=30, batch_size=500, retry_delay=5,
+                 summary_view='changes/summary'):
+        self.db = db
+        self.summary_view = summary_view
+        self.store = store if store is not None else MemorySequenceStore()
+        self.poll_timeout = poll_timeout
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.since = self.store.load() or 'now'
+        self._subscribers = []
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """Call callback(change) for every change from now on"""
+        self._subscribers.append(callback)
+
+    def poll(self, timeout=None):
+        """
+        Fetch one batch of changes, waiting up to timeout seconds for one to
+        arrive, and publish them. Return the number of changes published.
+        """
+        if timeout is None:
+            timeout = self.poll_timeout
+        data = self.db.changes(
+            feed='longpoll',
+            since=self.since,
+            timeout=int(timeout * 1000),
+            limit=self.batch_size,
+        )
+        results = data.get('results', [])
+        summaries = self.summarise(
+            [row['id'] for row in results if not row.get('deleted', False)])
+        for row in results:
+            doc_type, owner = summaries.get(row['id'], (None, None))
+            self.publish(Change(
+                seq=row.get('seq'),
+                id=row['id'],
+                deleted=row.get('deleted', False),
+                type=doc_type,
+                owner=owner,
+            ))
+
+        self.since = data.get('last_seq', self.since)
+        self.store.save(self.since)
+        return len(results)
+
+    def summarise(self, ids):
+        """
+        Map ids to (type, owner) tuples from the summary view. Ids missing
+        from the result, because the view isn't installed or the read
+        failed, publish as unknown, which the caches treat as "could be
+        anything".
+        """
+        if not ids or self.summary_view is None:
+            return {}
+        try:
+            rows = self.db.view(self.summary_view, keys=ids)
+            return {row.id: tuple(row.value) for row in rows}
+        except Exception:
+            LOGGER.exception("Reading %s for %d changes failed", self.summary_view, len(ids))
+            return {}
+
+    def publish(self, change):
+        for callback in self._subscribers:
+            try:
+                callback(change)
+            except Exception:
+                LOGGER.exception("Change subscriber %r failed on %s", callback, change.id)
+
+    def run(self):
+        """Poll until stop() is called, backing off when CouchDB is unreachable"""
+        LOGGER.info("Following changes of %s since %s", self.db.name, self.since)
+        while not self._stopping.is_set():
+            try:
+                self.poll()
+            except Exception:
+                LOGGER.exception("Reading the changes feed failed")
+                self._stopping.wait(self.retry_delay)
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self.run, name='links-changes', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop after the current long-poll returns"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,224 @@
+"""
+Tracing of the HTTP requests the CouchDB repos make.
+
+TracedResource is the couchdb-python Resource the ConnectionManager uses
+when CouchDBSettings.TRACE_REQUESTS is set. Every request it sends is
+timed, counted against the traced repo call and the instrumented request
+(see links.instrumentation) it was made for, and logged to the slow query
+log when it takes longer than CouchDBSettings.SLOW_QUERY_MS:
+
+    Slow CouchDB request: GET links/_design/bookmarks/_view/by_user
+    view=bookmarks/by_user startkey=["bob",{}] endkey=["bob"] limit=26
+    rows=26 status=200 took=812.4ms
+
+_changes long-polls wait on purpose, so they are counted but never logged
+as slow.
+
+TracedRepo wraps a repo and logs the number of requests each method call
+makes at debug, and warns when a call makes more than
+CouchDBSettings.MAX_REQUESTS_PER_CALL, which is how N+1 access patterns
+show up. The count per use case invocation is only reported when
+Settings.INSTRUMENTATION is also set and the controller is wrapped with
+links.instrumentation.instrument().
+"""
+import contextvars
+import inspect
+import threading
+from time import perf_counter
+from urllib.parse import urlsplit
+
+import couchdb
+
+from links import instrumentation
+from links.logger import get_logger
+from links.settings import CouchDBSettings
+
+LOGGER = get_logger(__name__)
+
+# view options worth logging; the rest are paging details
+KEY_OPTIONS = (
+    'key', 'startkey', 'endkey', 'startkey_docid', 'limit', 'skip', 'descending', 'feed',
+)
+# feeds that hold the request open until something changes
+WAITING_FEEDS = ('longpoll', 'continuous', 'eventsource')
+
+# the RequestStats of the traced repo call being made, if any
+_current_stats = contextvars.ContextVar('links_couchdb_requests', default=None)
+
+
+class RequestStats:
+    """The number and total time of the requests made for one repo call"""
+
+    def __init__(self):
+        self.requests = 0
+        self.wall = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, wall):
+        with self._lock:
+            self.requests += 1
+            self.wall += wall
+
+
+def describe_request(method, url, params, body=None, status=None, rows=None, wall=None):
+    """
+    The slow query log's fields for one request: its method and path, the
+    view name, the key range options, the number of keys posted, the rows
+    returned and how long it took in milliseconds.
+    """
+    path = urlsplit(url).path.lstrip('/')
+    fields = {'method': method, 'path': path}
+    if '/_view/' in path:
+        design, _, view = path.partition('/_design/')[2].partition('/_view/')
+        fields['view'] = '{}/{}'.format(design, view)
+    elif path.endswith('/_all_docs'):
+        fields['view'] = '_all_docs'
+    for name in KEY_OPTIONS:
+        if name in params:
+            fields[name] = params[name]
+    if isinstance(body, dict) and 'keys' in body:
+        fields['keys'] = len(body['keys'])
+    if status is not None:
+        fields['status'] = status
+    if rows is not None:
+        fields['rows'] = rows
+    if wall is not None:
+        fields['took_ms'] = round(wall * 1000, 1)
+    return fields
+
+
+def count_rows(data):
+    """The rows in a view result or a _bulk_docs reply, else None"""
+    if isinstance(data, dict) and 'rows' in data:
+        return len(data['rows'])
+    if isinstance(data, list):
+        return len(data)
+    return None
+
+
+def record_request(fields, wall, slow_ms=None):
+    """Count a finished request and log it if it was slow"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add(wall)
+    trace = instrumentation.current_trace()
+    if trace is not None:
+        trace.add_db_request(wall)
+
+    if slow_ms is None:
+        slow_ms = CouchDBSettings.SLOW_QUERY_MS
+    if fields.get('feed') in WAITING_FEEDS:
+        return
+    if slow_ms > 0 and wall * 1000 >= slow_ms:
+        details = ' '.join(
+            '{}={}'.format(name, value) for name, value in fields.items()
+            if name not in ('method', 'path', 'took_ms')
+        )
+        LOGGER.warning(
+            "Slow CouchDB request: %s %s %s took=%.1fms",
+            fields['method'], fields['path'], details, wall * 1000,
+            extra={'couchdb_request': fields},
+        )
+
+
+class TracedResource(couchdb.http.Resource):
+    """
+    A Resource that times each request it sends. Resources derived from it,
+    such as database and view handles, are TracedResources too.
+    """
+
+    def _request(self, method, path=None, body=None, headers=None, **params):
+        start = perf_counter()
+        status = None
+        try:
+            status, headers, data = couchdb.http.Resource._request(
+                self, method, path, body=body, headers=headers, **params)
+            return status, headers, data
+        except couchdb.http.HTTPError as ex:
+            status = _error_status(ex)
+            raise
+        finally:
+            self._record(method, path, params, body, status, None, perf_counter() - start)
+
+    def _request_json(self, method, path=None, body=None, headers=None, **params):
+        # the same as Resource._request_json, but timed including the read
+        # and decode of the body, and with the rows counted
+        start = perf_counter()
+        status = rows = None
+        try:
+            status, headers, data = couchdb.http.Resource._request(
+                self, method, path, body=body, headers=headers, **params)
+            if 'application/json' in headers.get('content-type', ''):
+                data = couchdb.json.decode(data.read().decode('utf-8'))
+                rows = count_rows(data)
+            return status, headers, data
+        except couchdb.http.HTTPError as ex:
+            status = _error_status(ex)
+            raise
+        finally:
+            self._record(method, path, params, body, status, rows, perf_counter() - start)
+
+    def _record(self, method, path, params, body, status, rows, wall):
+        url = self.url if path is None else couchdb.http.urljoin(self.url, path)
+        record_request(
+            describe_request(method, url, params, body, status, rows, wall), wall)
+
+
+def _error_status(ex):
+    # couchdb-python raises e.g. ResourceNotFound(('not_found', 'missing')),
+    # only ServerError carries the status
+    if isinstance(ex, couchdb.http.ServerError):
+        return ex.args[0][0]
+    return {
+        couchdb.http.ResourceNotFound: 404,
+        couchdb.http.ResourceConflict: 409,
+        couchdb.http.PreconditionFailed: 412,
+        couchdb.http.Unauthorized: 401,
+    }.get(type(ex), 'error')
+
+
+class TracedRepo(instrumentation.Proxy):
+    """Counts the requests each call on a CouchDB repo makes"""
+
+    def __init__(self, target, name, max_requests=None):
+        super().__init__(target)
+        if max_requests is None:
+            max_requests = CouchDBSettings.MAX_REQUESTS_PER_CALL
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_max_requests', max_requests)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        # generators make their requests after the call returns
+        if name.startswith('_') or not callable(attr) or inspect.isgeneratorfunction(attr):
+            return attr
+
+        method = '{}.{}'.format(self._name, name)
+
+        def traced(*args, **kwargs):
+            if _current_stats.get() is not None:
+                # counted by the outer call
+                return attr(*args, **kwargs)
+            stats = RequestStats()
+            token = _current_stats.set(stats)
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                _current_stats.reset(token)
+                self._check(method, stats)
+        return traced
+
+    def _check(self, method, stats):
+        LOGGER.debug(
+            "%s made %d CouchDB requests in %.1fms",
+            method, stats.requests, stats.wall * 1000)
+        if self._max_requests > 0 and stats.requests > self._max_requests:
+            LOGGER.warning(
+                "%s made %d CouchDB requests in %.1fms",
+                method, stats.requests, stats.wall * 1000,
+                extra={'couchdb_calls': {
+                    'method': method,
+                    'requests': stats.requests,
+                    'took_ms': round(stats.wall * 1000, 1),
+                }},
+            )
@@ -2,73 +2,213 @@
 In-memory implementations of repository interfaces.
 These should only be used for testing or demonstration purposes.
 """
-
-from links.repos.interfaces import BookmarkRepo, UserRepo
+import bisect
+from datetime import datetime
+
+from links import paging
+from links.batch import BookmarkBatch
+from links.repos.interfaces import (
+    AsyncBookmarkRepo,
+    AsyncUserRepo,
+    BookmarkRepo,
+    SaveResult,
+    UserRepo,
+)
 from links.entities import Bookmark, User, NullUser, NullBookmark
+from links.exceptions import ValidationError
 
 
 class MemoryBookmarkRepo(BookmarkRepo):
+    """
+    Bookmarks are stored in a dict keyed by bookmark id. A secondary index
+    maps each user id to a list of (date_created, bookmark_id) keys kept in
+    sorted order, so listing a user's bookmarks never scans other users' data.
+
+    Revisions are tracked like CouchDB's, so save_many reports the same
+    conflicts: get() returns bookmarks with their revision, get_by_user()
+    without one.
+    """
 
     def __init__(self):
-        self._data = []
+        self._data = {}
+        self._by_user = {}
+        self._revisions = {}
+
+    def to_entity(self, doc):
+        return Bookmark(
+            doc['id'],
+            doc['user_id'],
+            doc['name'],
+            doc['url'],
+            date_created=doc['date_created']
+        )
 
     def save(self, bookmark):
         if bookmark.id is None:
             return
-        self._data.append(bookmark.as_dict())
+
+        previous = self._data.get(bookmark.id)
+        if previous is not None:
+            self._unindex(previous)
+
+        doc = bookmark.as_dict()
+        self._data[bookmark.id] = doc
+        self._index(doc)
+        generation = int(self._revisions.get(bookmark.id, '0-').split('-')[0]) + 1
+        bookmark.revision = self._revisions[bookmark.id] = '{}-memory'.format(generation)
+
+    def save_many(self, bookmarks):
+        results = []
+        for bookmark in bookmarks:
+            if bookmark.id is None:
+                results.append(SaveResult(None, False, 'Bookmark has no id'))
+            elif bookmark.revision != self._revisions.get(bookmark.id):
+                results.append(SaveResult(bookmark.id, False, 'conflict'))
+            else:
+                self.save(bookmark)
+                results.append(SaveResult(bookmark.id, True, None))
+        return results
+
+    def delete(self, bookmark_id):
+        doc = self._data.pop(bookmark_id, None)
+        self._revisions.pop(bookmark_id, None)
+        if doc is not None:
+            self._unindex(doc)
 
     def get(self, bookmark_id):
-        docs = [x for x in self._data if x['id'] == bookmark_id]
-
-        if docs:
-            doc = docs[0]
-            return Bookmark(
-                doc['id'],
-                doc['user_id'],
-                doc['name'],
-                doc['url'],
-                date_created=doc['date_created']
-            )
-        return NullBookmark()
-
-    def get_by_user(self, user_id, limit=None):
-        docs = [doc for doc in self._data if doc['user_id'] == user_id]
-        entities = [
-            Bookmark(
-                doc['id'],
-                doc['user_id'],
-                doc['name'],
-                doc['url']
-            ) for doc in docs
-        ]
-
-        return sorted(entities, key=lambda x: x.date_created)
+        doc = self._data.get(bookmark_id)
+        if doc is None:
+            return NullBookmark()
+        bookmark = self.to_entity(doc)
+        bookmark.revision = self._revisions[bookmark_id]
+        return bookmark
+
+    def get_by_user(self, user_id, limit=None, after=None):
+        keys, next_cursor = self._page_keys(user_id, limit, after)
+        return paging.Page(
+            [self.to_entity(self._data[bookmark_id]) for _, bookmark_id in keys],
+            next_cursor
+        )
+
+    def get_batch_by_user(self, user_id, limit=None, after=None):
+        keys, next_cursor = self._page_keys(user_id, limit, after)
+        batch = BookmarkBatch(user_id, next_cursor=next_cursor)
+        for _, bookmark_id in keys:
+            doc = self._data[bookmark_id]
+            batch.append(doc['id'], doc['name'], doc['url'], doc['date_created'])
+        return batch
+
+    def _page_keys(self, user_id, limit, after):
+        """
+        Return the keys of a page, newest first like the CouchDB repo, and
+        the next cursor
+        """
+        keys = self._by_user.get(user_id, [])
+
+        end = len(keys)
+        if after is not None:
+            date_created, bookmark_id = paging.decode_cursor(after)
+            try:
+                key = (datetime.fromisoformat(date_created), bookmark_id)
+            except (TypeError, ValueError):
+                raise ValidationError("Invalid cursor: {!r}".format(after))
+            end = bisect.bisect_right(keys, key)
+
+        start = 0
+        if limit is not None:
+            start = max(end - limit, 0)
+
+        next_cursor = None
+        if start > 0:
+            next_cursor = paging.encode_cursor(*keys[start - 1])
+
+        return keys[start:end][::-1], next_cursor
+
+    def _index(self, doc):
+        keys = self._by_user.setdefault(doc['user_id'], [])
+        bisect.insort(keys, (doc['date_created'], doc['id']))
+
+    def _unindex(self, doc):
+        keys = self._by_user[doc['user_id']]
+        key = (doc['date_created'], doc['id'])
+        keys.pop(bisect.bisect_left(keys, key))
+        if not keys:
+            del self._by_user[doc['user_id']]
 
 
 class MemoryUserRepo(UserRepo):
 
     def __init__(self):
-        self._data = []
+        self._data = {}
 
     def save(self, user):
-        self._data.append({
+        self._data[user.id] = {
             'id': user.id,
             'password_hash': user.password_hash
-        })
+        }
 
     def get(self, user_id):
-        docs = [doc for doc in self._data if doc['id'] == user_id]
-        if docs:
-            user = User(docs[0]['id'])
-            user.password_hash = docs[0]['password_hash']
-            return user
+        doc = self._data.get(user_id)
+        if doc is None:
+            return NullUser()
 
-        return NullUser()
+        user = User(doc['id'])
+        user.password_hash = doc['password_hash']
+        return user
 
     def exists(self, user_id):
-        user = self.get(user_id)
-        return user.id is not None
+        return user_id in self._data
+
+    def exists_many(self, user_ids):
+        return {user_id: user_id in self._data for user_id in user_ids}
 
     def get_password_hash(self, user_id):
-        user = self.get(user_id)
-        return user.password_hash
+        doc = self._data.get(user_id)
+        if doc is None:
+            return None
+        return doc['password_hash']
+
+
+class AsyncMemoryBookmarkRepo(AsyncBookmarkRepo):
+    """Coroutine interface over a MemoryBookmarkRepo, sharing its storage"""
+
+    def __init__(self, repo=None):
+        if repo is None:
+            repo = MemoryBookmarkRepo()
+        self._repo = repo
+
+    async def save(self, bookmark):
+        self._repo.save(bookmark)
+
+    async def save_many(self, bookmarks):
+        return self._repo.save_many(bookmarks)
+
+    async def get(self, bookmark_id):
+        return self._repo.get(bookmark_id)
+
+    async def get_by_user(self, user_id, limit=None, after=None):
+        return self._repo.get_by_user(user_id, limit=limit, after=after)
+
+
+class AsyncMemoryUserRepo(AsyncUserRepo):
+    """Coroutine interface over a MemoryUserRepo, sharing its storage"""
+
+    def __init__(self, repo=None):
+        if repo is None:
+            repo = MemoryUserRepo()
+        self._repo = repo
+
+    async def save(self, user):
+        self._repo.save(user)
+
+    async def get(self, user_id):
+        return self._repo.get(user_id)
+
+    async def exists(self, user_id):
+        return self._repo.exists(user_id)
+
+    async def exists_many(self, user_ids):
+        return self._repo.exists_many(user_ids)
+
+    async def get_password_hash(self, user_id):
+        return self._repo.get_password_hash(user_id)
@@ -1,7 +1,15 @@
 import abc
+from collections import namedtuple
+
+from links.batch import BookmarkBatch
 
 # TODO: make create and update distinct functions. Don't have save() do both.
 
+# The outcome of storing one bookmark in a bulk write. ``error`` is None on
+# success, 'conflict' when the stored document changed underneath us, or a
+# description of any other failure.
+SaveResult = namedtuple('SaveResult', ['bookmark_id', 'ok', 'error'])
+
 
 class BookmarkRepo(metaclass=abc.ABCMeta):
 
@@ -9,14 +17,56 @@ class BookmarkRepo(metaclass=abc.ABCMeta):
     def save(self, bookmark):
         pass
 
+    @abc.abstractmethod
+    def save_many(self, bookmarks):
+        """
+        Store an iterable of bookmarks, returning a SaveResult for each, in
+        order. A bookmark without a revision is created; one with a
+        revision replaces that revision of the stored bookmark. Any other
+        write fails with the error 'conflict' and changes nothing. That
+        includes an existing id without its current revision, and a second
+        bookmark with the same id in one call. Saved bookmarks get their
+        new revision.
+        """
+        pass
+
+    @abc.abstractmethod
+    def delete(self, bookmark_id):
+        pass
+
     @abc.abstractmethod
     def get(self, bookmark_id):
         pass
 
     @abc.abstractmethod
-    def get_by_user(self, user_id, limit=100):
+    def get_by_user(self, user_id, limit=100, after=None):
+        """
+        Return a links.paging.Page of at most limit bookmarks, starting at
+        the cursor given by after. Page.next_cursor fetches the next page.
+        """
         pass
 
+    def get_batch_by_user(self, user_id, limit=None, after=None):
+        """
+        get_by_user, returned as a columnar links.batch.BookmarkBatch. Repos
+        that can fill the columns without building entities override this.
+        """
+        return BookmarkBatch.from_entities(
+            user_id, self.get_by_user(user_id, limit=limit, after=after))
+
+    def iter_by_user(self, user_id, batch_size=1000):
+        """
+        Lazily yield all of a user's bookmarks, fetching batch_size at a time,
+        so callers never hold more than one batch in memory.
+        """
+        after = None
+        while True:
+            page = self.get_by_user(user_id, limit=batch_size, after=after)
+            yield from page
+            if page.next_cursor is None:
+                return
+            after = page.next_cursor
+
 
 class UserRepo(metaclass=abc.ABCMeta):
 
@@ -32,6 +82,73 @@ class UserRepo(metaclass=abc.ABCMeta):
     def exists(self, user_id):
         pass
 
+    @abc.abstractmethod
+    def exists_many(self, user_ids):
+        """Return a dict mapping each of user_ids to whether the user exists"""
+        pass
+
     @abc.abstractmethod
     def get_password_hash(self, user_id):
         pass
+
+
+class AsyncBookmarkRepo(metaclass=abc.ABCMeta):
+    """Coroutine counterpart of BookmarkRepo, for use from an event loop"""
+
+    @abc.abstractmethod
+    async def save(self, bookmark):
+        pass
+
+    @abc.abstractmethod
+    async def save_many(self, bookmarks):
+        pass
+
+    @abc.abstractmethod
+    async def get(self, bookmark_id):
+        pass
+
+    @abc.abstractmethod
+    async def get_by_user(self, user_id, limit=100, after=None):
+        pass
+
+    async def iter_by_user(self, user_id, batch_size=1000):
+        after = None
+        while True:
+            page = await self.get_by_user(user_id, limit=batch_size, after=after)
+            for bookmark in page:
+                yield bookmark
+            if page.next_cursor is None:
+                return
+            after = page.next_cursor
+
+    async def close(self):
+        """Release any connections held by the repo"""
+        pass
+
+
+class AsyncUserRepo(metaclass=abc.ABCMeta):
+    """Coroutine counterpart of UserRepo, for use from an event loop"""
+
+    @abc.abstractmethod
+    async def save(self, user):
+        pass
+
+    @abc.abstractmethod
+    async def get(self, user_id):
+        pass
+
+    @abc.abstractmethod
+    async def exists(self, user_id):
+        pass
+
+    @abc.abstractmethod
+    async def exists_many(self, user_ids):
+        pass
+
+    @abc.abstractmethod
+    async def get_password_hash(self, user_id):
+        pass
+
+    async def close(self):
+        """Release any connections held by the repo"""
+        pass
@@ -5,35 +5,155 @@ hash = PASSWORD_CTX.encrypt('123')
 
 PASSWORD_CTX.verify('123', hash)
 >>> True
+
+Hashing runs on the calling thread unless a process pool has been set up
+with configure_hashing_pool(), in which case create_password_hash and
+check_password hand the work to the pool and wait for the result.
 """
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
 from passlib.context import CryptContext
 
+from links.exceptions import HashingPoolBusy
 
-CONTEXT = {
-    'PASSWORD_CTX': CryptContext(
+DEFAULT_ROUNDS = 100000
+
+
+def _make_context(rounds):
+    return CryptContext(
         schemes=['pbkdf2_sha256'],
         default='pbkdf2_sha256',
-        pbkdf2_sha256__default_rounds=100000)
+        pbkdf2_sha256__default_rounds=rounds)
+
+
+CONTEXT = {
+    'PASSWORD_CTX': _make_context(DEFAULT_ROUNDS),
+    'ROUNDS': DEFAULT_ROUNDS,
+    'POOL': None,
 }
 
 
 def lower_rounds():
     """For unit testing (less rounds, faster)"""
-    CONTEXT['PASSWORD_CTX'] = CryptContext(
-        schemes=['pbkdf2_sha256'],
-        default='pbkdf2_sha256',
-        pbkdf2_sha256__default_rounds=1)
+    CONTEXT['PASSWORD_CTX'] = _make_context(1)
+    CONTEXT['ROUNDS'] = 1
+
+
+class HashingPool:
+    """
+    A process pool for password hashing. At most max_pending jobs may be
+    queued or running at once; submitting another waits up to timeout
+    seconds (forever if None) for a slot and then raises HashingPoolBusy,
+    so a login storm is pushed back onto callers instead of piling up.
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(CONTEXT['ROUNDS'],))
+        if max_pending is None:
+            max_pending = workers * 4
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.timeout = timeout
+
+    def submit(self, fn, *args, block=True):
+        """
+        Run fn(*args) in a worker and return its future. With block=False
+        a full pool raises HashingPoolBusy at once, which is what callers
+        running inside an event loop need.
+        """
+        if block:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            raise HashingPoolBusy("Password hashing pool is at capacity")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def _init_worker(rounds):
+    CONTEXT['PASSWORD_CTX'] = _make_context(rounds)
+    CONTEXT['ROUNDS'] = rounds
+
+
+def configure_hashing_pool(workers=None, max_pending=None, timeout=None):
+    """Hash passwords in a pool of worker processes from now on"""
+    shutdown_hashing_pool()
+    CONTEXT['POOL'] = HashingPool(workers, max_pending, timeout)
+    return CONTEXT['POOL']
+
+
+def shutdown_hashing_pool():
+    """Go back to hashing on the calling thread"""
+    pool, CONTEXT['POOL'] = CONTEXT['POOL'], None
+    if pool is not None:
+        pool.shutdown()
+
+
+def submit_password_hash(password):
+    """Return a future of create_password_hash(password), run by the pool"""
+    return CONTEXT['POOL'].submit(_hash_password, password)
+
+
+def submit_check_password(password, password_hash):
+    """Return a future of check_password(password, hash), run by the pool"""
+    return CONTEXT['POOL'].submit(_check_password, password, password_hash)
+
+
+async def create_password_hash_async(password):
+    """create_password_hash without blocking the running event loop"""
+    return await _run_async(_hash_password, password)
+
+
+async def check_password_async(password, password_hash):
+    """check_password without blocking the running event loop"""
+    return await _run_async(_check_password, password, password_hash)
+
+
+async def _run_async(fn, *args):
+    pool = CONTEXT['POOL']
+    if pool is not None:
+        return await asyncio.wrap_future(pool.submit(fn, *args, block=False))
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
 
 
 def create_password_hash(password):
     """
     """
-    return CONTEXT['PASSWORD_CTX'].hash(password)
+    if CONTEXT['POOL'] is not None:
+        return submit_password_hash(password).result()
+    return _hash_password(password)
 
 
 def check_password(password, password_hash):
     """
     """
+    if CONTEXT['POOL'] is not None:
+        return submit_check_password(password, password_hash).result()
+    return _check_password(password, password_hash)
+
+
+def _hash_password(password):
+    return CONTEXT['PASSWORD_CTX'].hash(password)
+
+
+def _check_password(password, password_hash):
     try:
         verified = CONTEXT['PASSWORD_CTX'].verify(password, password_hash)
     except TypeError:
@@ -6,8 +6,39 @@ import os
 
 class Settings:
     BOOKMARK_LIST_FILTERS = {'everything': 10000, 'recent': 25}
+    BOOKMARK_PAGE_SIZE = int(os.environ.get('LINKS_BOOKMARK_PAGE_SIZE', 25))
     DATABASE_PLUGIN = os.environ.get('LINKS_DATABASE_PLUGIN')
     LOGGING_LEVEL = int(os.environ.get('LINKS_LOGGING_LEVEL', 20))  # info
+    # text, or json for one JSON object per line
+    LOGGING_FORMAT = os.environ.get('LINKS_LOGGING_FORMAT', 'text')
+    # records buffered for a background writer thread; 0 writes them as
+    # they're logged. A full queue drops new records, or with 'block' waits
+    LOGGING_QUEUE_SIZE = int(os.environ.get('LINKS_LOGGING_QUEUE_SIZE', 0))
+    LOGGING_QUEUE_OVERFLOW = os.environ.get('LINKS_LOGGING_QUEUE_OVERFLOW', 'drop')
+    # keep 1 in n of each message at or below the sample level; 1 keeps all
+    LOGGING_SAMPLE_EVERY = int(os.environ.get('LINKS_LOGGING_SAMPLE_EVERY', 1))
+    LOGGING_SAMPLE_LEVEL = int(os.environ.get('LINKS_LOGGING_SAMPLE_LEVEL', 20))
+    # 0 hashes passwords on the calling thread
+    PASSWORD_HASH_WORKERS = int(os.environ.get('LINKS_PASSWORD_HASH_WORKERS', 0))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('LINKS_PASSWORD_HASH_MAX_PENDING', 64))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('LINKS_PASSWORD_HASH_TIMEOUT', 5))
+    # threads used to overlap independent repo reads; 0 runs them in order
+    REPO_READ_WORKERS = int(os.environ.get('LINKS_REPO_READ_WORKERS', 0))
+    # users kept in the read-through user cache; 0 disables it
+    USER_CACHE_SIZE = int(os.environ.get('LINKS_USER_CACHE_SIZE', 0))
+    USER_CACHE_TTL = float(os.environ.get('LINKS_USER_CACHE_TTL', 60))
+    USER_CACHE_NEGATIVE_TTL = float(os.environ.get('LINKS_USER_CACHE_NEGATIVE_TTL', 5))
+    # bookmarks and bookmark list pages kept in the read-through bookmark
+    # cache; a size of 0 disables it, max bytes of 0 leaves it uncapped
+    BOOKMARK_CACHE_SIZE = int(os.environ.get('LINKS_BOOKMARK_CACHE_SIZE', 0))
+    BOOKMARK_PAGE_CACHE_SIZE = int(os.environ.get('LINKS_BOOKMARK_PAGE_CACHE_SIZE', 1024))
+    BOOKMARK_CACHE_MAX_BYTES = int(os.environ.get('LINKS_BOOKMARK_CACHE_MAX_BYTES', 0))
+    BOOKMARK_CACHE_TTL = float(os.environ.get('LINKS_BOOKMARK_CACHE_TTL', 300))
+    # per-stage request timings: histogram, statsd or log; empty is off
+    INSTRUMENTATION = os.environ.get('LINKS_INSTRUMENTATION', '')
+    STATSD_HOST = os.environ.get('LINKS_STATSD_HOST', '127.0.0.1')
+    STATSD_PORT = int(os.environ.get('LINKS_STATSD_PORT', 8125))
+    STATSD_PREFIX = os.environ.get('LINKS_STATSD_PREFIX', 'links')
 
 
 class CouchDBSettings(Settings):
@@ -15,3 +46,21 @@ class CouchDBSettings(Settings):
     DATABASE_USER = os.environ.get('LINKS_DATABASE_USER', 'NOTSET')
     DATABASE_PASSWORD = os.environ.get('LINKS_DATABASE_PASSWORD', 'NOTSET')
     DATABASE_HOST = os.environ.get('LINKS_DATABASE_HOST', 'NOTSET')
+    BULK_CHUNK_SIZE = int(os.environ.get('LINKS_BULK_CHUNK_SIZE', 500))
+    POOL_SIZE = int(os.environ.get('LINKS_COUCHDB_POOL_SIZE', 100))
+    KEEP_ALIVE = int(os.environ.get('LINKS_COUCHDB_KEEP_ALIVE', 1))
+    CONNECT_TIMEOUT = float(os.environ.get('LINKS_COUCHDB_CONNECT_TIMEOUT', 5))
+    REQUEST_TIMEOUT = float(os.environ.get('LINKS_COUCHDB_REQUEST_TIMEOUT', 30))
+    # json, orjson or ujson
+    JSON_BACKEND = os.environ.get('LINKS_COUCHDB_JSON_BACKEND', 'json')
+    # follow the _changes feed to keep caches coherent across processes
+    FOLLOW_CHANGES = int(os.environ.get('LINKS_COUCHDB_FOLLOW_CHANGES', 0))
+    # file the last seen change sequence is kept in; empty keeps it in memory
+    CHANGES_SINCE_FILE = os.environ.get('LINKS_COUCHDB_CHANGES_SINCE_FILE', '')
+    # time and count every request, see links.repos.couchdb_tracing; counts
+    # per use case invocation also need Settings.INSTRUMENTATION
+    TRACE_REQUESTS = int(os.environ.get('LINKS_COUCHDB_TRACE_REQUESTS', 0))
+    # requests slower than this are logged; 0 disables the slow query log
+    SLOW_QUERY_MS = float(os.environ.get('LINKS_COUCHDB_SLOW_QUERY_MS', 500))
+    # repo calls making more requests than this are logged; 0 disables it
+    MAX_REQUESTS_PER_CALL = int(os.environ.get('LINKS_COUCHDB_MAX_REQUESTS_PER_CALL', 10))
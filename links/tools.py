@@ -2,20 +2,28 @@
 
 """
 import argparse
-import dateutil.parser
+import contextlib
+import gzip
+import io
+import itertools
 import json
+import re
 import sys
 
 from links.usecases.interfaces import View
-from links.usecases import create_bookmark
 from links.usecases.create_user import CreateUserUseCase, CreateUserController, CreateUserPresenter
+from links.usecases import import_bookmarks as import_bookmarks_uc
 from links.usecases import list_bookmarks
 from links.logger import get_logger
-from links.context import init_context
+from links import instrumentation
+from links.context import context, init_context
+from links.repos import couchdb
+from links.settings import Settings
 
 LOGGER = get_logger(__name__)
 USUCCESS = "\u2713"
 UFAILURE = "\u2717"
+ARRAY_SEPARATOR = re.compile(r'[\s,]*')
 
 
 class CreateUserConsoleView(View):
@@ -33,52 +41,237 @@ class CreateUserConsoleView(View):
             UFAILURE, view_model['username'], '\n'.join(errors))
 
 
+class ImportBookmarksConsoleView(View):
+
+    def generate_view(self, view_model):
+        template = (
+            "\n{} Imported {} bookmarks in {}s ({} records/sec)."
+            "\n{} invalid, {} failed to save."
+        )
+        output = template.format(
+            USUCCESS if view_model['success'] else UFAILURE,
+            view_model['imported'],
+            view_model['seconds'],
+            view_model['records_per_second'],
+            view_model['invalid'],
+            view_model['failed'],
+        )
+        errors = ['{}: {}'.format(record, errors) for record, errors in view_model['errors']]
+        if errors:
+            output += "\nErrors:\n" + '\n'.join(errors)
+        return output
+
+
 class ListBookmarksConsoleView(View):
 
     def generate_view(self, view_model):
-        return json.dumps(view_model, indent=True)
+        if hasattr(view_model, 'as_dicts'):
+            return json.dumps(view_model.as_dicts(), indent=True)
+        return json.dumps([vm.as_dict() for vm in view_model], indent=True)
+
+
+class StreamBookmarksConsoleView(View):
+    """Renders a JSON array one element at a time"""
+
+    def generate_view(self, view_model):
+        yield '['
+        separator = '\n'
+        for vm in view_model:
+            yield separator + json.dumps(vm.as_dict())
+            separator = ',\n'
+        yield '\n]\n'
+
+
+class StreamBookmarksJSONLinesView(View):
+    """Renders one JSON document per line"""
+
+    def generate_view(self, view_model):
+        for vm in view_model:
+            yield json.dumps(vm.as_dict()) + '\n'
+
+
+EXPORT_VIEWS = {
+    'json': StreamBookmarksConsoleView,
+    'jsonl': StreamBookmarksJSONLinesView,
+}
 
 
 def create_user(args):
-    controller = CreateUserController(
+    controller = instrumentation.instrument(CreateUserController(
         CreateUserUseCase(),
         CreateUserPresenter(),
         CreateUserConsoleView()
-    )
+    ), context.metrics_sink)
     print(controller.handle({'username': args.username, 'password': args.password}))
 
 
-def export_bookmarks(args):
-    controller = list_bookmarks.ListBookmarksController(
+@contextlib.contextmanager
+def open_output(path=None, compress=False):
+    """
+    Open a text stream for writing to path, or to stdout when path is None
+    or '-', optionally gzip compressed.
+    """
+    to_stdout = path in (None, '-')
+
+    if not compress:
+        if to_stdout:
+            yield sys.stdout
+        else:
+            with open(path, 'w', encoding='utf-8') as fh:
+                yield fh
+        return
+
+    if to_stdout:
+        raw = gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb')
+    else:
+        raw = gzip.open(path, 'wb')
+
+    with io.TextIOWrapper(raw, encoding='utf-8') as fh:
+        yield fh
+
+
+def list_bookmarks_page(args):
+    controller_class = list_bookmarks.ListBookmarksController
+    if args.batch:
+        controller_class = list_bookmarks.ListBookmarkBatchController
+    controller = instrumentation.instrument(controller_class(
         list_bookmarks.ListBookmarksUseCase(),
         list_bookmarks.ListBookmarksPresenter(),
         ListBookmarksConsoleView()
-    )
-    # rv = uc.list_bookmarks(args.user, filterkey='everything')
-    # print(rv)
-    print(controller.handle({'user_id': args.user, 'filterkey': 'everything'}))
-
+    ), context.metrics_sink)
+    print(controller.handle({'user_id': args.user, 'limit': args.limit, 'after': args.after}))
 
-def import_bookmarks(args):
-    LOGGER.info("Creating temp user %s", args.user)
-    rv = CreateUserUseCase().create_user(args.user, 'password')
-    LOGGER.info(rv)
-
-    for x in import_from_json(args.source):
-        date_created = dateutil.parser.parse(x['date_created_iso'])
-        uc = create_bookmark.CreateBookmarkUseCase()
-        rv = uc.create_bookmark(args.user, x['name'], x['url'], date_created)
-        presenter = create_bookmark.CreateBookmarkPresenter()
-        presenter.present(rv)
-        LOGGER.info(presenter.get_view_model())
 
+def export_bookmarks(args):
+    controller = instrumentation.instrument(list_bookmarks.StreamBookmarksController(
+        list_bookmarks.ListBookmarksUseCase(),
+        list_bookmarks.StreamBookmarksPresenter(),
+        EXPORT_VIEWS[args.format]()
+    ), context.metrics_sink)
+    with open_output(args.output, compress=args.gzip) as fh:
+        for chunk in controller.handle({'user_id': args.user}):
+            fh.write(chunk)
 
-def import_from_json(path):
-    importdata = []
-    with open(path, 'r') as fh:
-        importdata = json.load(fh)
 
-    return importdata
+def import_bookmarks(args):
+    LOGGER.info("Creating temp user %s", args.user)
+    presenter = CreateUserPresenter()
+    CreateUserUseCase().execute({'username': args.user, 'password': 'password'}, presenter)
+    LOGGER.info(presenter.get_view_model())
+
+    with open_input(args.source) as fh:
+        # dates are parsed, and bad ones rejected, record by record
+        records = (
+            {
+                'name': x.get('name'),
+                'url': x.get('url'),
+                'date_created': x.get('date_created_iso'),
+            } if isinstance(x, dict) else x
+            for x in import_from_json(fh)
+        )
+        controller = instrumentation.instrument(import_bookmarks_uc.ImportBookmarksController(
+            import_bookmarks_uc.ImportBookmarksUseCase(),
+            import_bookmarks_uc.ImportBookmarksPresenter(),
+            ImportBookmarksConsoleView()
+        ), context.metrics_sink)
+        print(controller.handle({
+            'user_id': args.user,
+            'records': records,
+            'batch_size': args.batch_size,
+        }))
+
+
+def install_views(args):
+    written = couchdb.CouchDBBookmarkRepo().install_views()
+    if written:
+        for doc_id in written:
+            print("{} Installed {}".format(USUCCESS, doc_id))
+    else:
+        print("{} Views are up to date".format(USUCCESS))
+
+
+def run_benchmarks(args):
+    # benchmarks/ lives next to the links package in a source checkout
+    from benchmarks import suite
+
+    try:
+        report = suite.run(
+            scenarios=args.scenario,
+            backends=args.backend or ['inmemory'],
+            sizes=args.size or [1000],
+            ops=args.ops,
+            warmup=args.warmup,
+            latency=args.latency_ms / 1000,
+            fast_hash=args.fast_hash,
+        )
+    except ValueError as ex:
+        sys.exit("{} {}; choose from scenarios {} and backends {}".format(
+            UFAILURE, ex, ', '.join(sorted(suite.SCENARIOS)), ', '.join(suite.BACKENDS)))
+    with open_output(args.output) as fh:
+        json.dump(report, fh, indent=2)
+        fh.write('\n')
+
+
+def open_input(path):
+    """Open path for reading text, transparently decompressing .gz files"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def import_from_json(fh, chunk_size=65536):
+    """
+    Lazily yield records from a stream holding either a JSON array or JSON
+    Lines, reading chunk_size characters at a time.
+    """
+    first = fh.read(1)
+    while first.isspace():
+        first = fh.read(1)
+
+    if first == '[':
+        yield from _iter_json_array(fh, chunk_size)
+        return
+
+    for line in itertools.chain([first + fh.readline()], fh):
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_json_array(fh, chunk_size):
+    """
+    Yield the elements of a JSON array whose '[' has been read. An element
+    that fails to decode is read further only while the failure could be
+    the buffer cutting it short; a malformed one raises at once, instead of
+    the rest of the file being read in search of a decodable prefix.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    index = 0
+    while True:
+        pos = ARRAY_SEPARATOR.match(buf, pos).end()
+        if buf[pos:pos + 1] == ']':
+            return
+        try:
+            record, pos_end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as ex:
+            chunk = fh.read(chunk_size) if _cut_short(ex) else ''
+            if not chunk:
+                raise ValueError(
+                    "Record {} of the JSON array is invalid: {}".format(index, ex.msg)) from ex
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield record
+        index += 1
+        pos = pos_end
+
+
+def _cut_short(ex):
+    # a string left open, or an error in the last few characters, as of a
+    # literal, number or escape split across reads
+    return ex.msg.startswith('Unterminated string') or len(ex.doc) - ex.pos <= 8
 
 
 def main():
@@ -93,13 +286,39 @@ def main():
     parser_user_parent = argparse.ArgumentParser()
     subparsers = parser.add_subparsers()
 
+    parser_list_links = subparsers.add_parser(
+        'list',
+        description="Print one page of a user's bookmarks as JSON"
+    )
+    parser_list_links.add_argument('-u', '--user', type=str, required=True)
+    parser_list_links.add_argument(
+        '-l', '--limit', type=int, default=None,
+        help='Page size, defaults to Settings.BOOKMARK_PAGE_SIZE')
+    parser_list_links.add_argument(
+        '-a', '--after', type=str, default=None,
+        help='Cursor of the page to print')
+    parser_list_links.add_argument(
+        '--batch', action='store_true',
+        help='List through the columnar batch path')
+    parser_list_links.set_defaults(func=list_bookmarks_page)
+
     parser_export_links = subparsers.add_parser(
         'export',
-        description='Export as JSON'
+        description='Export as a JSON array or JSON Lines'
     )
     parser_export_links.add_argument(
         '-u', '--user', type=str, required=True
     )
+    parser_export_links.add_argument(
+        '-f', '--format', choices=sorted(EXPORT_VIEWS), default='json'
+    )
+    parser_export_links.add_argument(
+        '-o', '--output', type=str, default=None,
+        help='File to write to, defaults to stdout'
+    )
+    parser_export_links.add_argument(
+        '-z', '--gzip', action='store_true', help='gzip compress the output'
+    )
     parser_export_links.set_defaults(func=export_bookmarks)
 
     parser_import_links = subparsers.add_parser(
@@ -107,7 +326,11 @@ def main():
         description='Import links from external sources')
     parser_import_links.add_argument(
         '-u', '--user', type=str, required=True)
-    parser_import_links.add_argument('source', type=str)
+    parser_import_links.add_argument(
+        '-b', '--batch-size', type=int, default=None,
+        help='Bookmarks written per repository call')
+    parser_import_links.add_argument(
+        'source', type=str, help='A JSON array or JSON Lines file, optionally .gz')
     parser_import_links.set_defaults(func=import_bookmarks)
 
     create_user_parser = subparsers.add_parser('create_user', description='Create a user')
@@ -115,11 +338,44 @@ def main():
     create_user_parser.add_argument('-p', '--password', type=str, required=True)
     create_user_parser.set_defaults(func=create_user)
 
+    install_views_parser = subparsers.add_parser(
+        'install_views',
+        description='Install or update the CouchDB design documents')
+    install_views_parser.set_defaults(func=install_views)
+
+    bench_parser = subparsers.add_parser(
+        'bench',
+        description='Benchmark the use cases and report JSON')
+    bench_parser.add_argument(
+        '-s', '--scenario', action='append',
+        help='Scenario to run, may be repeated; defaults to all')
+    bench_parser.add_argument(
+        '-b', '--backend', action='append',
+        help='Repos to run against, inmemory or couchdb-stub, may be repeated; '
+             'defaults to inmemory')
+    bench_parser.add_argument(
+        '-n', '--size', action='append', type=int,
+        help='Bookmarks to seed, may be repeated; defaults to 1000')
+    bench_parser.add_argument('--ops', type=int, default=1000, help='Timed runs per scenario')
+    bench_parser.add_argument('--warmup', type=int, default=10)
+    bench_parser.add_argument(
+        '--latency-ms', type=float, default=1.0,
+        help='Delay per request of the couchdb-stub backend')
+    bench_parser.add_argument(
+        '--fast-hash', action='store_true',
+        help='Hash passwords with a single round, to time everything else')
+    bench_parser.add_argument(
+        '-o', '--output', type=str, default=None,
+        help='File to write the JSON report to, defaults to stdout')
+    # the benchmarks set up their own repos
+    bench_parser.set_defaults(func=run_benchmarks, init_context=False)
+
     parser.set_defaults(func=main_help)
     args = parser.parse_args()
+    if getattr(args, 'init_context', True):
+        init_context(Settings)
     args.func(args)
 
 
 if __name__ == '__main__':
-    init_context()
     main()
@@ -1,12 +1,18 @@
 from links.context import context
 from links.logger import get_logger
-from links.security import check_password
-from links.usecases.interfaces import OutputBoundary, Controller, UseCase
+from links.security import check_password, check_password_async
+from links.usecases.interfaces import (
+    AsyncController,
+    AsyncUseCase,
+    Controller,
+    OutputBoundary,
+    UseCase,
+)
 
 LOGGER = get_logger(__name__)
 
 
-class AuthenticateUserUseCase(UseCase):
+class AuthenticateUserUseCase(UseCase, AsyncUseCase):
 
     def __init__(self):
         self.user_id = ''
@@ -26,9 +32,23 @@ class AuthenticateUserUseCase(UseCase):
 
         presenter.present(response)
 
+    async def execute_async(self, presenter: OutputBoundary):
+        response = Response()
+        response.user_id = self.user_id
+        response.is_authenticated = False
+
+        password_hash = await context.async_user_repo.get_password_hash(self.user_id)
+
+        if await check_password_async(self.password, password_hash):
+            response.is_authenticated = True
+
+        presenter.present(response)
+
 
 class Response:
 
+    __slots__ = ('is_authenticated', 'user_id')
+
     def __init__(self):
         self.is_authenticated = False
         self.user_id = ''
@@ -50,7 +70,7 @@ class AuthenticateUserPresenter(OutputBoundary):
         return self._view_model
 
 
-class AuthenticateUserController(Controller):
+class AuthenticateUserController(Controller, AsyncController):
 
     def __init__(self, usecase, presenter, view):
         self.usecase = usecase
@@ -58,7 +78,15 @@ class AuthenticateUserController(Controller):
         self.view = view
 
     def handle(self, request):
-        self.usecase.user_id = request['user_id']
-        self.usecase.password = request['password']
+        self._load_request(request)
         self.usecase.execute(self.presenter)
         return self.view.generate_view(self.presenter.get_view_model())
+
+    async def handle_async(self, request):
+        self._load_request(request)
+        await self.usecase.execute_async(self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    def _load_request(self, request):
+        self.usecase.user_id = request['user_id']
+        self.usecase.password = request['password']
@@ -2,31 +2,42 @@ from links import formatting
 from links.context import context
 from links.exceptions import BookmarkNotFound
 from links.logger import get_logger
-from links.usecases.interfaces import Controller, IPresenter, UseCase
+from links.usecases.interfaces import (
+    AsyncController,
+    AsyncUseCase,
+    Controller,
+    IPresenter,
+    UseCase,
+)
 
 LOGGER = get_logger(__name__)
 
 
-def format_bookmark_details(bookmark):
-    # return {
-    #     'bookmark_id': bookmark.id
-    #     'name': bookmark.name
-    #     'url': bookmark['url'],
-    #     'date_created': formatting.display_date(bookmark['date_created']),
-    #     'date_created_iso': formatting.iso_date(bookmark['date_created']),
-    #     'host': formatting.host_from_url(bookmark['url']),
-    # }
+def make_response_model(bookmark):
+    """Transform an entity into a response model for a presenter"""
+    response = BookmarkDetailsReponseModel()
+    response.bookmark_id = bookmark.id
+    response.name = bookmark.name
+    response.url = bookmark.url
+    # a datetime or the stored ISO string; formatting accepts either
+    response.date_created = bookmark.raw_date_created
+    response.host = formatting.host_from_url(bookmark.url)
+    return response
+
+
+def format_bookmark_details(response_model):
+    """Transform a response model into a view model"""
     view = BookmarkDetailsViewModel()
-    view.id = bookmark.id
-    view.name = bookmark.name
-    view.url = bookmark.url
-    view.date_created = formatting.display_date(bookmark.date_created)
-    view.date_created_iso = formatting.iso_date(bookmark.date_created)
-    view.host = formatting.host_from_url(bookmark.url)
+    view.bookmark_id = response_model.bookmark_id
+    view.name = response_model.name
+    view.url = response_model.url
+    view.host = response_model.host
+    view.date_created = formatting.display_date(response_model.date_created)
+    view.date_created_iso = formatting.iso_date(response_model.date_created)
     return view
 
 
-class BookmarkDetailsUseCase(UseCase):
+class BookmarkDetailsUseCase(UseCase, AsyncUseCase):
     """Fetch a bookmarks details"""
 
     def __init__(self):
@@ -35,7 +46,13 @@ class BookmarkDetailsUseCase(UseCase):
 
     def execute(self, presenter):
         bookmark = context.bookmark_repo.get(self.bookmark_id)
+        self._present(bookmark, presenter)
+
+    async def execute_async(self, presenter):
+        bookmark = await context.async_bookmark_repo.get(self.bookmark_id)
+        self._present(bookmark, presenter)
 
+    def _present(self, bookmark, presenter):
         if bookmark.belongs_to(self.user_id):
             response_model = self._make_presentable(bookmark)
             presenter.present(response_model)
@@ -44,13 +61,7 @@ class BookmarkDetailsUseCase(UseCase):
 
     def _make_presentable(self, bookmark):
         """Transform entity into a response model for the presenter"""
-        response = BookmarkDetailsReponseModel()
-        response.bookmark_id = bookmark.id
-        response.name = bookmark.name
-        response.url = bookmark.url
-        response.date_created = bookmark.date_created
-        response.host = formatting.host_from_url(bookmark.url)
-        return response
+        return make_response_model(bookmark)
 
 
 class BookmarkDetailsPresenter(IPresenter):
@@ -78,7 +89,7 @@ class BookmarkDetailsPresenter(IPresenter):
         )
 
 
-class BookmarkDetailsController(Controller):
+class BookmarkDetailsController(Controller, AsyncController):
 
     def __init__(self, usecase, presenter, view):
         self.usecase = usecase
@@ -86,29 +97,56 @@ class BookmarkDetailsController(Controller):
         self.view = view
 
     def handle(self, request):
-        self.usecase.user_id = request['user_id']
-        self.bookmark_id = request['bookmark_id']
+        self._load_request(request)
         self.usecase.execute(self.presenter)
         return self.view.generate_view(self.presenter.get_view_model())
 
+    async def handle_async(self, request):
+        self._load_request(request)
+        await self.usecase.execute_async(self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    def _load_request(self, request):
+        self.usecase.user_id = request['user_id']
+        self.usecase.bookmark_id = request['bookmark_id']
+
 
 class BookmarkDetailsReponseModel:
 
+    __slots__ = ('bookmark_id', 'name', 'url', 'host', 'date_created')
+
     def __init__(self):
         self.bookmark_id = None
         self.name = None
         self.url = None
         self.host = None
-        self.host = None
         self.date_created = None
 
+    def __repr__(self):
+        return 'BookmarkDetailsReponseModel({!r})'.format(self.bookmark_id)
+
 
 class BookmarkDetailsViewModel:
 
+    __slots__ = ('bookmark_id', 'name', 'url', 'host', 'date_created', 'date_created_iso')
+
     def __init__(self):
         self.bookmark_id = None
         self.name = None
         self.url = None
         self.host = None
         self.date_created = None
-        self.date_created_iso = None
\ No newline at end of file
+        self.date_created_iso = None
+
+    def __repr__(self):
+        return 'BookmarkDetailsViewModel({!r})'.format(self.bookmark_id)
+
+    def as_dict(self):
+        return {
+            'bookmark_id': self.bookmark_id,
+            'name': self.name,
+            'url': self.url,
+            'host': self.host,
+            'date_created': self.date_created,
+            'date_created_iso': self.date_created_iso,
+        }
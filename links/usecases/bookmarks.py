@@ -1,11 +1,16 @@
+import asyncio
 from collections import namedtuple
 from abc import abstractmethod
 
+from links import concurrency
 from links import exceptions
 from links import formatting
 from links.context import context
 from links.exceptions import BookmarkNotFound
 from links.logger import get_logger
+from links.paging import Page
+from links.settings import Settings
+from links.usecases.interfaces import AsyncController, AsyncUseCase
 from links.usecases.interfaces import Controller, IPresenter, UseCase
 from links.usecases.interfaces import OutputBoundary
 
@@ -15,7 +20,7 @@ Bookmark = namedtuple('Bookmark', ['id', 'name', 'url', 'date_created'])
 ViewableBookmark = namedtuple('Bookmark', ['id', 'name', 'url', 'date_created'])
 
 
-class ViewBookmarksUseCase(UseCase):
+class ViewBookmarksUseCase(UseCase, AsyncUseCase):
 
     def execute(self, presenter):
         # Template method pattern of execution
@@ -23,11 +28,21 @@ class ViewBookmarksUseCase(UseCase):
         response_model = self._create_response_model(data)
         presenter.present(response_model)
 
+    async def execute_async(self, presenter):
+        data = await self._fetch_data_async()
+        response_model = self._create_response_model(data)
+        presenter.present(response_model)
+
     @abstractmethod
     def _fetch_data(self):
         """Steps to fetch data from a repo. Return data is passed to self._present"""
         pass
 
+    @abstractmethod
+    async def _fetch_data_async(self):
+        """_fetch_data, reading through the async repos"""
+        pass
+
     @abstractmethod
     def _create_response_model(self, data):
         """Create a response model to pass to the presenter"""
@@ -35,31 +50,74 @@ class ViewBookmarksUseCase(UseCase):
 
 
 class ListBookmarksUseCase(ViewBookmarksUseCase):
-    """Constructs a list of all bookmarks owned by a user."""
+    """
+    Constructs a page of the bookmarks owned by a user. The response model
+    is a Page whose next_cursor, passed back as after, fetches the next one.
+    """
 
-    def __init__(self, user_id=None):
+    def __init__(self, user_id=None, limit=None, after=None):
         self.user_id = user_id
+        self.limit = limit or Settings.BOOKMARK_PAGE_SIZE
+        self.after = after
 
     def _fetch_data(self):
-        if not context.user_repo.exists(self.user_id):
-            raise exceptions.UserNotFound(self.user_id)
+        # the page query doesn't depend on the user check, so run both at
+        # once; an unknown user still costs a page query
+        user_exists, bookmarks = concurrency.gather(
+            lambda: context.user_repo.exists(self.user_id),
+            self._get_page,
+            return_exceptions=True,
+        )
+        return self._check_user(user_exists, bookmarks)
+
+    async def _fetch_data_async(self):
+        user_exists, bookmarks = await asyncio.gather(
+            context.async_user_repo.exists(self.user_id),
+            self._get_page_async(),
+            return_exceptions=True,
+        )
+        return self._check_user(user_exists, bookmarks)
+
+    def _get_page(self):
         try:
-            bookmarks = context.bookmark_repo.get_by_user(self.user_id, limit=1000)
+            return context.bookmark_repo.get_by_user(
+                self.user_id, limit=self.limit, after=self.after)
+        except exceptions.ValidationError:
+            # a bad cursor from the client, not a data access error
+            raise
         except Exception as ex:
             LOGGER.exception(ex)
             raise exceptions.RepositoryError("Data access error")
 
+    async def _get_page_async(self):
+        try:
+            return await context.async_bookmark_repo.get_by_user(
+                self.user_id, limit=self.limit, after=self.after)
+        except exceptions.ValidationError:
+            raise
+        except Exception as ex:
+            LOGGER.exception(ex)
+            raise exceptions.RepositoryError("Data access error")
+
+    def _check_user(self, user_exists, bookmarks):
+        # an unknown user is reported as such, even if the page read failed
+        if isinstance(user_exists, Exception):
+            raise user_exists
+        if not user_exists:
+            raise exceptions.UserNotFound(self.user_id)
+        if isinstance(bookmarks, Exception):
+            raise bookmarks
         return bookmarks
 
     def _create_response_model(self, data):
-        return [self._make_presentable(bm) for bm in data]
+        return Page([self._make_presentable(bm) for bm in data], data.next_cursor)
 
     def _make_presentable(self, bm):
         return Bookmark(
             id=bm.id,
             name=bm.name,
             url=bm.url,
-            date_created=bm.date_created
+            date_created=bm.raw_date_created
         )
 
 
@@ -71,7 +129,12 @@ class BookmarkDetailsUseCase(ViewBookmarksUseCase):
         self.bookmark_id = bookmark_id
 
     def _fetch_data(self):
-        bookmark = context.bookmark_repo.get(self.bookmark_id)
+        return self._check_owner(context.bookmark_repo.get(self.bookmark_id))
+
+    async def _fetch_data_async(self):
+        return self._check_owner(await context.async_bookmark_repo.get(self.bookmark_id))
+
+    def _check_owner(self, bookmark):
         if bookmark.belongs_to(self.user_id):
             return bookmark
 
@@ -86,7 +149,7 @@ class BookmarkDetailsUseCase(ViewBookmarksUseCase):
             id= bookmark.id,
             name=bookmark.name,
             url=bookmark.url,
-            date_created=bookmark.date_created
+            date_created=bookmark.raw_date_created
         )
 
 
@@ -99,7 +162,10 @@ class ListBookmarksPresenter(OutputBoundary):
         return self._view_model
 
     def present(self, response_model):
-        self._view_model = [self._make_viewable(bm) for bm in response_model]
+        self._view_model = Page(
+            [self._make_viewable(bm) for bm in response_model],
+            getattr(response_model, 'next_cursor', None)
+        )
 
     def _make_viewable(self, bookmark):
         return ViewableBookmark(
@@ -130,8 +196,7 @@ class BookmarkDetailsPresenter(IPresenter):
         )
 
 
-class ListBookmarksController(Controller):
-    """A default controller"""
+class ViewBookmarksController(Controller, AsyncController):
 
     def __init__(self, usecase, presenter, view):
         self.usecase = usecase
@@ -139,20 +204,33 @@ class ListBookmarksController(Controller):
         self.view = view
 
     def handle(self, request):
-        self.usecase.user_id = request['user_id']
+        self._load_request(request)
         self.usecase.execute(self.presenter)
         return self.view.generate_view(self.presenter.get_view_model())
 
+    async def handle_async(self, request):
+        self._load_request(request)
+        await self.usecase.execute_async(self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
 
-class BookmarkDetailsController(Controller):
+    @abstractmethod
+    def _load_request(self, request):
+        """Copy the request's values onto the use case"""
+        pass
 
-    def __init__(self, usecase, presenter, view):
-        self.usecase = usecase
-        self.presenter = presenter
-        self.view = view
 
-    def handle(self, request):
+class ListBookmarksController(ViewBookmarksController):
+    """A default controller"""
+
+    def _load_request(self, request):
         self.usecase.user_id = request['user_id']
-        self.usecase.bookmark_id = request['bookmark_id']
-        self.usecase.execute(self.presenter)
-        return self.view.generate_view(self.presenter.get_view_model())
\ No newline at end of file
+        if request.get('limit'):
+            self.usecase.limit = request['limit']
+        self.usecase.after = request.get('after')
+
+
+class BookmarkDetailsController(ViewBookmarksController):
+
+    def _load_request(self, request):
+        self.usecase.user_id = request['user_id']
+        self.usecase.bookmark_id = request['bookmark_id']
\ No newline at end of file
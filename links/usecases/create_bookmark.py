@@ -8,7 +8,13 @@ from links.context import context
 from links.entities import Bookmark
 from links.exceptions import UserNotFound, ValidationError, InvalidOperationError
 from links.logger import get_logger
-from links.usecases.interfaces import Controller, IPresenter, UseCase
+from links.usecases.interfaces import (
+    AsyncController,
+    AsyncUseCase,
+    Controller,
+    IPresenter,
+    UseCase,
+)
 
 LOGGER = get_logger(__name__)
 
@@ -26,7 +32,19 @@ def create_bookmark_slug(text):
     return '{}-{}'.format(uuid.uuid4().hex[:8], s)
 
 
-class CreateBookmarkUseCase(UseCase):
+def validate_bookmark(name, url):
+    """Return a dict of field errors, empty if name and url are acceptable"""
+    errors = {}
+    if name is None or len(name) > NAME_LENGTH_LIMIT:
+        errors['name'] = 'Name is too long'
+
+    if not validation.is_url(url):
+        errors['url'] = 'Invalid URL'
+
+    return errors
+
+
+class CreateBookmarkUseCase(UseCase, AsyncUseCase):
     """The 'create a new bookmark' use case"""
 
     def __init__(self):
@@ -35,35 +53,41 @@ class CreateBookmarkUseCase(UseCase):
         self.url = None
 
     def execute(self, presenter):
+        self._check_user(context.user_repo.exists(self.user_id))
+        bookmark, response = self._create_bookmark()
+        if bookmark is not None:
+            context.bookmark_repo.save(bookmark)
+        presenter.present(response)
 
-        if not context.user_repo.exists(self.user_id):
+    async def execute_async(self, presenter):
+        self._check_user(await context.async_user_repo.exists(self.user_id))
+        bookmark, response = self._create_bookmark()
+        if bookmark is not None:
+            await context.async_bookmark_repo.save(bookmark)
+        presenter.present(response)
+
+    def _check_user(self, user_exists):
+        if not user_exists:
             LOGGER.error("Unknown user '%s'", self.user_id)
             raise InvalidOperationError("No such user")
 
+    def _create_bookmark(self):
+        """Return the bookmark to save, if valid, and the response model"""
         errors = self._validate()
         if errors:
-            presenter.present(Response(errors=errors))
-        else:
-            bookmark_id = create_bookmark_slug(self.name)
-            bookmark = Bookmark(
-                bookmark_id,
-                self.user_id,
-                self.name,
-                self.url,
-                date_created=datetime.datetime.utcnow()
-            )
-            context.bookmark_repo.save(bookmark)
-            presenter.present(Response())
-
-    def _validate(self):
-        errors = {}
-        if self.name is None or len(self.name) > NAME_LENGTH_LIMIT:
-            errors['name'] = 'Name is too long'
+            return None, Response(errors=errors)
 
-        if not validation.is_url(self.url):
-            errors['url'] = 'Invalid URL'
+        bookmark = Bookmark(
+            create_bookmark_slug(self.name),
+            self.user_id,
+            self.name,
+            self.url,
+            date_created=datetime.datetime.utcnow()
+        )
+        return bookmark, Response()
 
-        return errors
+    def _validate(self):
+        return validate_bookmark(self.name, self.url)
 
 
 class CreateBookmarkPresenter(IPresenter):
@@ -84,6 +108,8 @@ class CreateBookmarkPresenter(IPresenter):
 
 class Response:
 
+    __slots__ = ('errors',)
+
     def __init__(self, errors=None):
         if errors is None:
             errors = {}
@@ -91,7 +117,7 @@ class Response:
 
 
 
-class CreateBookmarkController(Controller):
+class CreateBookmarkController(Controller, AsyncController):
 
     def __init__(self, usecase, presenter, view):
         self.usecase = usecase
@@ -99,8 +125,16 @@ class CreateBookmarkController(Controller):
         self.view = view
 
     def handle(self, request):
+        self._load_request(request)
+        self.usecase.execute(self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    async def handle_async(self, request):
+        self._load_request(request)
+        await self.usecase.execute_async(self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    def _load_request(self, request):
         self.usecase.user_id = request['user_id']
         self.usecase.name = request['name']
         self.usecase.url = request['url']
-        self.usecase.execute(self.presenter)
-        return self.view.generate_view(self.presenter.get_view_model())
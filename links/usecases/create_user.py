@@ -3,8 +3,14 @@ import abc
 from links.context import context
 from links.entities import User
 from links.logger import get_logger
-from links.security import create_password_hash
-from links.usecases.interfaces import Controller, IPresenter, IUseCase
+from links.security import create_password_hash, create_password_hash_async
+from links.usecases.interfaces import (
+    AsyncController,
+    AsyncIUseCase,
+    Controller,
+    IPresenter,
+    IUseCase,
+)
 from links import validation
 
 LOGGER = get_logger(__name__)
@@ -16,7 +22,7 @@ def _create_test_user():
     usecase.execute(req, CreateUserPresenter())
 
 
-class CreateUserUseCase(IUseCase):
+class CreateUserUseCase(IUseCase, AsyncIUseCase):
 
     _validation_schema = {
         'username': validation.Schema(
@@ -34,26 +40,55 @@ class CreateUserUseCase(IUseCase):
         :return:
         """
         username = request['username']
-        password = request['password']
+        response = self._validate(username)
+
+        if response['errors']:
+            presenter.present(response)
+            return
+
+        if context.user_repo.exists(username):
+            self._username_taken(response)
+        else:
+            user = User(username)
+            user.password_hash = create_password_hash(request['password'])
+            context.user_repo.save(user)
+            response['user_created'] = True
+
+        presenter.present(response)
+
+    async def execute_async(self, request, presenter):
+        username = request['username']
+        response = self._validate(username)
+
+        if response['errors']:
+            presenter.present(response)
+            return
+
+        if await context.async_user_repo.exists(username):
+            self._username_taken(response)
+        else:
+            user = User(username)
+            user.password_hash = await create_password_hash_async(request['password'])
+            await context.async_user_repo.save(user)
+            response['user_created'] = True
+
+        presenter.present(response)
+
+    def _validate(self, username):
+        """Start a response model holding any validation errors"""
         response = {'user_created': False, 'username': username, 'errors': {}}
 
         is_valid, errors = validation.validate(
             {'username': username},
             self._validation_schema
         )
-
         if errors:
             response['errors'] = errors
-        elif context.user_repo.exists(username):
-            LOGGER.info("create_user: user '{}' already exists".format(username))
-            response['errors'] = {'username': ['That username is taken']}
-        else:
-            user = User(username)
-            user.password_hash = create_password_hash(password)
-            context.user_repo.save(user)
-            response['user_created'] = True
+        return response
 
-        presenter.present(response)
+    def _username_taken(self, response):
+        LOGGER.info("create_user: user '{}' already exists".format(response['username']))
+        response['errors'] = {'username': ['That username is taken']}
 
 
 class CreateUserPresenter(IPresenter):
@@ -69,7 +104,7 @@ class CreateUserPresenter(IPresenter):
         return self.view_model
 
 
-class CreateUserController(Controller):
+class CreateUserController(Controller, AsyncController):
 
     def __init__(self, usecase, presenter, view):
         self.usecase = usecase
@@ -77,9 +112,15 @@ class CreateUserController(Controller):
         self.view = view
 
     def handle(self, request):
-        data = {
+        self.usecase.execute(self._make_request(request), self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    async def handle_async(self, request):
+        await self.usecase.execute_async(self._make_request(request), self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    def _make_request(self, request):
+        return {
             'username': request['username'],
             'password': request['password'],
         }
-        self.usecase.execute(data, self.presenter)
-        return self.view.generate_view(self.presenter.get_view_model())
@@ -1,7 +1,16 @@
+import asyncio
+
+from links import concurrency
 from links import validation
 from links.context import context
 from links.logger import get_logger
-from links.usecases.interfaces import Controller, OutputBoundary, UseCase
+from links.usecases.interfaces import (
+    AsyncController,
+    AsyncUseCase,
+    Controller,
+    OutputBoundary,
+    UseCase,
+)
 from links.exceptions import InvalidOperationError
 
 LOGGER = get_logger(__name__)
@@ -10,7 +19,7 @@ NAME_LENGTH_LIMIT = 400
 
 
 
-class EditBookmarkUseCase(UseCase):
+class EditBookmarkUseCase(UseCase, AsyncUseCase):
 
     def __init__(self):
         self.user_id = None
@@ -20,9 +29,33 @@ class EditBookmarkUseCase(UseCase):
         self._validation_errors = {}
 
     def execute(self, presenter):
-        bookmark = context.bookmark_repo.get(self.bookmark_id)
+        bookmark, user = concurrency.gather(
+            lambda: context.bookmark_repo.get(self.bookmark_id),
+            lambda: context.user_repo.get(self.user_id),
+        )
+        self._validate_bookmark(bookmark)
+        self._validate_user(user)
+
+        response = self._edit_bookmark(bookmark)
+        if not response.errors:
+            context.bookmark_repo.save(bookmark)
+        presenter.present(response)
+
+    async def execute_async(self, presenter):
+        bookmark, user = await asyncio.gather(
+            context.async_bookmark_repo.get(self.bookmark_id),
+            context.async_user_repo.get(self.user_id),
+        )
         self._validate_bookmark(bookmark)
-        self._validate_user(context.user_repo.get(self.user_id))
+        self._validate_user(user)
+
+        response = self._edit_bookmark(bookmark)
+        if not response.errors:
+            await context.async_bookmark_repo.save(bookmark)
+        presenter.present(response)
+
+    def _edit_bookmark(self, bookmark):
+        """Apply the edit to the entity if allowed; return the response model"""
         response = Response()
 
         if bookmark.belongs_to(self.user_id):
@@ -30,7 +63,8 @@ class EditBookmarkUseCase(UseCase):
             if errors:
                 response.errors = errors
             else:
-                self._save_bookmark(bookmark)
+                bookmark.name = self.name
+                bookmark.url = self.url
         else:
             response.errors = {'error': 'Forbidden'}
             LOGGER.warning(
@@ -38,7 +72,7 @@ class EditBookmarkUseCase(UseCase):
                 self.bookmark_id,
                 self.user_id,
             )
-        presenter.present(response)
+        return response
 
     def _validate_bookmark(self, bookmark):
         if bookmark.id is None:
@@ -58,11 +92,6 @@ class EditBookmarkUseCase(UseCase):
 
         return errors
 
-    def _save_bookmark(self, bookmark):
-        bookmark.name = self.name
-        bookmark.url = self.url
-        context.bookmark_repo.save(bookmark)
-
 
 class EditBookmarkPresenter(OutputBoundary):
 
@@ -82,13 +111,15 @@ class EditBookmarkPresenter(OutputBoundary):
 
 class Response:
 
+    __slots__ = ('errors',)
+
     def __init__(self, errors=None):
         if errors is None:
             errors = {}
         self.errors = errors
 
 
-class EditBookmarkController(Controller):
+class EditBookmarkController(Controller, AsyncController):
 
     def __init__(self, usecase, presenter, view):
         self.usecase = usecase
@@ -96,9 +127,17 @@ class EditBookmarkController(Controller):
         self.view = view
 
     def handle(self, request):
+        self._load_request(request)
+        self.usecase.execute(self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    async def handle_async(self, request):
+        self._load_request(request)
+        await self.usecase.execute_async(self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    def _load_request(self, request):
         self.usecase.user_id = request['user_id']
         self.usecase.bookmark_id = request['bookmark_id']
         self.usecase.name = request['name']
         self.usecase.url = request['url']
-        self.usecase.execute(self.presenter)
-        return self.view.generate_view(self.presenter.get_view_model())
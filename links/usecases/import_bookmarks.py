@@ -0,0 +1,173 @@
+import time
+from datetime import datetime
+
+from links.context import context
+from links.entities import Bookmark
+from links.exceptions import InvalidOperationError
+from links.formatting import parse_date
+from links.logger import get_logger
+from links.usecases.create_bookmark import create_bookmark_slug, validate_bookmark
+from links.usecases.interfaces import Controller, OutputBoundary, UseCase
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+PROGRESS_INTERVAL = 10000
+# only the first few rejected records are reported individually
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportBookmarksUseCase(UseCase):
+    """
+    Import a stream of records for a user. Records are dicts with 'name',
+    'url' and an optional 'date_created' datetime or date string. They are
+    validated and written batch_size at a time through
+    BookmarkRepo.save_many, so the records iterable is consumed lazily and
+    never held in memory. A record that can't be imported is counted as
+    invalid and skipped.
+    """
+
+    def __init__(self):
+        self.user_id = None
+        self.records = ()
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.progress_interval = PROGRESS_INTERVAL
+
+    def execute(self, presenter):
+        if not context.user_repo.exists(self.user_id):
+            LOGGER.error("Unknown user '%s'", self.user_id)
+            raise InvalidOperationError("No such user")
+
+        response = Response()
+        started = time.perf_counter()
+        next_progress = self.progress_interval
+        # (record index, bookmark) pairs
+        batch = []
+
+        for index, record in enumerate(self.records):
+            bookmark, errors = self._to_bookmark(record)
+            if errors:
+                response.invalid += 1
+                self._report_error(response, index, errors)
+            else:
+                batch.append((index, bookmark))
+
+            if len(batch) >= self.batch_size:
+                self._save_batch(batch, response)
+                batch = []
+
+            if index + 1 >= next_progress:
+                self._log_progress(index + 1, started)
+                next_progress += self.progress_interval
+
+        if batch:
+            self._save_batch(batch, response)
+
+        response.elapsed = time.perf_counter() - started
+        presenter.present(response)
+
+    def _to_bookmark(self, record):
+        """Return (bookmark, None), or (None, errors) for an invalid record"""
+        if not isinstance(record, dict):
+            return None, {'record': 'Not an object'}
+
+        name = record.get('name')
+        url = record.get('url')
+        errors = {
+            field: 'Must be a string'
+            for field, value in (('name', name), ('url', url))
+            if not isinstance(value, str)
+        }
+        date_created = record.get('date_created')
+        if isinstance(date_created, str):
+            date_created = parse_date(date_created)
+            if date_created is None:
+                errors['date_created'] = 'Invalid date'
+        elif date_created is not None and not isinstance(date_created, datetime):
+            errors['date_created'] = 'Invalid date'
+        if errors:
+            return None, errors
+
+        errors = validate_bookmark(name, url)
+        if errors:
+            return None, errors
+        bookmark = Bookmark(
+            create_bookmark_slug(name),
+            self.user_id,
+            name,
+            url,
+            date_created=date_created
+        )
+        return bookmark, None
+
+    def _save_batch(self, batch, response):
+        indexes = [index for index, _ in batch]
+        results = context.bookmark_repo.save_many([bookmark for _, bookmark in batch])
+        for index, result in zip(indexes, results):
+            if result.ok:
+                response.imported += 1
+            else:
+                response.failed += 1
+                self._report_error(response, index, {'save': result.error})
+
+    def _report_error(self, response, index, errors):
+        if len(response.errors) < MAX_REPORTED_ERRORS:
+            response.errors.append((index, errors))
+
+    def _log_progress(self, count, started):
+        elapsed = time.perf_counter() - started
+        LOGGER.info(
+            "Processed %d records (%.0f records/sec)",
+            count,
+            count / elapsed if elapsed else 0
+        )
+
+
+class Response:
+
+    __slots__ = ('imported', 'invalid', 'failed', 'errors', 'elapsed')
+
+    def __init__(self):
+        self.imported = 0
+        self.invalid = 0
+        self.failed = 0
+        # (record index, errors) pairs
+        self.errors = []
+        self.elapsed = 0.0
+
+
+class ImportBookmarksPresenter(OutputBoundary):
+
+    def __init__(self):
+        self.view_model = {}
+
+    def present(self, response):
+        total = response.imported + response.invalid + response.failed
+        self.view_model = {
+            'success': response.invalid == 0 and response.failed == 0,
+            'imported': response.imported,
+            'invalid': response.invalid,
+            'failed': response.failed,
+            'errors': response.errors,
+            'seconds': round(response.elapsed, 3),
+            'records_per_second': round(total / response.elapsed) if response.elapsed else 0,
+        }
+
+    def get_view_model(self):
+        return self.view_model
+
+
+class ImportBookmarksController(Controller):
+
+    def __init__(self, usecase, presenter, view):
+        self.usecase = usecase
+        self.presenter = presenter
+        self.view = view
+
+    def handle(self, request):
+        self.usecase.user_id = request['user_id']
+        self.usecase.records = request['records']
+        if request.get('batch_size'):
+            self.usecase.batch_size = request['batch_size']
+        self.usecase.execute(self.presenter)
+        return self.view.generate_view(self.presenter.get_view_model())
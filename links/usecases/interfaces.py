@@ -17,6 +17,25 @@ class UseCase(metaclass=ABCMeta):
         pass
 
 
+class AsyncIUseCase(metaclass=ABCMeta):
+    """An IUseCase that can also run from an event loop"""
+
+    @abstractmethod
+    async def execute_async(self, request, presenter):
+        pass
+
+
+class AsyncUseCase(metaclass=ABCMeta):
+    """
+    A UseCase that can also run from an event loop, reading and writing
+    through the context's async repos.
+    """
+
+    @abstractmethod
+    async def execute_async(self, presenter):
+        pass
+
+
 class IPresenter(metaclass=ABCMeta):
     """
     This interface decouples a use cases's output from the view and is
@@ -81,3 +100,10 @@ class Controller(metaclass=ABCMeta):
     def handle(self, request):
         pass
 
+
+class AsyncController(metaclass=ABCMeta):
+    """Controller interface for use from an event loop"""
+
+    @abstractmethod
+    async def handle_async(self, request):
+        pass
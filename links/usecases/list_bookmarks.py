@@ -1,8 +1,12 @@
+import asyncio
 from abc import ABCMeta, abstractmethod
+from links import concurrency
 from links.context import context
 from links.logger import get_logger
-from links.usecases.interfaces import OutputBoundary, Controller
-from links.usecases.bookmark_details import format_bookmark_details
+from links.usecases.interfaces import AsyncController, OutputBoundary, Controller
+from links.batch import BookmarkBatch
+from links.usecases.bookmark_details import format_bookmark_details, make_response_model
+from links.paging import Page
 from links.settings import Settings
 from links import exceptions
 
@@ -12,34 +16,145 @@ LOGGER = get_logger(__name__)
 class ListBookmarksInputBoundary(metaclass=ABCMeta):
 
     @abstractmethod
-    def list_bookmarks(self, user_id, presenter):
+    def list_bookmarks(self, user_id, presenter, limit=None, after=None):
+        pass
+
+    @abstractmethod
+    async def list_bookmarks_async(self, user_id, presenter, limit=None, after=None):
+        pass
+
+    @abstractmethod
+    def list_bookmark_batch(self, user_id, presenter, limit=None, after=None):
+        pass
+
+    @abstractmethod
+    def stream_bookmarks(self, user_id, presenter):
         pass
 
 
 class ListBookmarksUseCase(ListBookmarksInputBoundary):
     """Constructs a list of all bookmarks owned by a user."""
 
-    def list_bookmarks(self, user_id, presenter):
+    def list_bookmarks(self, user_id, presenter, limit=None, after=None):
         """
         :param user_id:
         :param presenter:
+        :param limit: page size, defaults to Settings.BOOKMARK_PAGE_SIZE
+        :param after: cursor of the page to fetch, from a previous page's
+          next_cursor
         :return:
         """
-        # limit = Settings.BOOKMARK_LIST_FILTERS.get(
-        #     filterkey,
-        #     Settings.BOOKMARK_LIST_FILTERS['recent'])
+        if limit is None:
+            limit = Settings.BOOKMARK_PAGE_SIZE
 
-        if not context.user_repo.exists(user_id):
+        # the user check and the page query are independent round-trips; an
+        # unknown user still costs a page query
+        user_exists, bookmarks = concurrency.gather(
+            lambda: context.user_repo.exists(user_id),
+            lambda: self._get_page(user_id, limit, after),
+            return_exceptions=True,
+        )
+        bookmarks = self._check_user(user_id, user_exists, bookmarks)
+
+        presenter.present(self._make_response(user_id, bookmarks))
+
+    async def list_bookmarks_async(self, user_id, presenter, limit=None, after=None):
+        """list_bookmarks, reading through the async repos"""
+        if limit is None:
+            limit = Settings.BOOKMARK_PAGE_SIZE
+
+        user_exists, bookmarks = await asyncio.gather(
+            context.async_user_repo.exists(user_id),
+            self._get_page_async(user_id, limit, after),
+            return_exceptions=True,
+        )
+        bookmarks = self._check_user(user_id, user_exists, bookmarks)
+
+        presenter.present(self._make_response(user_id, bookmarks))
+
+    def list_bookmark_batch(self, user_id, presenter, limit=None, after=None):
+        """
+        list_bookmarks for large listings: the presenter is given a columnar
+        links.batch.BookmarkBatch rather than one response model per bookmark.
+        """
+        if limit is None:
+            limit = Settings.BOOKMARK_PAGE_SIZE
+
+        user_exists, batch = concurrency.gather(
+            lambda: context.user_repo.exists(user_id),
+            lambda: self._get_batch(user_id, limit, after),
+            return_exceptions=True,
+        )
+        batch = self._check_user(user_id, user_exists, batch)
+
+        presenter.present(batch)
+
+    def _check_user(self, user_id, user_exists, result):
+        """
+        Return the result of a read made alongside the user check. An
+        unknown user is reported as such, even if the read failed.
+        """
+        if isinstance(user_exists, Exception):
+            raise user_exists
+        if not user_exists:
             raise exceptions.UserNotFound(user_id)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _get_batch(self, user_id, limit, after):
+        try:
+            return context.bookmark_repo.get_batch_by_user(user_id, limit=limit, after=after)
+        except exceptions.ValidationError:
+            # a bad cursor from the client, not a data access error
+            raise
+        except Exception as ex:
+            LOGGER.exception(ex)
+            raise exceptions.RepositoryError("Data access error")
 
+    def _get_page(self, user_id, limit, after):
         try:
-            bookmarks = context.bookmark_repo.get_by_user(user_id, limit=1000)
+            return context.bookmark_repo.get_by_user(user_id, limit=limit, after=after)
+        except exceptions.ValidationError:
+            raise
         except Exception as ex:
             LOGGER.exception(ex)
             raise exceptions.RepositoryError("Data access error")
 
-        response = [bm.as_dict() for bm in bookmarks if bm.belongs_to(user_id)]
-        # return response
+    async def _get_page_async(self, user_id, limit, after):
+        try:
+            return await context.async_bookmark_repo.get_by_user(
+                user_id, limit=limit, after=after)
+        except exceptions.ValidationError:
+            raise
+        except Exception as ex:
+            LOGGER.exception(ex)
+            raise exceptions.RepositoryError("Data access error")
+
+    def _make_response(self, user_id, bookmarks):
+        return Page(
+            [make_response_model(bm) for bm in bookmarks if bm.belongs_to(user_id)],
+            bookmarks.next_cursor
+        )
+
+    def stream_bookmarks(self, user_id, presenter):
+        """
+        Present all of a user's bookmarks as a generator of response models.
+        Nothing is fetched until the presenter's output is consumed, and only
+        one repo batch is held in memory at a time.
+
+        :param user_id:
+        :param presenter: a presenter that accepts an iterable, such as
+          StreamBookmarksPresenter
+        :return:
+        """
+        if not context.user_repo.exists(user_id):
+            raise exceptions.UserNotFound(user_id)
+
+        bookmarks = context.bookmark_repo.iter_by_user(user_id)
+        response = (
+            make_response_model(bm) for bm in bookmarks if bm.belongs_to(user_id)
+        )
         presenter.present(response)
 
 
@@ -52,10 +167,75 @@ class ListBookmarksPresenter(OutputBoundary):
         return self.view_model
 
     def present(self, bookmarks):
-        self.view_model = [format_bookmark_details(bm) for bm in bookmarks]
+        if isinstance(bookmarks, BookmarkBatch):
+            self.view_model = BookmarkBatchViewModel.from_batch(bookmarks)
+            return
+
+        self.view_model = Page(
+            [format_bookmark_details(bm) for bm in bookmarks],
+            getattr(bookmarks, 'next_cursor', None)
+        )
+
+
+class BookmarkBatchViewModel:
+    """
+    The view model of a BookmarkBatch, kept as columns. Each column is
+    formatted in a single pass; as_dicts() gives the same rows as a list of
+    BookmarkDetailsViewModel.as_dict() results.
+    """
+
+    __slots__ = (
+        'bookmark_ids', 'names', 'urls', 'hosts', 'dates', 'dates_iso', 'next_cursor',
+    )
+
+    def __init__(self, bookmark_ids=(), names=(), urls=(), hosts=(), dates=(),
+                 dates_iso=(), next_cursor=None):
+        self.bookmark_ids = bookmark_ids
+        self.names = names
+        self.urls = urls
+        self.hosts = hosts
+        self.dates = dates
+        self.dates_iso = dates_iso
+        self.next_cursor = next_cursor
+
+    @classmethod
+    def from_batch(cls, batch):
+        return cls(
+            bookmark_ids=batch.ids,
+            names=batch.names,
+            urls=batch.urls,
+            hosts=batch.hosts(),
+            dates=batch.display_dates(),
+            dates_iso=batch.iso_dates(),
+            next_cursor=batch.next_cursor,
+        )
+
+    def __len__(self):
+        return len(self.bookmark_ids)
+
+    def as_dicts(self):
+        keys = ('bookmark_id', 'name', 'url', 'host', 'date_created', 'date_created_iso')
+        return [
+            dict(zip(keys, row)) for row in zip(
+                self.bookmark_ids, self.names, self.urls, self.hosts,
+                self.dates, self.dates_iso)
+        ]
+
+
+class StreamBookmarksPresenter(OutputBoundary):
+    """Formats bookmarks one at a time as the view model is iterated"""
+
+    def __init__(self):
+        self.view_model = iter(())
+
+    def get_view_model(self):
+        return self.view_model
+
+    def present(self, bookmarks):
+        self.view_model = (format_bookmark_details(bm) for bm in bookmarks)
 
 
-class ListBookmarksController(Controller):
+class ListBookmarksController(Controller, AsyncController):
     """A default controller"""
 
     def __init__(self, usecase, presenter, view):
@@ -64,5 +244,56 @@ class ListBookmarksController(Controller):
         self.view = view
 
     def handle(self, request):
-        self.usecase.list_bookmarks(request['user_id'], self.presenter)
+        self.usecase.list_bookmarks(
+            request['user_id'],
+            self.presenter,
+            limit=self._limit(request),
+            after=request.get('after')
+        )
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    async def handle_async(self, request):
+        await self.usecase.list_bookmarks_async(
+            request['user_id'],
+            self.presenter,
+            limit=self._limit(request),
+            after=request.get('after')
+        )
+        return self.view.generate_view(self.presenter.get_view_model())
+
+    def _limit(self, request):
+        limit = request.get('limit')
+        if limit is None and 'filterkey' in request:
+            limit = Settings.BOOKMARK_LIST_FILTERS.get(
+                request['filterkey'],
+                Settings.BOOKMARK_LIST_FILTERS['recent'])
+        return limit
+
+
+class ListBookmarkBatchController(ListBookmarksController):
+    """Lists bookmarks through the columnar batch path"""
+
+    def handle(self, request):
+        self.usecase.list_bookmark_batch(
+            request['user_id'],
+            self.presenter,
+            limit=self._limit(request),
+            after=request.get('after')
+        )
+        return self.view.generate_view(self.presenter.get_view_model())
+
+
+class StreamBookmarksController(Controller):
+    """
+    Streams every bookmark of a user. The view should consume the view model
+    lazily and may return an iterable of output chunks.
+    """
+
+    def __init__(self, usecase, presenter, view):
+        self.usecase = usecase
+        self.presenter = presenter
+        self.view = view
+
+    def handle(self, request):
+        self.usecase.stream_bookmarks(request['user_id'], self.presenter)
         return self.view.generate_view(self.presenter.get_view_model())
@@ -5,7 +5,7 @@ from links import __version__
 setup(
     name='clean-architecture-python',
     version=__version__,
-    packages=find_packages(exclude=['tests*']),
+    packages=find_packages(exclude=['tests*', 'benchmarks*']),
     package_dir={'links': 'links'},
     url='https://github.com/shudgston/clean-architecture-python',
     license='',
@@ -16,5 +16,8 @@ setup(
         'CouchDB==1.1',
         'python-dateutil==2.6.0',
         'passlib==1.7.1',
-    ]
+    ],
+    extras_require={
+        'async': ['aiohttp>=3.8'],
+    }
 )
@@ -0,0 +1,213 @@
+from datetime import datetime
+from unittest import TestCase, mock
+
+from links.entities import Bookmark, NullBookmark, NullUser, User
+from links.repos.cache import MISSING, CachingBookmarkRepo, CachingUserRepo, LRUCache
+from links.repos.inmemory import MemoryBookmarkRepo, MemoryUserRepo
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTest(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LRUCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_get_counts_hits_and_misses(self):
+        self.assertIs(self.cache.get('a'), MISSING)
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'size': 1, 'bytes': 0})
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertIs(self.cache.get('b'), MISSING)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_entries_expire(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2, ttl=20)
+        self.clock.now = 15
+        self.assertIs(self.cache.get('a'), MISSING)
+        self.assertEqual(self.cache.get('b'), 2)
+
+    def test_none_is_cacheable(self):
+        self.cache.set('a', None)
+        self.assertIsNone(self.cache.get('a'))
+
+
+class CachingUserRepoTest(TestCase):
+
+    def setUp(self):
+        self.backend = MemoryUserRepo()
+        user = User('user')
+        user.password_hash = 'hash'
+        self.backend.save(user)
+        self.backend.get = mock.Mock(wraps=self.backend.get)
+        self.repo = CachingUserRepo(self.backend)
+
+    def test_lookups_share_one_backend_read(self):
+        self.assertTrue(self.repo.exists('user'))
+        self.assertEqual(self.repo.get('user').id, 'user')
+        self.assertEqual(self.repo.get_password_hash('user'), 'hash')
+        self.assertEqual(self.backend.get.call_count, 1)
+
+    def test_unknown_users_are_cached(self):
+        self.assertFalse(self.repo.exists('unknown'))
+        self.assertIsInstance(self.repo.get('unknown'), NullUser)
+        self.assertIsNone(self.repo.get_password_hash('unknown'))
+        self.assertEqual(self.backend.get.call_count, 1)
+
+    def test_exists_many_asks_backend_only_about_unknown_users(self):
+        self.repo.exists('user')
+        self.backend.exists_many = mock.Mock(wraps=self.backend.exists_many)
+
+        result = self.repo.exists_many(['missing', 'user'])
+
+        self.assertEqual(list(result.items()), [('missing', False), ('user', True)])
+        self.backend.exists_many.assert_called_once_with(['missing'])
+        self.assertFalse(self.repo.exists('missing'))
+        self.assertEqual(self.backend.get.call_count, 1)
+
+    def test_save_invalidates(self):
+        self.assertFalse(self.repo.exists('new'))
+        self.repo.save(User('new'))
+        self.assertTrue(self.repo.exists('new'))
+
+    def test_read_racing_an_invalidation_is_not_cached(self):
+        stale = self.backend.get('user')
+
+        def racing_get(user_id):
+            self.repo.invalidate(user_id)
+            return stale
+
+        self.backend.get = mock.Mock(side_effect=racing_get)
+        self.repo.get('user')
+        self.assertIs(self.repo.cache.get('user'), MISSING)
+
+    def test_cached_user_cannot_be_modified_through_get(self):
+        self.repo.get('user').password_hash = 'changed'
+        self.assertEqual(self.repo.get_password_hash('user'), 'hash')
+
+
+class LRUCacheByteLimitTest(TestCase):
+
+    def test_evicts_to_stay_within_max_bytes(self):
+        cache = LRUCache(maxsize=10, max_bytes=10, sizeof=len)
+        cache.set('a', 'xxxx')
+        cache.set('b', 'xxxx')
+        cache.set('c', 'xxxx')
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.nbytes, 8)
+
+    def test_value_larger_than_max_bytes_is_not_cached(self):
+        cache = LRUCache(maxsize=10, max_bytes=10, sizeof=len)
+        cache.set('a', 'x' * 11)
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.nbytes, 0)
+
+
+class CachingBookmarkRepoTest(TestCase):
+
+    def setUp(self):
+        self.backend = MemoryBookmarkRepo()
+        self.backend.save(Bookmark(
+            'id1', 'user', 'name', 'http://test.com', date_created=datetime(2017, 1, 1)))
+        self.backend.save(Bookmark(
+            'id2', 'other', 'name', 'http://test.com', date_created=datetime(2017, 1, 2)))
+        self.backend.get = mock.Mock(wraps=self.backend.get)
+        self.backend.get_by_user = mock.Mock(wraps=self.backend.get_by_user)
+        self.repo = CachingBookmarkRepo(self.backend)
+
+    def test_get_is_cached(self):
+        self.repo.get('id1')
+        self.assertEqual(self.repo.get('id1').name, 'name')
+        self.assertEqual(self.backend.get.call_count, 1)
+
+    def test_modifying_a_fetched_bookmark_does_not_change_the_cache(self):
+        self.repo.get('id1').name = 'changed'
+        self.assertEqual(self.repo.get('id1').name, 'name')
+
+    def test_pages_are_cached(self):
+        self.repo.get_by_user('user', limit=10)
+        page = self.repo.get_by_user('user', limit=10)
+        self.assertEqual([bm.id for bm in page], ['id1'])
+        self.assertEqual(self.backend.get_by_user.call_count, 1)
+
+    def test_batches_are_cached(self):
+        self.backend.get_batch_by_user = mock.Mock(wraps=self.backend.get_batch_by_user)
+        self.repo.get_batch_by_user('user', limit=10).names[0] = 'changed'
+        batch = self.repo.get_batch_by_user('user', limit=10)
+        self.assertEqual(batch.names, ['name'])
+        self.assertEqual(self.backend.get_batch_by_user.call_count, 1)
+
+    def test_save_invalidates_batches(self):
+        self.repo.get_batch_by_user('user', limit=10)
+        self.repo.save(Bookmark('id3', 'user', 'new', 'http://test.com'))
+        self.assertEqual(len(self.repo.get_batch_by_user('user', limit=10)), 2)
+
+    def test_save_invalidates_only_that_users_entries(self):
+        self.repo.get('id1')
+        self.repo.get('id2')
+        self.repo.get_by_user('user', limit=10)
+        self.repo.get_by_user('other', limit=10)
+
+        self.repo.save(Bookmark('id3', 'user', 'new', 'http://test.com'))
+
+        self.assertEqual(len(self.repo.get_by_user('user', limit=10)), 2)
+        self.repo.get_by_user('other', limit=10)
+        self.repo.get('id2')
+        self.assertEqual(self.backend.get_by_user.call_count, 3)
+        self.assertEqual(self.backend.get.call_count, 2)
+
+    def test_delete_invalidates(self):
+        self.repo.get('id1')
+        self.repo.get_by_user('user', limit=10)
+        self.repo.delete('id1')
+        self.assertIsInstance(self.repo.get('id1'), NullBookmark)
+        self.assertEqual(list(self.repo.get_by_user('user', limit=10)), [])
+
+    def test_full_listings_bypass_the_cache(self):
+        self.repo.get_by_user('user')
+        self.repo.get_by_user('user')
+        self.assertEqual(self.backend.get_by_user.call_count, 2)
+
+    def test_read_racing_an_invalidation_is_not_cached(self):
+        stale = self.backend.get('id1')
+
+        def racing_get(bookmark_id):
+            # another writer changes the bookmark while it is being read
+            self.repo.invalidate(bookmark_id, 'user')
+            return stale
+
+        self.backend.get.side_effect = racing_get
+        self.repo.get('id1')
+        self.backend.get.side_effect = None
+        self.repo.get('id1')
+        self.assertEqual(self.backend.get.call_count, 3)
+
+    def test_generations_are_bounded(self):
+        repo = CachingBookmarkRepo(self.backend, page_maxsize=2)
+        for user_id in ('a', 'b', 'c', 'user'):
+            repo.get_by_user(user_id, limit=10)
+        self.assertEqual(len(repo._generations), 2)
+
+    def test_forgotten_generation_does_not_revive_old_pages(self):
+        repo = CachingBookmarkRepo(self.backend, page_maxsize=2)
+        repo.get_by_user('user', limit=10)
+        self.backend.save(Bookmark('id3', 'user', 'new', 'http://test.com'))
+        repo.invalidate('id3', 'user')
+        repo._generations.clear()
+        self.assertEqual(len(repo.get_by_user('user', limit=10)), 2)
@@ -0,0 +1,253 @@
+from datetime import datetime
+from unittest import TestCase, mock
+
+import couchdb
+
+from links.entities import Bookmark, User
+from links.exceptions import RepositoryError
+from links.paging import decode_cursor, encode_cursor
+from links.repos.couchdb import (
+    CouchDBBookmarkRepo,
+    CouchDBUserRepo,
+    DESIGN_DOCS,
+    JSON_BACKENDS,
+    PooledConnections,
+    json_decoder,
+    json_encoder,
+    reset_connection_manager,
+    use_json_backend,
+)
+
+
+class CouchDBRepoTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('links.repos.couchdb.get_connection_manager')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class CouchDBBookmarkRepoSaveTest(CouchDBRepoTest):
+
+    def setUp(self):
+        super().setUp()
+        self.repo = CouchDBBookmarkRepo()
+        self.repo.db.save.return_value = ('id1', '2-b')
+        self.bookmark = Bookmark(
+            'id1', 'user', 'name', 'http://test.com',
+            date_created=datetime(2017, 1, 1))
+
+    def test_get_carries_revision(self):
+        self.repo.db.__getitem__.return_value = {
+            '_id': 'id1',
+            '_rev': '1-a',
+            'user_id': 'user',
+            'name': 'name',
+            'url': 'http://test.com',
+            'date_created': datetime(2017, 1, 1),
+        }
+        self.assertEqual(self.repo.get('id1').revision, '1-a')
+
+    def test_create_is_a_single_put(self):
+        self.repo.save(self.bookmark)
+        self.repo.db.__getitem__.assert_not_called()
+        doc = self.repo.db.save.call_args[0][0]
+        self.assertNotIn('_rev', doc)
+        self.assertEqual(self.bookmark.revision, '2-b')
+
+    def test_update_reuses_known_revision(self):
+        self.bookmark.revision = '1-a'
+        self.repo.save(self.bookmark)
+        self.repo.db.__getitem__.assert_not_called()
+        doc = self.repo.db.save.call_args[0][0]
+        self.assertEqual(doc['_rev'], '1-a')
+        self.assertEqual(self.bookmark.revision, '2-b')
+
+    def test_create_of_existing_doc_falls_back_to_update(self):
+        self.repo.db.save.side_effect = [
+            couchdb.http.ResourceConflict('conflict'),
+            ('id1', '2-b'),
+        ]
+        self.repo.db.__getitem__.return_value = {'_rev': '1-a'}
+        self.repo.save(self.bookmark)
+        self.assertEqual(self.repo.db.save.call_count, 2)
+        self.assertEqual(self.bookmark.revision, '2-b')
+
+    def test_stale_revision_raises(self):
+        self.bookmark.revision = '1-a'
+        self.repo.db.save.side_effect = couchdb.http.ResourceConflict('conflict')
+        with self.assertRaises(RepositoryError):
+            self.repo.save(self.bookmark)
+
+
+class CouchDBBookmarkRepoGetByUserTest(CouchDBRepoTest):
+
+    def setUp(self):
+        super().setUp()
+        self.repo = CouchDBBookmarkRepo()
+        self.rows = [
+            self.make_row('id{}'.format(day), '2017-01-0{}T00:00:00'.format(day))
+            for day in (3, 2, 1)
+        ]
+
+    def make_row(self, bookmark_id, date_created):
+        return couchdb.client.Row(
+            id=bookmark_id,
+            key=['user', date_created],
+            value={
+                'id': bookmark_id,
+                'name': 'name',
+                'url': 'http://test.com',
+                'date_created': date_created,
+            }
+        )
+
+    def test_entities_are_built_from_view_values(self):
+        self.repo.db.view.return_value = self.rows[:1]
+        bookmark = self.repo.get_by_user('user', limit=2)[0]
+
+        self.assertNotIn('include_docs', self.repo.db.view.call_args[1])
+        self.assertEqual(bookmark.id, 'id3')
+        self.assertEqual(bookmark.user_id, 'user')
+        self.assertEqual(bookmark.name, 'name')
+        self.assertEqual(bookmark.url, 'http://test.com')
+
+    def test_page_fetches_one_extra_row_for_the_cursor(self):
+        self.repo.db.view.return_value = self.rows
+        page = self.repo.get_by_user('user', limit=2)
+
+        opts = self.repo.db.view.call_args[1]
+        self.assertEqual(opts['limit'], 3)
+        self.assertEqual(opts['startkey'], ['user', {}])
+        self.assertEqual([bm.id for bm in page], ['id3', 'id2'])
+        self.assertEqual(decode_cursor(page.next_cursor), ('2017-01-01T00:00:00', 'id1'))
+
+    def test_batch_is_filled_from_view_values(self):
+        self.repo.db.view.return_value = self.rows
+        batch = self.repo.get_batch_by_user('user', limit=2)
+
+        self.assertEqual(batch.ids, ['id3', 'id2'])
+        self.assertEqual(batch.iso_dates(), ['2017-01-03T00:00:00', '2017-01-02T00:00:00'])
+        self.assertEqual(decode_cursor(batch.next_cursor), ('2017-01-01T00:00:00', 'id1'))
+
+    def test_cursor_becomes_startkey(self):
+        self.repo.db.view.return_value = self.rows[2:]
+        cursor = encode_cursor('2017-01-01T00:00:00', 'id1')
+        page = self.repo.get_by_user('user', limit=2, after=cursor)
+
+        opts = self.repo.db.view.call_args[1]
+        self.assertEqual(opts['startkey'], ['user', '2017-01-01T00:00:00'])
+        self.assertEqual(opts['startkey_docid'], 'id1')
+        self.assertEqual([bm.id for bm in page], ['id1'])
+        self.assertIsNone(page.next_cursor)
+
+
+class CouchDBBookmarkRepoInstallViewsTest(CouchDBRepoTest):
+
+    def setUp(self):
+        super().setUp()
+        self.repo = CouchDBBookmarkRepo()
+
+    def test_missing_design_doc_is_created(self):
+        self.repo.db.get.return_value = None
+        self.assertEqual(self.repo.install_views(), ['_design/bookmarks', '_design/changes'])
+        self.assertNotIn('_rev', self.repo.db.save.call_args[0][0])
+
+    def test_outdated_design_doc_is_updated(self):
+        self.repo.db.get.return_value = {'_rev': '1-a', 'views': {}}
+        self.assertEqual(self.repo.install_views(), ['_design/bookmarks', '_design/changes'])
+        self.assertEqual(self.repo.db.save.call_args[0][0]['_rev'], '1-a')
+
+    def test_current_design_doc_is_left_alone(self):
+        installed = {doc['_id']: dict(doc, _rev='1-a') for doc in DESIGN_DOCS}
+        self.repo.db.get.side_effect = installed.get
+        self.assertEqual(self.repo.install_views(), [])
+        self.repo.db.save.assert_not_called()
+
+
+class CouchDBUserRepoTest(CouchDBRepoTest):
+
+    def setUp(self):
+        super().setUp()
+        self.repo = CouchDBUserRepo()
+
+    def test_exists_does_not_fetch_the_document(self):
+        self.repo.db.__contains__.return_value = True
+        self.assertTrue(self.repo.exists('user'))
+        self.repo.db.__contains__.assert_called_once_with('user')
+        self.repo.db.__getitem__.assert_not_called()
+
+    def test_save_existing_user_is_a_single_request(self):
+        self.repo.db.save.side_effect = couchdb.http.ResourceConflict('conflict')
+        self.repo.save(User('user'))
+        self.repo.db.save.assert_called_once()
+        self.repo.db.__contains__.assert_not_called()
+
+    def test_exists_many_is_one_all_docs_request(self):
+        self.repo.db.view.return_value = [
+            couchdb.client.Row(id='a', key='a', value={'rev': '1-a'}),
+            couchdb.client.Row(key='b', error='not_found'),
+            couchdb.client.Row(id='c', key='c', value={'rev': '2-c', 'deleted': True}),
+        ]
+        result = self.repo.exists_many(['a', 'b', 'c', None])
+        self.assertEqual(result, {'a': True, 'b': False, 'c': False, None: False})
+        self.repo.db.view.assert_called_once_with('_all_docs', keys=['a', 'b', 'c'])
+
+
+class ConnectionManagerTest(TestCase):
+
+    def setUp(self):
+        reset_connection_manager()
+        self.addCleanup(reset_connection_manager)
+
+    def test_repos_share_one_manager_and_database_handle(self):
+        with mock.patch('couchdb.http.Session.request') as request:
+            bookmarks = CouchDBBookmarkRepo()
+            users = CouchDBUserRepo()
+        request.assert_not_called()
+        self.assertIs(bookmarks.server, users.server)
+        self.assertIs(bookmarks.db, users.db)
+
+    def test_pool_keeps_at_most_max_size_idle_connections(self):
+        pool = PooledConnections(1)
+        first, second = mock.Mock(), mock.Mock()
+        pool.release('http://localhost:5984/db', first)
+        pool.release('http://localhost:5984/db', second)
+        self.assertEqual(pool.conns[('http', 'localhost:5984')], [first])
+        second.close.assert_called_once_with()
+
+    def test_pool_without_keep_alive_closes_connections(self):
+        pool = PooledConnections(10, keep_alive=False)
+        conn = mock.Mock()
+        pool.release('http://localhost:5984/db', conn)
+        conn.close.assert_called_once_with()
+        self.assertEqual(pool.conns, {})
+
+
+class JSONCodecTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(use_json_backend, 'json')
+
+    def test_round_trip_with_each_installed_backend(self):
+        doc = {'rows': [{'value': {'date_created': datetime(2017, 1, 1, 12, 30)}}]}
+        for backend in JSON_BACKENDS:
+            if use_json_backend(backend) != backend:
+                continue
+            with self.subTest(backend=backend):
+                # dates stay strings until an entity parses them
+                self.assertEqual(
+                    json_decoder(json_encoder(doc)),
+                    {'rows': [{'value': {'date_created': '2017-01-01T12:30:00'}}]})
+
+    def test_missing_backend_falls_back_to_json(self):
+        with mock.patch.dict('sys.modules', {'ujson': None}):
+            self.assertEqual(use_json_backend('ujson'), 'json')
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            use_json_backend('yaml')
+
+    def test_no_auto_ranking(self):
+        with self.assertRaises(ValueError):
+            use_json_backend('auto')
@@ -0,0 +1,99 @@
+from datetime import datetime
+from unittest import IsolatedAsyncioTestCase, TestCase, mock
+
+import couchdb
+
+from links.entities import Bookmark, NullUser, User
+from links.exceptions import RepositoryError
+from links.repos.couchdb_async import (
+    AsyncCouchDBBookmarkRepo,
+    AsyncCouchDBUserRepo,
+    encode_options,
+)
+
+
+class EncodeOptionsTest(TestCase):
+
+    def test_keys_are_json_encoded(self):
+        params = encode_options({
+            'startkey': ['user', {}], 'limit': 11, 'descending': True, 'skip': None})
+        self.assertEqual(params, {
+            'startkey': '["user", {}]', 'limit': '11', 'descending': 'true'})
+
+
+class AsyncCouchDBBookmarkRepoTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.repo = AsyncCouchDBBookmarkRepo()
+        self.repo.request = mock.AsyncMock()
+        self.bookmark = Bookmark(
+            'id1', 'user', 'name', 'http://test.com',
+            date_created=datetime(2017, 1, 1))
+
+    async def test_create_is_a_single_put(self):
+        self.repo.request.return_value = {'ok': True, 'id': 'id1', 'rev': '1-a'}
+        await self.repo.save(self.bookmark)
+        self.repo.request.assert_awaited_once()
+        self.assertEqual(self.repo.request.call_args[0][:2], ('PUT', 'id1'))
+        self.assertEqual(self.bookmark.revision, '1-a')
+
+    async def test_update_conflict_raises_repository_error(self):
+        self.bookmark.revision = '1-a'
+        self.repo.request.side_effect = couchdb.http.ResourceConflict('id1')
+        with self.assertRaises(RepositoryError):
+            await self.repo.save(self.bookmark)
+
+    async def test_save_many_maps_row_results(self):
+        other = Bookmark('id2', 'user', 'name', 'http://test.com')
+        self.repo.request.return_value = [
+            {'ok': True, 'id': 'id1', 'rev': '1-a'},
+            {'id': 'id2', 'error': 'conflict', 'reason': 'Document update conflict.'},
+        ]
+        results = await self.repo.save_many([self.bookmark, other])
+        self.assertEqual([r.ok for r in results], [True, False])
+        self.assertEqual(results[1].error, 'conflict')
+        self.assertEqual(self.bookmark.revision, '1-a')
+
+    async def test_get_by_user_pages_view_rows(self):
+        self.repo.request.return_value = {'rows': [
+            {'id': 'id{}'.format(i),
+             'key': ['user', '2017-01-0{}T00:00:00'.format(i)],
+             'value': {'id': 'id{}'.format(i), 'name': 'name', 'url': 'http://test.com',
+                       'date_created': '2017-01-0{}T00:00:00'.format(i)}}
+            for i in range(1, 4)
+        ]}
+        page = await self.repo.get_by_user('user', limit=2)
+        self.assertEqual([bm.id for bm in page], ['id1', 'id2'])
+        self.assertIsNotNone(page.next_cursor)
+        self.assertEqual(self.repo.request.call_args[1]['limit'], 3)
+
+
+class AsyncCouchDBUserRepoTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.repo = AsyncCouchDBUserRepo()
+        self.repo.request = mock.AsyncMock()
+
+    async def test_exists_uses_head_request(self):
+        self.repo.request.return_value = None
+        self.assertTrue(await self.repo.exists('user'))
+        self.repo.request.assert_awaited_once_with('HEAD', 'user')
+
+    async def test_save_existing_user_is_a_single_request(self):
+        self.repo.request.side_effect = couchdb.http.ResourceConflict('user')
+        await self.repo.save(User('user'))
+        self.repo.request.assert_awaited_once()
+
+    async def test_exists_many(self):
+        self.repo.request.return_value = {'rows': [
+            {'id': 'a', 'key': 'a', 'value': {'rev': '1-a'}},
+            {'key': 'b', 'error': 'not_found'},
+        ]}
+        self.assertEqual(await self.repo.exists_many(['a', 'b']), {'a': True, 'b': False})
+        self.repo.request.assert_awaited_once_with('POST', '_all_docs', body={'keys': ['a', 'b']})
+
+    async def test_missing_user(self):
+        self.repo.request.side_effect = couchdb.http.ResourceNotFound('user')
+        self.assertFalse(await self.repo.exists('user'))
+        self.assertIsInstance(await self.repo.get('user'), NullUser)
+        self.assertEqual(await self.repo.get_password_hash('user'), '')
@@ -0,0 +1,117 @@
+import os
+import tempfile
+from datetime import datetime
+from unittest import TestCase, mock
+
+from couchdb.client import Row
+
+from links.entities import Bookmark, User
+from links.repos.cache import CachingBookmarkRepo, CachingUserRepo
+from links.repos.couchdb_changes import (
+    Change,
+    ChangesFollower,
+    FileSequenceStore,
+    MemorySequenceStore,
+)
+from links.repos.inmemory import MemoryBookmarkRepo, MemoryUserRepo
+
+
+class FileSequenceStoreTest(TestCase):
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = FileSequenceStore(os.path.join(directory, 'since'))
+            self.assertIsNone(store.load())
+            store.save('42-abc')
+            self.assertEqual(store.load(), '42-abc')
+
+
+class ChangesFollowerTest(TestCase):
+
+    def setUp(self):
+        self.db = mock.Mock()
+        self.db.changes.return_value = {
+            'results': [
+                {'seq': '1-a', 'id': 'id1', 'changes': []},
+                {'seq': '2-b', 'id': 'id2', 'changes': [], 'deleted': True},
+            ],
+            'last_seq': '2-b',
+        }
+        self.db.view.return_value = [
+            Row(id='id1', key='id1', value=['bookmark', 'user']),
+        ]
+
+    def test_starts_from_now_without_a_stored_sequence(self):
+        follower = ChangesFollower(self.db)
+        self.assertEqual(follower.since, 'now')
+
+    def test_resumes_from_stored_sequence(self):
+        follower = ChangesFollower(self.db, store=MemorySequenceStore('7-x'))
+        follower.poll()
+        self.assertEqual(self.db.changes.call_args[1]['since'], '7-x')
+
+    def test_poll_publishes_and_persists(self):
+        store = MemorySequenceStore()
+        follower = ChangesFollower(self.db, store=store)
+        received = []
+        follower.subscribe(received.append)
+
+        self.assertEqual(follower.poll(), 2)
+        self.assertEqual(received, [
+            Change('1-a', 'id1', False, 'bookmark', 'user'),
+            Change('2-b', 'id2', True, None, None),
+        ])
+        self.assertEqual(store.load(), '2-b')
+        self.assertEqual(follower.since, '2-b')
+
+    def test_poll_reads_summaries_not_documents(self):
+        follower = ChangesFollower(self.db)
+        follower.poll()
+        self.assertNotIn('include_docs', self.db.changes.call_args[1])
+        self.db.view.assert_called_once_with('changes/summary', keys=['id1'])
+
+    def test_failed_summary_read_publishes_unknown_changes(self):
+        self.db.view.side_effect = ValueError
+        follower = ChangesFollower(self.db)
+        received = []
+        follower.subscribe(received.append)
+        with self.assertLogs('links.repos.couchdb_changes', 'ERROR'):
+            follower.poll()
+        self.assertEqual(received[0], Change('1-a', 'id1', False, None, None))
+
+    def test_failing_subscriber_does_not_stop_the_others(self):
+        follower = ChangesFollower(self.db)
+        received = []
+        follower.subscribe(mock.Mock(side_effect=ValueError))
+        follower.subscribe(received.append)
+        follower.poll()
+        self.assertEqual(len(received), 2)
+
+
+class CacheSubscriberTest(TestCase):
+
+    def test_user_cache_drops_changed_user(self):
+        backend = MemoryUserRepo()
+        repo = CachingUserRepo(backend)
+        self.assertFalse(repo.exists('user'))
+        backend.save(User('user'))
+        repo.on_change(Change('1', 'user', False, 'user', None))
+        self.assertTrue(repo.exists('user'))
+
+    def test_bookmark_cache_drops_changed_bookmark_and_owner_pages(self):
+        backend = MemoryBookmarkRepo()
+        repo = CachingBookmarkRepo(backend)
+        self.assertEqual(list(repo.get_by_user('user', limit=10)), [])
+        backend.save(Bookmark(
+            'id1', 'user', 'name', 'http://test.com', date_created=datetime(2017, 1, 1)))
+        repo.on_change(Change('1', 'id1', False, 'bookmark', 'user'))
+        self.assertEqual(len(repo.get_by_user('user', limit=10)), 1)
+
+    def test_bookmark_delete_of_unknown_owner_drops_all_pages(self):
+        backend = MemoryBookmarkRepo()
+        backend.save(Bookmark('id1', 'user', 'name', 'http://test.com'))
+        repo = CachingBookmarkRepo(backend)
+        repo.get_by_user('user', limit=10)
+        backend.delete('id1')
+        repo.on_change(Change('2', 'id1', True, None, None))
+        self.assertEqual(list(repo.get_by_user('user', limit=10)), [])
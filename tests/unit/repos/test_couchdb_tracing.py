@@ -0,0 +1,142 @@
+import io
+import json
+import logging
+from unittest import TestCase, mock
+
+import couchdb
+
+from links import instrumentation
+from links.repos import couchdb_tracing
+from links.repos.couchdb import ConnectionManager
+from links.settings import CouchDBSettings
+
+
+class TracingSettings(CouchDBSettings):
+    DATABASE_HOST = 'http://localhost:5984'
+    TRACE_REQUESTS = 1
+
+
+def json_response(data):
+    return 200, {'content-type': 'application/json'}, io.BytesIO(json.dumps(data).encode())
+
+
+class TracedResourceTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('couchdb.http.Session.request')
+        self.request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = ConnectionManager(TracingSettings).database('links')
+        self.stats = couchdb_tracing.RequestStats()
+        token = couchdb_tracing._current_stats.set(self.stats)
+        self.addCleanup(couchdb_tracing._current_stats.reset, token)
+
+    def list_view(self):
+        self.request.return_value = json_response(
+            {'total_rows': 2, 'offset': 0, 'rows': [{'id': 'a'}, {'id': 'b'}]})
+        return list(self.db.view(
+            '_design/bookmarks/_view/by_user',
+            startkey=['bob', {}], endkey=['bob'], descending=True, limit=3))
+
+    def test_database_handles_are_traced(self):
+        self.assertIsInstance(self.db.resource, couchdb_tracing.TracedResource)
+
+    def test_counts_requests(self):
+        self.list_view()
+        self.list_view()
+        self.assertEqual(self.stats.requests, 2)
+
+    def test_slow_request_is_logged_with_view_and_key_range(self):
+        with mock.patch.object(CouchDBSettings, 'SLOW_QUERY_MS', 1e-6):
+            with self.assertLogs('links.repos.couchdb_tracing', logging.WARNING) as logs:
+                self.list_view()
+
+        record, = logs.records
+        fields = record.couchdb_request
+        self.assertEqual(fields['path'], 'links/_design/bookmarks/_view/by_user')
+        self.assertEqual(fields['view'], 'bookmarks/by_user')
+        self.assertEqual(fields['startkey'], '["bob", {}]')
+        self.assertEqual(fields['endkey'], '["bob"]')
+        self.assertEqual(fields['limit'], '3')
+        self.assertEqual(fields['rows'], 2)
+        self.assertEqual(fields['status'], 200)
+        self.assertIn('view=bookmarks/by_user', record.getMessage())
+
+    def test_fast_request_is_not_logged(self):
+        with self.assertNoLogs('links.repos.couchdb_tracing', logging.WARNING):
+            self.list_view()
+
+    def test_changes_long_poll_is_counted_but_not_logged(self):
+        self.request.return_value = json_response({'results': [], 'last_seq': '1'})
+        with mock.patch.object(CouchDBSettings, 'SLOW_QUERY_MS', 1e-6):
+            with self.assertNoLogs('links.repos.couchdb_tracing', logging.WARNING):
+                self.db.changes(feed='longpoll', since='0', timeout=15000)
+        self.assertEqual(self.stats.requests, 1)
+
+    def test_failed_request_is_counted_with_its_status(self):
+        self.request.side_effect = couchdb.http.ResourceNotFound(('not_found', 'missing'))
+        with mock.patch.object(CouchDBSettings, 'SLOW_QUERY_MS', 1e-6):
+            with self.assertLogs('links.repos.couchdb_tracing', logging.WARNING) as logs:
+                self.assertNotIn('bob', self.db)
+
+        self.assertEqual(self.stats.requests, 1)
+        self.assertEqual(logs.records[0].couchdb_request['status'], 404)
+        self.assertEqual(logs.records[0].couchdb_request['method'], 'HEAD')
+
+    def test_requests_are_added_to_the_instrumentation_trace(self):
+        trace = instrumentation.Trace('ListBookmarks')
+        token = instrumentation._current_trace.set(trace)
+        self.addCleanup(instrumentation._current_trace.reset, token)
+
+        self.list_view()
+
+        self.assertEqual(trace.db_requests[0], 1)
+
+
+class DescribeRequestTest(TestCase):
+
+    def test_posted_keys_are_counted(self):
+        fields = couchdb_tracing.describe_request(
+            'POST', 'http://localhost:5984/links/_all_docs', {},
+            body={'keys': ['a', 'b', 'c']})
+        self.assertEqual(fields['view'], '_all_docs')
+        self.assertEqual(fields['keys'], 3)
+
+    def test_rows_of_bulk_docs_reply(self):
+        self.assertEqual(couchdb_tracing.count_rows([{'ok': True}, {'ok': True}]), 2)
+        self.assertIsNone(couchdb_tracing.count_rows({'ok': True}))
+
+
+class FakeRepo:
+
+    def get(self, requests):
+        for _ in range(requests):
+            couchdb_tracing.record_request({'method': 'GET', 'path': 'links/x'}, 0.001)
+        return requests
+
+    def save(self, requests):
+        # nested calls are counted once, by the outer call
+        return self.traced.get(requests)
+
+
+class TracedRepoTest(TestCase):
+
+    def setUp(self):
+        self.fake = FakeRepo()
+        self.repo = couchdb_tracing.TracedRepo(self.fake, 'bookmark_repo', max_requests=2)
+        self.fake.traced = self.repo
+
+    def test_calls_within_the_limit_are_not_logged(self):
+        with self.assertNoLogs('links.repos.couchdb_tracing', logging.WARNING):
+            self.assertEqual(self.repo.get(2), 2)
+
+    def test_calls_over_the_limit_are_logged(self):
+        with self.assertLogs('links.repos.couchdb_tracing', logging.WARNING) as logs:
+            self.repo.save(3)
+
+        record, = logs.records
+        self.assertEqual(record.couchdb_calls['method'], 'bookmark_repo.save')
+        self.assertEqual(record.couchdb_calls['requests'], 3)
+
+    def test_attributes_are_forwarded(self):
+        self.assertIs(self.repo.traced, self.repo)
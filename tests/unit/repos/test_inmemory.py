@@ -0,0 +1,213 @@
+from datetime import datetime
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from links.entities import Bookmark, NullBookmark, User, NullUser
+from links.exceptions import ValidationError
+from links.paging import encode_cursor
+from links.repos.inmemory import (
+    AsyncMemoryBookmarkRepo,
+    AsyncMemoryUserRepo,
+    MemoryBookmarkRepo,
+    MemoryUserRepo,
+)
+from links.repos.interfaces import SaveResult
+
+
+class MemoryBookmarkRepoTest(TestCase):
+
+    def setUp(self):
+        self.repo = MemoryBookmarkRepo()
+        self.older = Bookmark(
+            'id1', 'user', 'older', 'http://test.com',
+            date_created=datetime(2017, 1, 1))
+        self.newer = Bookmark(
+            'id2', 'user', 'newer', 'http://test.com',
+            date_created=datetime(2017, 1, 2))
+        self.other = Bookmark(
+            'id3', 'otheruser', 'other', 'http://test.com',
+            date_created=datetime(2017, 1, 3))
+
+    def test_get(self):
+        self.repo.save(self.older)
+        bm = self.repo.get('id1')
+        self.assertEqual(bm.name, 'older')
+        self.assertEqual(bm.date_created, datetime(2017, 1, 1))
+
+    def test_get_unknown_returns_null_bookmark(self):
+        self.assertIsInstance(self.repo.get('unknown'), NullBookmark)
+
+    def test_get_batch_by_user_pages_like_get_by_user(self):
+        self.repo.save(self.newer)
+        self.repo.save(self.other)
+        self.repo.save(self.older)
+        batch = self.repo.get_batch_by_user('user', limit=1)
+        self.assertEqual(batch.ids, ['id2'])
+        batch = self.repo.get_batch_by_user('user', limit=1, after=batch.next_cursor)
+        self.assertEqual(batch.ids, ['id1'])
+        self.assertIsNone(batch.next_cursor)
+
+    def test_delete(self):
+        self.repo.save(self.older)
+        self.repo.save(self.newer)
+        self.repo.delete('id1')
+        self.assertIsInstance(self.repo.get('id1'), NullBookmark)
+        self.assertEqual([bm.id for bm in self.repo.get_by_user('user')], ['id2'])
+
+    def test_get_by_user_is_newest_first(self):
+        self.repo.save(self.newer)
+        self.repo.save(self.other)
+        self.repo.save(self.older)
+        ids = [bm.id for bm in self.repo.get_by_user('user')]
+        self.assertEqual(ids, ['id2', 'id1'])
+
+    def test_get_by_user_respects_limit(self):
+        self.repo.save(self.newer)
+        self.repo.save(self.older)
+        ids = [bm.id for bm in self.repo.get_by_user('user', limit=1)]
+        self.assertEqual(ids, ['id2'])
+
+    def test_get_by_user_pages_with_cursor(self):
+        for day in range(1, 6):
+            self.repo.save(Bookmark(
+                'id{}'.format(day), 'user', 'name', 'http://test.com',
+                date_created=datetime(2017, 2, day)))
+
+        first = self.repo.get_by_user('user', limit=2)
+        second = self.repo.get_by_user('user', limit=2, after=first.next_cursor)
+        third = self.repo.get_by_user('user', limit=2, after=second.next_cursor)
+
+        self.assertEqual([bm.id for bm in first], ['id5', 'id4'])
+        self.assertEqual([bm.id for bm in second], ['id3', 'id2'])
+        self.assertEqual([bm.id for bm in third], ['id1'])
+        self.assertIsNone(third.next_cursor)
+
+    def test_bookmarks_with_the_same_date_are_paged_by_id(self):
+        for bookmark_id in ('a', 'b', 'c'):
+            self.repo.save(Bookmark(
+                bookmark_id, 'user', 'name', 'http://test.com',
+                date_created=datetime(2017, 2, 1)))
+
+        first = self.repo.get_by_user('user', limit=2)
+        second = self.repo.get_by_user('user', limit=2, after=first.next_cursor)
+
+        self.assertEqual([bm.id for bm in first], ['c', 'b'])
+        self.assertEqual([bm.id for bm in second], ['a'])
+
+    def test_invalid_cursor_raises_validation_error(self):
+        self.repo.save(self.older)
+        cursor = encode_cursor('not a date', 'id1')
+        for after in ('garbage', cursor):
+            with self.assertRaises(ValidationError):
+                self.repo.get_by_user('user', after=after)
+
+    def test_iter_by_user_walks_every_page(self):
+        self.repo.save(self.newer)
+        self.repo.save(self.older)
+        ids = [bm.id for bm in self.repo.iter_by_user('user', batch_size=1)]
+        self.assertEqual(ids, ['id2', 'id1'])
+
+    def test_get_by_unknown_user(self):
+        self.assertEqual(self.repo.get_by_user('unknown'), [])
+
+    def test_save_replaces_existing_bookmark(self):
+        self.repo.save(self.older)
+        self.older.name = 'renamed'
+        self.repo.save(self.older)
+
+        bookmarks = self.repo.get_by_user('user')
+        self.assertEqual(len(bookmarks), 1)
+        self.assertEqual(bookmarks[0].name, 'renamed')
+
+    def test_save_many(self):
+        results = self.repo.save_many([self.older, self.newer, self.other])
+        self.assertEqual(
+            results,
+            [
+                SaveResult('id1', True, None),
+                SaveResult('id2', True, None),
+                SaveResult('id3', True, None),
+            ]
+        )
+        self.assertEqual(len(self.repo.get_by_user('user')), 2)
+
+    def test_save_many_reports_bookmarks_without_id(self):
+        self.older.id = None
+        results = self.repo.save_many([self.older, self.newer])
+        self.assertFalse(results[0].ok)
+        self.assertTrue(results[1].ok)
+        self.assertEqual(len(self.repo.get_by_user('user')), 1)
+
+    def test_save_moves_bookmark_between_users(self):
+        self.repo.save(self.older)
+        self.older.user_id = 'otheruser'
+        self.repo.save(self.older)
+
+        self.assertEqual(self.repo.get_by_user('user'), [])
+        self.assertEqual(len(self.repo.get_by_user('otheruser')), 1)
+
+
+class MemoryUserRepoTest(TestCase):
+
+    def setUp(self):
+        self.repo = MemoryUserRepo()
+        self.user = User('user')
+        self.user.password_hash = 'hash'
+        self.repo.save(self.user)
+
+    def test_get(self):
+        user = self.repo.get('user')
+        self.assertEqual(user.id, 'user')
+        self.assertEqual(user.password_hash, 'hash')
+
+    def test_get_unknown_returns_null_user(self):
+        self.assertIsInstance(self.repo.get('unknown'), NullUser)
+
+    def test_exists(self):
+        self.assertTrue(self.repo.exists('user'))
+        self.assertFalse(self.repo.exists('unknown'))
+        self.assertFalse(self.repo.exists(None))
+
+    def test_get_password_hash(self):
+        self.assertEqual(self.repo.get_password_hash('user'), 'hash')
+        self.assertIsNone(self.repo.get_password_hash('unknown'))
+
+    def test_save_replaces_existing_user(self):
+        self.user.password_hash = 'new hash'
+        self.repo.save(self.user)
+        self.assertEqual(self.repo.get_password_hash('user'), 'new hash')
+
+
+class AsyncMemoryRepoTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.bookmark_repo = MemoryBookmarkRepo()
+        self.user_repo = MemoryUserRepo()
+        self.async_bookmark_repo = AsyncMemoryBookmarkRepo(self.bookmark_repo)
+        self.async_user_repo = AsyncMemoryUserRepo(self.user_repo)
+
+    async def test_bookmarks_share_storage_with_sync_repo(self):
+        await self.async_bookmark_repo.save(
+            Bookmark('id1', 'user', 'name', 'http://test.com'))
+        self.assertEqual(self.bookmark_repo.get('id1').name, 'name')
+        bm = await self.async_bookmark_repo.get('id1')
+        self.assertEqual(bm.id, 'id1')
+
+    async def test_iter_by_user_walks_all_pages(self):
+        for i in range(5):
+            self.bookmark_repo.save(Bookmark(
+                'id{}'.format(i), 'user', 'name', 'http://test.com',
+                date_created=datetime(2017, 1, i + 1)))
+        ids = [bm.id async for bm in self.async_bookmark_repo.iter_by_user('user', batch_size=2)]
+        self.assertEqual(ids, ['id4', 'id3', 'id2', 'id1', 'id0'])
+
+    async def test_exists_many(self):
+        self.user_repo.save(User('user'))
+        self.assertEqual(
+            await self.async_user_repo.exists_many(['user', 'other']),
+            {'user': True, 'other': False})
+
+    async def test_users_share_storage_with_sync_repo(self):
+        await self.async_user_repo.save(User('user'))
+        self.assertTrue(self.user_repo.exists('user'))
+        self.assertTrue(await self.async_user_repo.exists('user'))
+        self.assertFalse(await self.async_user_repo.exists('other'))
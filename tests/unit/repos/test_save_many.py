@@ -0,0 +1,81 @@
+from datetime import datetime
+from unittest import TestCase
+
+from benchmarks.couchdb_stub import StubSession
+from links.entities import Bookmark
+from links.repos.couchdb import ConnectionManager, CouchDBBookmarkRepo
+from links.repos.inmemory import MemoryBookmarkRepo
+from links.repos.interfaces import SaveResult
+
+
+class SaveManyContract:
+    """The save_many behaviour every BookmarkRepo shares"""
+
+    def make_repo(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.repo = self.make_repo()
+
+    def bookmark(self, name='name', bookmark_id='id1'):
+        return Bookmark(
+            bookmark_id, 'user', name, 'http://test.com',
+            date_created=datetime(2017, 1, 1))
+
+    def test_creates_new_bookmarks(self):
+        bookmark = self.bookmark()
+        self.assertEqual(self.repo.save_many([bookmark]), [SaveResult('id1', True, None)])
+        self.assertIsNotNone(bookmark.revision)
+        self.assertEqual(self.repo.get('id1').revision, bookmark.revision)
+
+    def test_duplicate_id_in_one_call_conflicts(self):
+        results = self.repo.save_many([self.bookmark('first'), self.bookmark('second')])
+        self.assertEqual(results, [
+            SaveResult('id1', True, None),
+            SaveResult('id1', False, 'conflict'),
+        ])
+        self.assertEqual(self.repo.get('id1').name, 'first')
+
+    def test_existing_id_without_revision_conflicts(self):
+        self.repo.save_many([self.bookmark('first')])
+        results = self.repo.save_many([self.bookmark('second')])
+        self.assertEqual(results, [SaveResult('id1', False, 'conflict')])
+        self.assertEqual(self.repo.get('id1').name, 'first')
+
+    def test_current_revision_updates(self):
+        self.repo.save_many([self.bookmark('first')])
+        bookmark = self.repo.get('id1')
+        revision = bookmark.revision
+        bookmark.name = 'second'
+
+        self.assertEqual(self.repo.save_many([bookmark]), [SaveResult('id1', True, None)])
+        self.assertNotEqual(bookmark.revision, revision)
+        self.assertEqual(self.repo.get('id1').name, 'second')
+
+    def test_stale_revision_conflicts(self):
+        self.repo.save_many([self.bookmark('first')])
+        stale = self.repo.get('id1')
+        current = self.repo.get('id1')
+        current.name = 'second'
+        self.repo.save_many([current])
+
+        stale.name = 'third'
+        self.assertEqual(self.repo.save_many([stale]), [SaveResult('id1', False, 'conflict')])
+        self.assertEqual(self.repo.get('id1').name, 'second')
+
+    def test_listed_bookmarks_carry_no_revision(self):
+        self.repo.save_many([self.bookmark('first')])
+        listed = self.repo.get_by_user('user')[0]
+        self.assertEqual(self.repo.save_many([listed]), [SaveResult('id1', False, 'conflict')])
+
+
+class MemorySaveManyTest(SaveManyContract, TestCase):
+
+    def make_repo(self):
+        return MemoryBookmarkRepo()
+
+
+class CouchDBSaveManyTest(SaveManyContract, TestCase):
+
+    def make_repo(self):
+        return CouchDBBookmarkRepo(ConnectionManager(session=StubSession()))
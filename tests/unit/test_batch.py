@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from links.batch import BookmarkBatch, to_iso
+from links.entities import Bookmark
+
+
+class ToISOTest(TestCase):
+
+    def test_iso_string_is_kept(self):
+        for value in ('2017-01-02T03:04:05', '2017-01-02T03:04:05.678901+02:00'):
+            self.assertIs(to_iso(value), value)
+
+    def test_datetime(self):
+        dt = datetime(2017, 1, 2, 10, tzinfo=timezone(timedelta(hours=2)))
+        self.assertEqual(to_iso(dt), '2017-01-02T10:00:00+02:00')
+
+    def test_other_strings_are_normalised(self):
+        self.assertEqual(to_iso('Jan 2, 2017 10:00'), '2017-01-02T10:00:00')
+        self.assertEqual(to_iso('2017-01-02'), '2017-01-02T00:00:00')
+
+    def test_invalid_date_raises(self):
+        for value in ('not a date', None):
+            with self.assertRaises(ValueError):
+                to_iso(value)
+
+
+class BookmarkBatchTest(TestCase):
+
+    def setUp(self):
+        self.batch = BookmarkBatch.from_entities('user', [
+            Bookmark('id1', 'user', 'one', 'http://www.one.com/a',
+                     date_created=datetime(2017, 1, 1, 9)),
+            Bookmark('id2', 'user', 'two', 'http://two.com',
+                     date_created='2017-01-01T18:30:00'),
+        ])
+
+    def test_columns(self):
+        self.assertEqual(len(self.batch), 2)
+        self.assertEqual(self.batch.ids, ['id1', 'id2'])
+        self.assertEqual(self.batch.names, ['one', 'two'])
+        self.assertEqual(self.batch.dates, ['2017-01-01T09:00:00', '2017-01-01T18:30:00'])
+
+    def test_formatted_columns(self):
+        self.assertEqual(self.batch.iso_dates(), ['2017-01-01T09:00:00', '2017-01-01T18:30:00'])
+        self.assertEqual(self.batch.display_dates(), ['Jan 1, 2017', 'Jan 1, 2017'])
+        self.assertEqual(self.batch.hosts(), ['www.one.com', 'two.com'])
+
+    def test_aware_dates_keep_their_offset(self):
+        batch = BookmarkBatch('user')
+        batch.append('id', 'name', 'http://test.com', '2017-01-01T23:30:00-02:00')
+        self.assertEqual(batch.iso_dates(), ['2017-01-01T23:30:00-02:00'])
+        self.assertEqual(batch.display_dates(), ['Jan 1, 2017'])
+
+    def test_invalid_date_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.batch.append('id3', 'three', 'http://three.com', 'not a date')
+
+    def test_copy_does_not_share_columns(self):
+        copied = self.batch.copy()
+        copied.names.append('three')
+        self.assertEqual(self.batch.names, ['one', 'two'])
+        self.assertEqual(copied.ids, self.batch.ids)
+
+    def test_iterates_as_entities(self):
+        bookmarks = list(self.batch)
+        self.assertEqual(bookmarks[1].id, 'id2')
+        self.assertEqual(bookmarks[1].user_id, 'user')
+        self.assertEqual(bookmarks[1].date_created, datetime(2017, 1, 1, 18, 30))
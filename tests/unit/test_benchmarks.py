@@ -0,0 +1,101 @@
+from datetime import datetime
+from unittest import TestCase, mock
+
+from benchmarks import suite
+from benchmarks.couchdb_stub import StubSession
+from links import security
+from links.context import context
+from links.entities import Bookmark, User
+from links.repos.couchdb import ConnectionManager, CouchDBBookmarkRepo, CouchDBUserRepo
+
+
+class BenchmarkSuiteTest(TestCase):
+
+    def test_unknown_scenarios_are_rejected_before_running(self):
+        with self.assertRaises(ValueError):
+            suite.run(scenarios=['list_bookmarks', 'nope'], sizes=(20,), ops=1)
+        with self.assertRaises(ValueError):
+            suite.run(backends=['couchdb-standin'], sizes=(20,), ops=1)
+
+    def test_every_scenario_runs_on_every_backend(self):
+        repos = (context.user_repo, context.bookmark_repo)
+        rounds = security.CONTEXT['ROUNDS']
+        report = suite.run(
+            backends=suite.BACKENDS, sizes=(20,), ops=3, warmup=1,
+            latency=0, fast_hash=True)
+
+        self.assertEqual(len(report['results']), len(suite.SCENARIOS) * 2)
+        for result in report['results']:
+            self.assertEqual(result['ops'], 3)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['peak_rss_kib'], 0)
+            if result['backend'] == 'couchdb-stub':
+                self.assertGreaterEqual(result['requests_per_op'], 1)
+        self.assertEqual(report['parameters']['password_rounds'], 1)
+        self.assertEqual((context.user_repo, context.bookmark_repo), repos)
+        self.assertEqual(security.CONTEXT['ROUNDS'], rounds)
+
+    def test_dataset_is_seeded_in_chunks(self):
+        users, bookmarks = mock.Mock(), mock.Mock()
+        bookmarks.save_many.side_effect = lambda chunk: [
+            mock.Mock(ok=True) for _ in chunk]
+        with mock.patch.object(suite, 'SEED_CHUNK_SIZE', 4):
+            suite.Dataset(10, per_user=5).load(users, bookmarks)
+
+        self.assertEqual(
+            [len(call[0][0]) for call in bookmarks.save_many.call_args_list], [4, 4, 2])
+        bookmarks.save.assert_not_called()
+        self.assertEqual(users.save.call_count, 2)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(suite.percentile(values, 0.5), 50)
+        self.assertEqual(suite.percentile(values, 0.99), 99)
+        self.assertIsNone(suite.percentile([], 0.5))
+
+
+class StubSessionTest(TestCase):
+
+    def setUp(self):
+        self.session = StubSession()
+        connections = ConnectionManager(session=self.session)
+        self.users = CouchDBUserRepo(connections)
+        self.bookmarks = CouchDBBookmarkRepo(connections)
+
+    def save_bookmarks(self, count, user_id='user'):
+        for n in range(count):
+            self.bookmarks.save(Bookmark(
+                '{}-bm{}'.format(user_id, n), user_id, 'name', 'http://test.com',
+                date_created=datetime(2017, 1, 1 + n)))
+
+    def test_pages_through_the_by_user_view_newest_first(self):
+        self.save_bookmarks(5)
+        self.save_bookmarks(1, user_id='other')
+
+        first = self.bookmarks.get_by_user('user', limit=3)
+        second = self.bookmarks.get_by_user('user', limit=3, after=first.next_cursor)
+
+        self.assertEqual([bm.id for bm in first], ['user-bm4', 'user-bm3', 'user-bm2'])
+        self.assertEqual([bm.id for bm in second], ['user-bm1', 'user-bm0'])
+        self.assertIsNone(second.next_cursor)
+
+    def test_documents_round_trip_with_revisions(self):
+        self.save_bookmarks(1)
+        bookmark = self.bookmarks.get('user-bm0')
+        bookmark.name = 'changed'
+        self.bookmarks.save(bookmark)
+
+        self.assertEqual(self.bookmarks.get('user-bm0').name, 'changed')
+        self.assertTrue(self.bookmarks.get('user-bm0').revision.startswith('2-'))
+        self.bookmarks.delete('user-bm0')
+        self.assertEqual(list(self.bookmarks.get_by_user('user', limit=10)), [])
+
+    def test_users(self):
+        user = User('user')
+        user.password_hash = 'hash'
+        self.users.save(user)
+
+        self.assertTrue(self.users.exists('user'))
+        self.assertEqual(self.users.get_password_hash('user'), 'hash')
+        self.assertEqual(self.users.exists_many(['user', 'nobody']), {
+            'user': True, 'nobody': False})
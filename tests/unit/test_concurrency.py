@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from links import concurrency
+from links.context import context
+
+
+class GatherTest(TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(setattr, context, 'read_executor', None)
+
+    def test_runs_in_order_without_executor(self):
+        context.read_executor = None
+        calls = []
+        results = concurrency.gather(
+            lambda: calls.append(1) or 'a',
+            lambda: calls.append(2) or 'b',
+        )
+        self.assertEqual(results, ['a', 'b'])
+        self.assertEqual(calls, [1, 2])
+
+    def test_calls_overlap_with_executor(self):
+        context.read_executor = self.executor
+        # each call waits for the other, so this only passes if they overlap
+        barrier = threading.Barrier(2, timeout=5)
+        results = concurrency.gather(
+            lambda: barrier.wait() is not None and 'a',
+            lambda: barrier.wait() is not None and 'b',
+        )
+        self.assertEqual(results, ['a', 'b'])
+
+    def test_first_exception_in_argument_order_is_raised(self):
+        context.read_executor = self.executor
+
+        def fail(message):
+            raise ValueError(message)
+
+        with self.assertRaisesRegex(ValueError, 'second'):
+            concurrency.gather(lambda: 'ok', lambda: fail('second'), lambda: fail('third'))
+
+    def test_exceptions_are_returned_in_place(self):
+        error = ValueError('second')
+
+        def fail():
+            raise error
+
+        for executor in (None, self.executor):
+            context.read_executor = executor
+            self.assertEqual(
+                concurrency.gather(lambda: 'ok', fail, return_exceptions=True),
+                ['ok', error])
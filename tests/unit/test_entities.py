@@ -25,6 +25,33 @@ class BookmarkEntityTest(unittest.TestCase):
         self.assertEqual(bm.name, 'this is a test')
         self.assertEqual(bm.url, 'http://example.com')
         self.assertTrue(isinstance(bm.date_created, datetime.datetime))
+        self.assertIs(bm.revision, None)
+
+    def test_stored_date_is_parsed_on_first_use(self):
+        bm = Bookmark('id123', 'user', 'name', 'http://example.com',
+                      date_created='2017-01-01T12:00:00')
+        self.assertEqual(bm.raw_date_created, '2017-01-01T12:00:00')
+        self.assertEqual(bm.date_created_iso, '2017-01-01T12:00:00')
+        self.assertEqual(bm.date_created, datetime.datetime(2017, 1, 1, 12))
+        self.assertEqual(bm.raw_date_created, datetime.datetime(2017, 1, 1, 12))
+
+    def test_legacy_stored_date_is_reformatted_as_iso(self):
+        bm = Bookmark('id', 'user', 'name', 'http://test.com', date_created='Jan 2, 2017 10:00')
+        self.assertEqual(bm.date_created_iso, '2017-01-02T10:00:00')
+
+    def test_has_no_instance_dict(self):
+        bm = Bookmark('id123', 'user', 'name', 'http://example.com')
+        self.assertFalse(hasattr(bm, '__dict__'))
+        with self.assertRaises(AttributeError):
+            bm.colour = 'red'
+
+    def test_repr(self):
+        bm = Bookmark('id123', 'user', 'name', 'http://example.com',
+                      date_created=datetime.datetime(2017, 1, 1))
+        self.assertEqual(
+            repr(bm),
+            "Bookmark('id123', 'user', 'name', 'http://example.com', "
+            "date_created=datetime.datetime(2017, 1, 1, 0, 0))")
 
     def test_belongs_to(self):
         bm = Bookmark('id123', 'user', 'name', 'http://example.com')
@@ -1,6 +1,6 @@
 from datetime import datetime
 from unittest import TestCase
-from links.formatting import display_date, iso_date, host_from_url
+from links.formatting import display_date, iso_date, host_from_url, hosts_from_urls, parse_date
 
 
 class FormatDisplayDateTest(TestCase):
@@ -9,6 +9,9 @@ class FormatDisplayDateTest(TestCase):
         formatted = display_date(datetime(year=2017, month=1, day=1))
         self.assertEqual(formatted, 'Jan 1, 2017')
 
+    def test_display_date_parses_stored_string(self):
+        self.assertEqual(display_date('2017-01-01T12:00:00'), 'Jan 1, 2017')
+
     def test_display_date_with_invalid_datetime(self):
         with self.assertRaises(AssertionError):
             display_date(None)
@@ -20,11 +23,31 @@ class FormatISODateTest(TestCase):
         formatted = iso_date(datetime(year=2017, month=1, day=1))
         self.assertEqual(formatted, '2017-01-01T00:00:00')
 
+    def test_stored_string_is_passed_through(self):
+        self.assertEqual(iso_date('2017-01-01T00:00:00.5'), '2017-01-01T00:00:00.5')
+
+    def test_legacy_stored_string_is_reformatted(self):
+        self.assertEqual(iso_date('Jan 2, 2017 10:00'), '2017-01-02T10:00:00')
+
     def test_format_iso_date_with_invalid_datetime(self):
         with self.assertRaises(AssertionError):
             iso_date(None)
 
 
+class ParseDateTest(TestCase):
+
+    def test_iso_format(self):
+        self.assertEqual(parse_date('2017-01-02T03:04:05.123456'),
+                         datetime(2017, 1, 2, 3, 4, 5, 123456))
+
+    def test_legacy_format_falls_back_to_dateutil(self):
+        self.assertEqual(parse_date('Jan 2 2017 03:04:05'), datetime(2017, 1, 2, 3, 4, 5))
+
+    def test_invalid(self):
+        self.assertIsNone(parse_date('not a date'))
+        self.assertIsNone(parse_date(None))
+
+
 class HostFromURLTest(TestCase):
 
     def test_host_is_extracted_from_url(self):
@@ -35,3 +58,14 @@ class HostFromURLTest(TestCase):
         self.assertEqual('', host_from_url(''))
         # urlparse behavior
         self.assertEqual(b'', host_from_url(None))
+
+
+class HostsFromURLsTest(TestCase):
+
+    def test_matches_host_from_url(self):
+        urls = [
+            'http://www.test.com', 'HTTP://user:pw@Test.com:80/a?b#c', 'ftp://test.com?q',
+            'http://test.com\tx/a', ' http://test.com', '', 'test.com/a', 'http://[::1]/a',
+            'mailto:me@test.com', None,
+        ]
+        self.assertEqual(hosts_from_urls(urls), [host_from_url(url) for url in urls])
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from links import entities
+from links import instrumentation
+from links.context import context
+from links.settings import Settings
+from links.usecases import list_bookmarks
+from tests.unit.usecases.base import reset_context
+
+
+class RecordingSink(instrumentation.MetricsSink):
+
+    def __init__(self):
+        self.traces = []
+
+    def record(self, trace):
+        self.traces.append(trace)
+
+
+class ListView:
+
+    def generate_view(self, view_model):
+        return [vm.bookmark_id for vm in view_model]
+
+
+class StreamView:
+
+    def generate_view(self, view_model):
+        for vm in view_model:
+            yield vm.bookmark_id
+
+
+class SlowView(ListView):
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def generate_view(self, view_model):
+        time.sleep(self.delay)
+        return super().generate_view(view_model)
+
+
+def make_trace():
+    trace = instrumentation.Trace('ListBookmarks')
+    trace.wall, trace.cpu = 0.004, 0.003
+    trace.add_stage('usecase', 0.002, 0.001)
+    trace.add_repo_call('user_repo.exists', 0.001)
+    return trace
+
+
+class InstrumentTest(TestCase):
+
+    def setUp(self):
+        reset_context()
+        context.user_repo = instrumentation.instrument_repo(context.user_repo, 'user_repo')
+        context.bookmark_repo = instrumentation.instrument_repo(
+            context.bookmark_repo, 'bookmark_repo')
+        context.user_repo.save(entities.User('user'))
+        context.bookmark_repo.save(
+            entities.Bookmark('bm', 'user', 'name', 'http://test.com'))
+        self.sink = RecordingSink()
+
+    def make_controller(self):
+        return instrumentation.instrument(
+            list_bookmarks.ListBookmarksController(
+                list_bookmarks.ListBookmarksUseCase(),
+                list_bookmarks.ListBookmarksPresenter(),
+                ListView(),
+            ),
+            self.sink)
+
+    def test_without_sink_controller_is_untouched(self):
+        controller = list_bookmarks.ListBookmarksController(None, None, None)
+        self.assertIs(instrumentation.instrument(controller, None), controller)
+
+    def test_records_each_stage_and_repo_call(self):
+        output = self.make_controller().handle({'user_id': 'user'})
+
+        self.assertEqual(output, ['bm'])
+        trace, = self.sink.traces
+        self.assertEqual(trace.name, 'ListBookmarks')
+        self.assertEqual(
+            sorted(trace.stages), ['controller', 'presenter', 'usecase', 'view'])
+        self.assertEqual(trace.repo_calls['user_repo.exists'][0], 1)
+        self.assertEqual(trace.repo_calls['bookmark_repo.get_by_user'][0], 1)
+        self.assertGreaterEqual(trace.wall, sum(w for w, _ in trace.stages.values()))
+
+    def test_stage_time_excludes_nested_stages(self):
+        controller = self.make_controller()
+        controller.view = instrumentation.TimedStage(SlowView(0.05), 'view')
+        controller.handle({'user_id': 'user'})
+
+        trace, = self.sink.traces
+        self.assertGreaterEqual(trace.stages['view'][0], 0.05)
+        self.assertLess(trace.stages['controller'][0], 0.05)
+
+    def test_async_handle(self):
+        output = asyncio.run(self.make_controller().handle_async({'user_id': 'user'}))
+
+        self.assertEqual(output, ['bm'])
+        trace, = self.sink.traces
+        self.assertIn('usecase', trace.stages)
+
+    def test_repo_calls_on_read_executor_are_counted(self):
+        context.read_executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(setattr, context, 'read_executor', None)
+        self.addCleanup(context.read_executor.shutdown)
+
+        self.make_controller().handle({'user_id': 'user'})
+
+        trace, = self.sink.traces
+        self.assertEqual(trace.repo_calls['bookmark_repo.get_by_user'][0], 1)
+
+    def test_sink_errors_do_not_fail_the_request(self):
+        self.sink.record = lambda trace: 1 / 0
+        with self.assertLogs('links.instrumentation', logging.ERROR):
+            self.assertEqual(self.make_controller().handle({'user_id': 'user'}), ['bm'])
+
+    def test_streaming_request_is_traced_until_exhausted(self):
+        controller = instrumentation.instrument(
+            list_bookmarks.StreamBookmarksController(
+                list_bookmarks.ListBookmarksUseCase(),
+                list_bookmarks.StreamBookmarksPresenter(),
+                StreamView(),
+            ),
+            self.sink)
+
+        chunks = controller.handle({'user_id': 'user'})
+        self.assertEqual(self.sink.traces, [])
+        self.assertEqual(list(chunks), ['bm'])
+
+        trace, = self.sink.traces
+        self.assertEqual(trace.name, 'StreamBookmarks')
+        self.assertEqual(trace.repo_calls['bookmark_repo.iter_by_user'][0], 1)
+        self.assertIn('stream', trace.stages)
+        self.assertIsNone(instrumentation.current_trace())
+
+    def test_closed_stream_is_recorded(self):
+        controller = instrumentation.instrument(
+            list_bookmarks.StreamBookmarksController(
+                list_bookmarks.ListBookmarksUseCase(),
+                list_bookmarks.StreamBookmarksPresenter(),
+                StreamView(),
+            ),
+            self.sink)
+        controller.handle({'user_id': 'user'}).close()
+        self.assertEqual(len(self.sink.traces), 1)
+
+    def test_repo_calls_outside_a_request_are_not_traced(self):
+        self.assertTrue(context.user_repo.exists('user'))
+        self.assertIsNone(instrumentation.current_trace())
+
+
+class HistogramSinkTest(TestCase):
+
+    def test_buckets_timings_and_sums_counts(self):
+        sink = instrumentation.HistogramSink(bounds=(1, 5))
+        sink.record(make_trace())
+        sink.record(make_trace())
+
+        snapshot = sink.snapshot()
+        self.assertEqual(snapshot['ListBookmarks.wall']['buckets'], [0, 2, 0])
+        self.assertEqual(snapshot['ListBookmarks.repo.user_repo.exists.calls']['sum'], 2)
+        self.assertEqual(sink.percentile('ListBookmarks.usecase.wall', 0.99), 5)
+        self.assertIsNone(sink.percentile('unknown', 0.5))
+
+
+class StatsDSinkTest(TestCase):
+
+    def test_sends_one_datagram_per_trace(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        sink = instrumentation.StatsDSink(*server.getsockname(), prefix='app')
+        self.addCleanup(sink.close)
+
+        sink.record(make_trace())
+
+        lines = server.recv(65536).decode('ascii').split('\n')
+        self.assertIn('app.ListBookmarks.wall:4|ms', lines)
+        self.assertIn('app.ListBookmarks.repo.user_repo.exists.calls:1|c', lines)
+
+
+class LogSinkTest(TestCase):
+
+    def test_logs_one_line(self):
+        with self.assertLogs('links.instrumentation', logging.INFO) as logs:
+            instrumentation.LogSink().record(make_trace())
+        line, = logs.output
+        self.assertIn('ListBookmarks wall=4.00ms cpu=3.00ms', line)
+        self.assertIn('user_repo.exists=1x/1.00ms', line)
+
+
+class MakeSinkTest(TestCase):
+
+    def test_off_by_default(self):
+        self.assertIsNone(instrumentation.make_sink(Settings))
+
+    def test_invalid_name(self):
+        class BadSettings(Settings):
+            INSTRUMENTATION = 'nope'
+        with self.assertRaises(RuntimeError):
+            instrumentation.make_sink(BadSettings)
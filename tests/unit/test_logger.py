@@ -0,0 +1,140 @@
+import io
+import json
+import logging
+import queue
+import sys
+from unittest import TestCase, mock
+
+from links import logger
+from links.settings import Settings
+
+
+def make_record(msg='Processed %d records', args=(1,), level=logging.INFO, **extra):
+    record = logging.LogRecord('links.test', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class JSONFormatterTest(TestCase):
+
+    def test_one_object_with_extra_fields(self):
+        record = make_record(couchdb_request={'view': 'bookmarks/by_user'})
+        entry = json.loads(logger.JSONFormatter().format(record))
+
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['logger'], 'links.test')
+        self.assertEqual(entry['message'], 'Processed 1 records')
+        self.assertEqual(entry['couchdb_request'], {'view': 'bookmarks/by_user'})
+        self.assertNotIn('args', entry)
+
+    def test_exception(self):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = make_record()
+            record.exc_info = sys.exc_info()
+        entry = json.loads(logger.JSONFormatter().format(record))
+        self.assertIn('ZeroDivisionError', entry['exception'])
+
+
+class SampleFilterTest(TestCase):
+
+    def test_keeps_every_nth_of_each_message(self):
+        sample = logger.SampleFilter(every=3)
+        kept = [sample.filter(make_record(args=(n,))) for n in range(7)]
+        self.assertEqual(kept, [True, False, False, True, False, False, True])
+        self.assertTrue(sample.filter(make_record('Another message')))
+
+    def test_more_severe_records_always_pass(self):
+        sample = logger.SampleFilter(every=100)
+        self.assertTrue(all(
+            sample.filter(make_record(level=logging.WARNING)) for _ in range(5)))
+
+    def test_counts_only_the_most_recent_messages(self):
+        sample = logger.SampleFilter(every=3, max_keys=2)
+        for n in range(10):
+            sample.filter(make_record('Formatted {}'.format(n)))
+        self.assertEqual(len(sample._counters), 2)
+
+
+class BoundedQueueHandlerTest(TestCase):
+
+    def test_drops_when_full_and_reports_it(self):
+        handler = logger.BoundedQueueHandler(queue.Queue(1))
+        handler.handle(make_record(args=(1,)))
+        handler.handle(make_record(args=(2,)))
+        handler.handle(make_record(args=(3,)))
+        self.assertEqual(handler.dropped, 2)
+
+        self.assertEqual(handler.queue.get_nowait().getMessage(), 'Processed 1 records')
+        handler.handle(make_record(args=(4,)))
+        notice = handler.queue.get_nowait()
+        self.assertEqual(notice.levelno, logging.WARNING)
+        self.assertEqual(notice.getMessage(), 'Dropped 2 log records, the log queue was full')
+        # the record after the notice didn't fit either
+        self.assertEqual(handler.dropped, 1)
+
+    def test_records_are_rendered_before_queueing(self):
+        handler = logger.BoundedQueueHandler(queue.Queue())
+        args = [1]
+        handler.handle(make_record('Value %s', (args,)))
+        args.append(2)
+        record = handler.queue.get_nowait()
+        self.assertEqual(record.getMessage(), 'Value [1]')
+        self.assertIsNone(record.args)
+
+
+class ConfigureLoggingTest(TestCase):
+
+    def setUp(self):
+        self.addCleanup(logger.configure_logging, Settings)
+
+    def test_queued_json_logging(self):
+        class QueuedSettings(Settings):
+            LOGGING_FORMAT = 'json'
+            LOGGING_QUEUE_SIZE = 10
+
+        stream = io.StringIO()
+        with mock.patch('sys.stderr', stream):
+            logger.configure_logging(QueuedSettings)
+        root = logging.getLogger()
+        self.assertIsInstance(root.handlers[0], logger.BoundedQueueHandler)
+
+        logger.get_logger('links.test').warning('Queued %s', 'message')
+        logger.stop_logging()
+
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry['message'], 'Queued message')
+
+    def test_stopping_logs_to_the_console_again(self):
+        class QueuedSettings(Settings):
+            LOGGING_QUEUE_SIZE = 1
+            LOGGING_QUEUE_OVERFLOW = 'block'
+            LOGGING_SAMPLE_EVERY = 10
+
+        stream = io.StringIO()
+        with mock.patch('sys.stderr', stream):
+            logger.configure_logging(QueuedSettings)
+        logger.stop_logging()
+
+        console, = logging.getLogger().handlers
+        self.assertIsInstance(console, logging.StreamHandler)
+        self.assertIsInstance(console.filters[0], logger.SampleFilter)
+        for _ in range(3):
+            logger.get_logger('links.test').warning('After stopping')
+        self.assertEqual(stream.getvalue().count('After stopping'), 3)
+
+    def test_sampling_happens_before_queueing(self):
+        class SampledSettings(Settings):
+            LOGGING_QUEUE_SIZE = 10
+            LOGGING_SAMPLE_EVERY = 10
+
+        logger.configure_logging(SampledSettings)
+        handler, = logging.getLogger().handlers
+        self.assertIsInstance(handler.filters[0], logger.SampleFilter)
+        self.assertEqual(logger._LISTENER.handlers[0].filters, [])
+
+    def test_existing_loggers_keep_working(self):
+        log = logger.get_logger('links.test.existing')
+        logger.configure_logging(Settings)
+        self.assertFalse(log.disabled)
@@ -0,0 +1,31 @@
+from datetime import datetime
+from unittest import TestCase
+
+from links.exceptions import ValidationError
+from links.paging import Page, encode_cursor, decode_cursor
+
+
+class PageTest(TestCase):
+
+    def test_page_is_a_list(self):
+        page = Page([1, 2], next_cursor='abc')
+        self.assertEqual(page, [1, 2])
+        self.assertEqual(page.next_cursor, 'abc')
+
+    def test_last_page_has_no_cursor(self):
+        self.assertIsNone(Page([1]).next_cursor)
+
+
+class CursorTest(TestCase):
+
+    def test_round_trip(self):
+        dt = datetime(2017, 1, 1, 12, 30)
+        cursor = encode_cursor(dt, 'id1')
+        self.assertIsInstance(cursor, str)
+        self.assertEqual(decode_cursor(cursor), (dt.isoformat(), 'id1'))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValidationError):
+            decode_cursor('not a cursor')
+        with self.assertRaises(ValidationError):
+            decode_cursor(None)
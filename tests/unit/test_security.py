@@ -1,5 +1,16 @@
+import os
+import time
 from unittest import TestCase
-from links.security import create_password_hash, check_password, lower_rounds
+
+from links.exceptions import HashingPoolBusy
+from links.security import (
+    HashingPool,
+    create_password_hash,
+    check_password,
+    configure_hashing_pool,
+    lower_rounds,
+    shutdown_hashing_pool,
+)
 
 # lowers the number of passes so tests are not so slow.
 lower_rounds()
@@ -26,3 +37,32 @@ class CheckPasswordTest(TestCase):
     def test_invalid_hash(self):
         hash = {'not a string': True}
         self.assertFalse(check_password('password', hash))
+
+
+class HashingPoolTest(TestCase):
+
+    def setUp(self):
+        self.pool = configure_hashing_pool(workers=1, max_pending=1, timeout=0)
+        self.addCleanup(shutdown_hashing_pool)
+
+    def test_hashing_runs_in_pool(self):
+        hash = create_password_hash('password')
+        self.assertTrue(hash.startswith('$pbkdf2-sha256$1$'))
+        self.assertTrue(check_password('password', hash))
+        self.assertFalse(check_password('wrong', hash))
+        self.assertFalse(check_password('password', {'not a string': True}))
+
+    def test_full_pool_pushes_back(self):
+        future = self.pool.submit(time.sleep, 0.5)
+        with self.assertRaises(HashingPoolBusy):
+            self.pool.submit(time.sleep, 0)
+        future.result()
+
+    def test_shutdown_returns_to_inline_hashing(self):
+        shutdown_hashing_pool()
+        self.assertTrue(check_password('password', create_password_hash('password')))
+
+    def test_default_workers(self):
+        pool = HashingPool()
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool.workers, os.cpu_count() or 1)
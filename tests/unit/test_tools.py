@@ -0,0 +1,154 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+from argparse import Namespace
+from contextlib import redirect_stdout
+from datetime import datetime
+from unittest import TestCase
+
+from links import entities
+from links import tools
+from links.context import context
+from links.usecases.bookmark_details import BookmarkDetailsViewModel
+from tests.unit.usecases.base import reset_context
+
+
+def make_view_model(bookmark_id):
+    vm = BookmarkDetailsViewModel()
+    vm.bookmark_id = bookmark_id
+    vm.name = 'name'
+    vm.url = 'http://test.com'
+    return vm
+
+
+class StreamBookmarksViewTest(TestCase):
+
+    def setUp(self):
+        self.view_models = [make_view_model('id1'), make_view_model('id2')]
+
+    def test_json_array(self):
+        output = ''.join(
+            tools.StreamBookmarksConsoleView().generate_view(iter(self.view_models)))
+        self.assertEqual(
+            [vm['bookmark_id'] for vm in json.loads(output)], ['id1', 'id2'])
+
+    def test_empty_json_array(self):
+        output = ''.join(tools.StreamBookmarksConsoleView().generate_view(iter([])))
+        self.assertEqual(json.loads(output), [])
+
+    def test_json_lines(self):
+        output = ''.join(
+            tools.StreamBookmarksJSONLinesView().generate_view(iter(self.view_models)))
+        lines = output.splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[1])['bookmark_id'], 'id2')
+
+
+class OpenOutputTest(TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_plain_file(self):
+        with tools.open_output(self.path) as fh:
+            fh.write('data')
+        with open(self.path) as fh:
+            self.assertEqual(fh.read(), 'data')
+
+    def test_gzip_file(self):
+        with tools.open_output(self.path, compress=True) as fh:
+            fh.write('data')
+        with gzip.open(self.path, 'rt') as fh:
+            self.assertEqual(fh.read(), 'data')
+
+
+class ImportFromJSONTest(TestCase):
+
+    def setUp(self):
+        self.records = [{'name': 'n{}'.format(i), 'url': 'http://test.com'} for i in range(50)]
+
+    def test_json_array(self):
+        fh = io.StringIO(json.dumps(self.records, indent=2))
+        self.assertEqual(list(tools.import_from_json(fh, chunk_size=7)), self.records)
+
+    def test_empty_json_array(self):
+        self.assertEqual(list(tools.import_from_json(io.StringIO(' [ ] '))), [])
+
+    def test_json_lines(self):
+        fh = io.StringIO('\n'.join(json.dumps(r) for r in self.records) + '\n\n')
+        self.assertEqual(list(tools.import_from_json(fh)), self.records)
+
+    def test_records_are_read_lazily(self):
+        fh = io.StringIO(json.dumps(self.records))
+        records = tools.import_from_json(fh, chunk_size=16)
+        next(records)
+        self.assertLess(fh.tell(), 100)
+
+    def test_malformed_element_fails_without_reading_on(self):
+        text = json.dumps(self.records)
+        fh = io.StringIO(text.replace('"n1"', 'n1', 1))
+        with self.assertRaisesRegex(ValueError, 'Record 1 '):
+            list(tools.import_from_json(fh, chunk_size=16))
+        self.assertLess(fh.tell(), 100)
+
+    def test_truncated_json_array(self):
+        fh = io.StringIO(json.dumps(self.records)[:-10])
+        with self.assertRaises(ValueError):
+            list(tools.import_from_json(fh))
+
+
+class ImportBookmarksToolTest(TestCase):
+
+    def setUp(self):
+        reset_context()
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.unlink, self.path)
+
+    def test_bad_records_are_skipped(self):
+        records = [
+            {'name': 'good', 'url': 'http://test.com/1', 'date_created_iso': '2017-01-02'},
+            {'name': 'bad date', 'url': 'http://test.com/2', 'date_created_iso': 'not a date'},
+            {'name': 5, 'url': 'http://test.com/3'},
+            'not an object',
+            {'name': 'legacy date', 'url': 'http://test.com/4',
+             'date_created_iso': 'Jan 3, 2017'},
+        ]
+        with open(self.path, 'w') as fh:
+            json.dump(records, fh)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            tools.import_bookmarks(Namespace(user='user', source=self.path, batch_size=None))
+
+        self.assertIn('Imported 2 bookmarks', output.getvalue())
+        self.assertIn('3 invalid', output.getvalue())
+        dates = sorted(bm.date_created for bm in context.bookmark_repo.get_by_user('user'))
+        self.assertEqual(dates, [datetime(2017, 1, 2), datetime(2017, 1, 3)])
+
+
+class ListBookmarksToolTest(TestCase):
+
+    def setUp(self):
+        reset_context()
+        context.user_repo.save(entities.User('user'))
+        for day in (1, 2):
+            context.bookmark_repo.save(entities.Bookmark(
+                'id{}'.format(day), 'user', 'name', 'http://test.com',
+                date_created=datetime(2017, 1, day)))
+
+    def list_page(self, batch):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            tools.list_bookmarks_page(
+                Namespace(user='user', limit=None, after=None, batch=batch))
+        return json.loads(output.getvalue())
+
+    def test_batch_path_prints_the_same_rows(self):
+        rows = self.list_page(batch=False)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(self.list_page(batch=True), rows)
@@ -1,16 +1,34 @@
-from unittest import mock, TestCase
+import asyncio
+from unittest import mock, IsolatedAsyncioTestCase, TestCase
 
 from links.context import context
-from links.repos.inmemory import MemoryBookmarkRepo, MemoryUserRepo
+from links.repos.inmemory import (
+    AsyncMemoryBookmarkRepo,
+    AsyncMemoryUserRepo,
+    MemoryBookmarkRepo,
+    MemoryUserRepo,
+)
 from links.usecases.interfaces import OutputBoundary, UseCase, View
 
 
+def reset_context():
+    # ensure a new/clean instance of context repositories
+    context.bookmark_repo = MemoryBookmarkRepo()
+    context.user_repo = MemoryUserRepo()
+    context.async_bookmark_repo = AsyncMemoryBookmarkRepo(context.bookmark_repo)
+    context.async_user_repo = AsyncMemoryUserRepo(context.user_repo)
+
+
 class UseCaseTest(TestCase):
 
     def setUp(self):
-        # ensure a new/clean instance of context repositories
-        context.bookmark_repo = MemoryBookmarkRepo()
-        context.user_repo = MemoryUserRepo()
+        reset_context()
+
+
+class AsyncUseCaseTest(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        reset_context()
 
 
 class ControllerTestMixin:
@@ -30,6 +48,16 @@ class ControllerTestMixin:
         self.view.generate_view.assert_called_with(self.presenter.view_model)
 
 
+class AsyncControllerTestMixin:
+    """Common behavior of controllers that implement handle_async"""
+
+    def test_async_controller_passes_view_model_to_view(self):
+        self.controller.usecase = mock.AsyncMock()
+        self.presenter.view_model = {'generic_view_model': True}
+        asyncio.run(self.controller.handle_async(self.request))
+        self.view.generate_view.assert_called_with(self.presenter.view_model)
+
+
 class PresenterSpy(OutputBoundary):
 
     def __init__(self):
@@ -9,7 +9,13 @@ from links.usecases.authenticate_user import (
     AuthenticateUserController,
     Response
 )
-from .base import UseCaseTest, PresenterSpy, ControllerTestMixin
+from .base import (
+    AsyncControllerTestMixin,
+    AsyncUseCaseTest,
+    ControllerTestMixin,
+    PresenterSpy,
+    UseCaseTest,
+)
 
 
 class AuthenticateUserUseCaseTest(UseCaseTest):
@@ -38,6 +44,29 @@ class AuthenticateUserUseCaseTest(UseCaseTest):
         self.assertEqual(self.presenter_spy.response_model.user_id, self.uc.user_id)
 
 
+class AuthenticateUserUseCaseAsyncTest(AsyncUseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        user = User('user')
+        user.password_hash = create_password_hash('password')
+        context.user_repo.save(user)
+
+        self.uc = AuthenticateUserUseCase()
+        self.uc.user_id = user.id
+        self.presenter_spy = PresenterSpy()
+
+    async def test_user_with_correct_password_can_auth(self):
+        self.uc.password = 'password'
+        await self.uc.execute_async(self.presenter_spy)
+        self.assertTrue(self.presenter_spy.response_model.is_authenticated)
+
+    async def test_user_with_wrong_password_cannot_auth(self):
+        self.uc.password = 'wrong'
+        await self.uc.execute_async(self.presenter_spy)
+        self.assertFalse(self.presenter_spy.response_model.is_authenticated)
+
+
 class AuthenticateUserPresenterTest(TestCase):
 
     def test_presenter_creates_view_model(self):
@@ -57,7 +86,7 @@ class AuthenticateUserPresenterTest(TestCase):
         )
 
 
-class AuthenticateUserControllerTest(ControllerTestMixin, TestCase):
+class AuthenticateUserControllerTest(ControllerTestMixin, AsyncControllerTestMixin, TestCase):
 
     def setUp(self):
         self.mixin_setup()
@@ -72,4 +101,4 @@ class AuthenticateUserControllerTest(ControllerTestMixin, TestCase):
         self.controller.handle(self.request)
         self.usecase.execute.assert_called_with(self.presenter)
         self.assertEqual(self.usecase.user_id, self.request['user_id'])
-        self.assertEqual(self.usecase.password, self.request['password'])
\ No newline at end of file
+        self.assertEqual(self.usecase.password, self.request['password'])
@@ -5,7 +5,14 @@ from links import entities
 from links.context import context
 from links.exceptions import BookmarkNotFound
 from links.usecases import bookmarks
-from .base import UseCaseTest, PresenterSpy, UseCaseSpy, ViewSpy, ViewModelDouble
+from .base import (
+    AsyncUseCaseTest,
+    PresenterSpy,
+    UseCaseSpy,
+    UseCaseTest,
+    ViewModelDouble,
+    ViewSpy,
+)
 
 
 class BookmarkDetailsUseCaseTest(UseCaseTest):
@@ -56,6 +63,25 @@ class BookmarkDetailsUseCaseTest(UseCaseTest):
             self.usecase.execute(self.presenter_spy)
 
 
+class BookmarkDetailsUseCaseAsyncTest(AsyncUseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        context.bookmark_repo.save(
+            entities.Bookmark('id1', 'user', 'test', 'http://test.com'))
+        self.presenter_spy = PresenterSpy()
+
+    async def test_user_with_bookmark_can_see_details(self):
+        usecase = bookmarks.BookmarkDetailsUseCase('user', 'id1')
+        await usecase.execute_async(self.presenter_spy)
+        self.assertEqual(self.presenter_spy.response_model.id, 'id1')
+
+    async def test_user_cannot_see_other_users_details(self):
+        usecase = bookmarks.BookmarkDetailsUseCase('otheruser', 'id1')
+        with self.assertRaises(BookmarkNotFound):
+            await usecase.execute_async(self.presenter_spy)
+
+
 class BookmarkDetailsPresenterTest(TestCase):
 
     def test_presenter_creates_view_model(self):
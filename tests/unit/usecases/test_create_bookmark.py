@@ -4,7 +4,13 @@ from links.context import context
 from links.entities import User
 from links.exceptions import UserNotFound, InvalidOperationError
 from links.usecases import create_bookmark
-from tests.unit.usecases.base import UseCaseTest, PresenterSpy, ControllerTestMixin
+from tests.unit.usecases.base import (
+    AsyncControllerTestMixin,
+    AsyncUseCaseTest,
+    ControllerTestMixin,
+    PresenterSpy,
+    UseCaseTest,
+)
 
 
 class CreateBookmarkSlugTest(TestCase):
@@ -61,6 +67,36 @@ class CreateBookmarkUseCaseTest(UseCaseTest):
         )
 
 
+class CreateBookmarkUseCaseAsyncTest(AsyncUseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.presenter_spy = PresenterSpy()
+        context.user_repo.save(User('user'))
+
+        self.usecase = create_bookmark.CreateBookmarkUseCase()
+        self.usecase.user_id = 'user'
+        self.usecase.name = 'test name'
+        self.usecase.url = 'http://test.com'
+
+    async def test_user_can_create_bookmark(self):
+        await self.usecase.execute_async(self.presenter_spy)
+        self.assertDictEqual(self.presenter_spy.response_model.errors, {})
+        created = context.bookmark_repo.get_by_user('user')[0]
+        self.assertEqual(created.name, 'test name')
+
+    async def test_unknown_user_cannot_create_bookmark(self):
+        self.usecase.user_id = 'unknown01234'
+        with self.assertRaises(InvalidOperationError):
+            await self.usecase.execute_async(self.presenter_spy)
+
+    async def test_invalid_bookmark_is_not_saved(self):
+        self.usecase.url = 'goobledigook'
+        await self.usecase.execute_async(self.presenter_spy)
+        self.assertEqual(self.presenter_spy.response_model.errors, {'url': 'Invalid URL'})
+        self.assertEqual(context.bookmark_repo.get_by_user('user'), [])
+
+
 class CreateBookmarkPresentationTest(TestCase):
 
     def test_presenter_creates_view_model(self):
@@ -83,7 +119,7 @@ class CreateBookmarkPresentationTest(TestCase):
         self.assertEqual(viewmodel['errors'], {'url': 'Invalid URL'})
         self.assertEqual(viewmodel['success'], False)
 
-class CreateBookmarkControllerTest(ControllerTestMixin, TestCase):
+class CreateBookmarkControllerTest(ControllerTestMixin, AsyncControllerTestMixin, TestCase):
 
     def setUp(self):
         self.mixin_setup()
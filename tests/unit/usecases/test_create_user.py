@@ -4,7 +4,13 @@ from links.context import context
 from links.entities import User
 from links.security import create_password_hash
 from links.usecases.create_user import CreateUserUseCase, CreateUserPresenter, CreateUserController
-from tests.unit.usecases.base import UseCaseTest, PresenterSpy, ControllerTestMixin
+from tests.unit.usecases.base import (
+    AsyncControllerTestMixin,
+    AsyncUseCaseTest,
+    ControllerTestMixin,
+    PresenterSpy,
+    UseCaseTest,
+)
 
 
 class CreateUserUseCaseTest(UseCaseTest):
@@ -60,6 +66,29 @@ class CreateUserUseCaseTest(UseCaseTest):
         self.assertEqual('newuser', user.id)
 
 
+class CreateUserUseCaseAsyncTest(AsyncUseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.uc = CreateUserUseCase()
+        self.presenter_spy = PresenterSpy()
+        context.user_repo.save(User('user'))
+
+    async def test_user_is_created(self):
+        await self.uc.execute_async(
+            {'username': 'newuser', 'password': 'password'}, self.presenter_spy)
+        self.assertTrue(self.presenter_spy.response_model['user_created'])
+        self.assertTrue(context.user_repo.get_password_hash('newuser'))
+
+    async def test_user_not_created_when_user_already_exists(self):
+        await self.uc.execute_async(
+            {'username': 'user', 'password': 'password'}, self.presenter_spy)
+        self.assertEqual(
+            self.presenter_spy.response_model['errors'],
+            {'username': ['That username is taken']}
+        )
+
+
 class CreateUserPresenterTest(TestCase):
 
     def test_presenter_creates_view_model(self):
@@ -75,7 +104,7 @@ class CreateUserPresenterTest(TestCase):
         self.assertDictEqual(response, presenter.get_view_model())
 
 
-class CreateUserControllerTest(ControllerTestMixin, TestCase):
+class CreateUserControllerTest(ControllerTestMixin, AsyncControllerTestMixin, TestCase):
 
     def setUp(self):
         self.mixin_setup()
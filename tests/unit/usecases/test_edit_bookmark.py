@@ -4,7 +4,13 @@ from links.exceptions import InvalidOperationError
 from links.context import context
 from links.entities import Bookmark, User
 from links.usecases import edit_bookmark
-from tests.unit.usecases.base import UseCaseTest, PresenterSpy, ControllerTestMixin
+from tests.unit.usecases.base import (
+    AsyncControllerTestMixin,
+    AsyncUseCaseTest,
+    ControllerTestMixin,
+    PresenterSpy,
+    UseCaseTest,
+)
 
 
 class EditBookmarkUseCaseTest(UseCaseTest):
@@ -12,8 +18,6 @@ class EditBookmarkUseCaseTest(UseCaseTest):
     def setUp(self):
         super().setUp()
         self.presenter_spy = PresenterSpy()
-        context.user_repo._data = []
-        context.bookmark_repo._data = []
 
         self.user = User('user')
         context.user_repo.save(self.user)
@@ -110,6 +114,38 @@ class EditBookmarkUseCaseTest(UseCaseTest):
             uc.execute(self.presenter_spy)
 
 
+class EditBookmarkUseCaseAsyncTest(AsyncUseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.presenter_spy = PresenterSpy()
+        context.user_repo.save(User('user'))
+        context.user_repo.save(User('other_user'))
+        context.bookmark_repo.save(Bookmark('id1', 'user', 'name', 'http://test.com'))
+
+        self.uc = edit_bookmark.EditBookmarkUseCase()
+        self.uc.user_id = 'user'
+        self.uc.bookmark_id = 'id1'
+        self.uc.name = 'name changed'
+        self.uc.url = 'http://test.com'
+
+    async def test_user_can_edit_bookmark(self):
+        await self.uc.execute_async(self.presenter_spy)
+        self.assertEqual(self.presenter_spy.response_model.errors, {})
+        self.assertEqual(context.bookmark_repo.get('id1').name, 'name changed')
+
+    async def test_user_cannot_edit_another_users_bookmark(self):
+        self.uc.user_id = 'other_user'
+        await self.uc.execute_async(self.presenter_spy)
+        self.assertEqual(self.presenter_spy.response_model.errors['error'], 'Forbidden')
+        self.assertEqual(context.bookmark_repo.get('id1').name, 'name')
+
+    async def test_unknown_user_cannot_edit_bookmark(self):
+        self.uc.user_id = 'unknown_user'
+        with self.assertRaises(InvalidOperationError):
+            await self.uc.execute_async(self.presenter_spy)
+
+
 class EditBookmarkPresentationTest(TestCase):
 
     def test_presenter_creates_view_model(self):
@@ -125,7 +161,7 @@ class EditBookmarkPresentationTest(TestCase):
         )
 
 
-class EditBookmarkControllerTest(ControllerTestMixin, TestCase):
+class EditBookmarkControllerTest(ControllerTestMixin, AsyncControllerTestMixin, TestCase):
 
     def setUp(self):
         self.mixin_setup()
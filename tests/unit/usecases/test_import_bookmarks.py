@@ -0,0 +1,131 @@
+from datetime import datetime
+from unittest import TestCase, mock
+
+from links.context import context
+from links.entities import User
+from links.exceptions import InvalidOperationError
+from links.repos.interfaces import SaveResult
+from links.usecases import import_bookmarks
+from tests.unit.usecases.base import UseCaseTest, PresenterSpy, ControllerTestMixin
+
+
+class ImportBookmarksUseCaseTest(UseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.presenter_spy = PresenterSpy()
+        self.user = User('user')
+        context.user_repo.save(self.user)
+
+        self.usecase = import_bookmarks.ImportBookmarksUseCase()
+        self.usecase.user_id = self.user.id
+        self.usecase.batch_size = 2
+
+    def make_records(self, count):
+        return [
+            {
+                'name': 'name{}'.format(i),
+                'url': 'http://test.com/{}'.format(i),
+                'date_created': datetime(2017, 1, i + 1),
+            }
+            for i in range(count)
+        ]
+
+    def test_records_are_imported(self):
+        self.usecase.records = iter(self.make_records(5))
+        self.usecase.execute(self.presenter_spy)
+
+        self.assertEqual(self.presenter_spy.response_model.imported, 5)
+        created = context.bookmark_repo.get_by_user(self.user.id)
+        self.assertEqual([bm.name for bm in created], ['name4', 'name3', 'name2', 'name1', 'name0'])
+        self.assertEqual(created[-1].date_created, datetime(2017, 1, 1))
+
+    def test_records_are_written_in_batches(self):
+        self.usecase.records = iter(self.make_records(5))
+        with mock.patch.object(
+                context.bookmark_repo, 'save_many',
+                wraps=context.bookmark_repo.save_many) as save_many:
+            self.usecase.execute(self.presenter_spy)
+
+        self.assertEqual(
+            [len(call[0][0]) for call in save_many.call_args_list], [2, 2, 1])
+
+    def test_invalid_records_are_reported(self):
+        records = self.make_records(2)
+        records[1]['url'] = 'gobbledigook'
+        self.usecase.records = records
+        self.usecase.execute(self.presenter_spy)
+
+        response = self.presenter_spy.response_model
+        self.assertEqual(response.imported, 1)
+        self.assertEqual(response.invalid, 1)
+        self.assertEqual(response.errors, [(1, {'url': 'Invalid URL'})])
+
+    def test_bad_dates_and_non_string_fields_are_skipped(self):
+        records = self.make_records(4)
+        records[1]['date_created'] = 'not a date'
+        records[2]['name'] = 5
+        records[3]['date_created'] = '2017-01-04T00:00:00'
+        self.usecase.records = records
+        self.usecase.execute(self.presenter_spy)
+
+        response = self.presenter_spy.response_model
+        self.assertEqual(response.imported, 2)
+        self.assertEqual(response.invalid, 2)
+        self.assertEqual(response.errors, [
+            (1, {'date_created': 'Invalid date'}), (2, {'name': 'Must be a string'})])
+        created = context.bookmark_repo.get_by_user(self.user.id)
+        self.assertIn(datetime(2017, 1, 4), [bm.date_created for bm in created])
+
+    def test_failed_saves_are_reported_by_record_index(self):
+        records = self.make_records(3)
+        records[0]['url'] = 'gobbledigook'
+        self.usecase.records = records
+        with mock.patch.object(context.bookmark_repo, 'save_many', return_value=[
+                SaveResult('a', True, None), SaveResult('b', False, 'conflict')]):
+            self.usecase.execute(self.presenter_spy)
+
+        response = self.presenter_spy.response_model
+        self.assertEqual(response.errors, [
+            (0, {'url': 'Invalid URL'}), (2, {'save': 'conflict'})])
+
+    def test_unknown_user_cannot_import(self):
+        self.usecase.user_id = 'unknown'
+        with self.assertRaises(InvalidOperationError):
+            self.usecase.execute(self.presenter_spy)
+
+
+class ImportBookmarksPresenterTest(TestCase):
+
+    def test_presenter_creates_view_model(self):
+        response = import_bookmarks.Response()
+        response.imported = 8
+        response.invalid = 2
+        response.elapsed = 2.0
+
+        presenter = import_bookmarks.ImportBookmarksPresenter()
+        presenter.present(response)
+        view_model = presenter.get_view_model()
+
+        self.assertFalse(view_model['success'])
+        self.assertEqual(view_model['imported'], 8)
+        self.assertEqual(view_model['invalid'], 2)
+        self.assertEqual(view_model['records_per_second'], 5)
+
+
+class ImportBookmarksControllerTest(ControllerTestMixin, TestCase):
+
+    def setUp(self):
+        self.mixin_setup()
+        self.controller = import_bookmarks.ImportBookmarksController(
+            self.usecase,
+            self.presenter,
+            self.view
+        )
+        self.request = {'user_id': 'test-user', 'records': [], 'batch_size': 10}
+
+    def test_usecase_is_called(self):
+        self.controller.handle(self.request)
+        self.usecase.execute.assert_called_with(self.presenter)
+        self.assertEqual(self.usecase.user_id, 'test-user')
+        self.assertEqual(self.usecase.batch_size, 10)
@@ -1,11 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from unittest import TestCase, mock
 
 from links import entities
 from links import exceptions
 from links.context import context
+from links.paging import Page
+from links.batch import BookmarkBatch
+from links.usecases import bookmark_details
 from links.usecases import bookmarks
-from .base import UseCaseTest, PresenterSpy, UseCaseSpy, ViewSpy, ViewModelDouble
+from links.usecases import list_bookmarks
+from .base import (
+    AsyncUseCaseTest,
+    PresenterSpy,
+    UseCaseSpy,
+    UseCaseTest,
+    ViewModelDouble,
+    ViewSpy,
+)
 
 
 class ListBookmarksUseCaseTest(UseCaseTest):
@@ -32,6 +44,23 @@ class ListBookmarksUseCaseTest(UseCaseTest):
         self.assertEqual(bm.name, 'name')
         self.assertEqual(bm.url, 'http://test.com')
 
+    def test_bookmarks_are_paged(self):
+        for day in range(1, 4):
+            context.bookmark_repo.save(entities.Bookmark(
+                'id{}'.format(day), self.user.id, 'name', 'http://test.com',
+                date_created=datetime(2017, 1, day)))
+
+        self.usecase.limit = 2
+        self.usecase.execute(self.presenter_spy)
+        first = self.presenter_spy.response_model
+        self.assertEqual([bm.id for bm in first], ['id3', 'id2'])
+
+        self.usecase.after = first.next_cursor
+        self.usecase.execute(self.presenter_spy)
+        second = self.presenter_spy.response_model
+        self.assertEqual([bm.id for bm in second], ['id1'])
+        self.assertIsNone(second.next_cursor)
+
     def test_user_without_bookmarks_sees_none(self):
         self.usecase.execute(self.presenter_spy)
         self.assertEqual(0, len(self.presenter_spy.response_model))
@@ -47,6 +76,68 @@ class ListBookmarksUseCaseTest(UseCaseTest):
         with self.assertRaises(exceptions.RepositoryError):
             self.usecase.execute(self.presenter_spy)
 
+    def test_unknown_user_is_reported_when_the_page_read_fails(self):
+        self.usecase.user_id = self.unknownuser.id
+        executor = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        self.addCleanup(setattr, context, 'read_executor', None)
+        with mock.patch.object(context.bookmark_repo, 'get_by_user', side_effect=Exception):
+            for read_executor in (None, executor):
+                context.read_executor = read_executor
+                with self.assertRaises(exceptions.UserNotFound):
+                    self.usecase.execute(self.presenter_spy)
+                with self.assertRaises(exceptions.UserNotFound):
+                    list_bookmarks.ListBookmarksUseCase().list_bookmarks(
+                        self.unknownuser.id, self.presenter_spy)
+                with self.assertRaises(exceptions.UserNotFound):
+                    list_bookmarks.ListBookmarksUseCase().list_bookmark_batch(
+                        self.unknownuser.id, self.presenter_spy)
+
+    def test_invalid_cursor_raises_validation_error(self):
+        self.usecase.after = 'garbage'
+        with self.assertNoLogs('links.usecases', 'ERROR'):
+            with self.assertRaises(exceptions.ValidationError):
+                self.usecase.execute(self.presenter_spy)
+            with self.assertRaises(exceptions.ValidationError):
+                list_bookmarks.ListBookmarksUseCase().list_bookmark_batch(
+                    self.user.id, self.presenter_spy, after='garbage')
+
+
+class ListBookmarksUseCaseAsyncTest(AsyncUseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        context.user_repo.save(entities.User('user'))
+        context.bookmark_repo.save(
+            entities.Bookmark('test-id', 'user', 'name', 'http://test.com'))
+        self.presenter_spy = PresenterSpy()
+
+    async def test_user_sees_bookmarks(self):
+        usecase = bookmarks.ListBookmarksUseCase(user_id='user')
+        await usecase.execute_async(self.presenter_spy)
+        self.assertEqual([bm.id for bm in self.presenter_spy.response_model], ['test-id'])
+
+    async def test_unknown_user_raises_exception(self):
+        usecase = bookmarks.ListBookmarksUseCase(user_id='unknownuser')
+        with self.assertRaises(exceptions.UserNotFound):
+            await usecase.execute_async(self.presenter_spy)
+
+    async def test_unknown_user_is_reported_when_the_page_read_fails(self):
+        usecase = bookmarks.ListBookmarksUseCase(user_id='unknownuser')
+        with mock.patch.object(
+                context.async_bookmark_repo, 'get_by_user', side_effect=Exception):
+            with self.assertRaises(exceptions.UserNotFound):
+                await usecase.execute_async(self.presenter_spy)
+            with self.assertRaises(exceptions.UserNotFound):
+                await list_bookmarks.ListBookmarksUseCase().list_bookmarks_async(
+                    'unknownuser', self.presenter_spy)
+
+    async def test_list_bookmarks_async(self):
+        usecase = list_bookmarks.ListBookmarksUseCase()
+        await usecase.list_bookmarks_async('user', self.presenter_spy, limit=10)
+        self.assertEqual(
+            [bm.bookmark_id for bm in self.presenter_spy.response_model], ['test-id'])
+
 
 class ListBookmarksPresenterTest(TestCase):
 
@@ -84,6 +175,23 @@ class ListBookmarksPresenterTest(TestCase):
         self.assertEqual(second.url, 'http://test.com')
         self.assertEqual(second.date_created, dt.isoformat())
 
+    def test_stored_dates_are_not_parsed(self):
+        bm = entities.Bookmark(
+            'id1', 'user', 'test1', 'http://test.com', date_created='2017-01-01T00:00:00')
+        usecase = bookmarks.ListBookmarksUseCase(user_id='user')
+        response = usecase._create_response_model(Page([bm]))
+
+        presenter = bookmarks.ListBookmarksPresenter()
+        presenter.present(response)
+
+        self.assertEqual(presenter.get_view_model()[0].date_created, '2017-01-01T00:00:00')
+        self.assertEqual(bm.raw_date_created, '2017-01-01T00:00:00')
+
+    def test_view_model_carries_next_cursor(self):
+        presenter = bookmarks.ListBookmarksPresenter()
+        presenter.present(Page([], next_cursor='cursor'))
+        self.assertEqual(presenter.get_view_model().next_cursor, 'cursor')
+
 
 class ListBookmarksControllerTest(TestCase):
 
@@ -102,9 +210,111 @@ class ListBookmarksControllerTest(TestCase):
         self.controller.handle(req)
         self.assertEqual(self.usecase_spy.user_id, 'test-user')
 
+    def test_paging_arguments_are_passed_to_usecase(self):
+        req = {'user_id': 'test-user', 'limit': 10, 'after': 'cursor'}
+        self.controller.handle(req)
+        self.assertEqual(self.usecase_spy.limit, 10)
+        self.assertEqual(self.usecase_spy.after, 'cursor')
+
     def test_view_receives_view_model(self):
         req = {'user_id': 'test-user'}
         self.presenter_spy.view_model = ViewModelDouble
         self.controller.handle(req)
         self.assertTrue(self.view_spy.generate_view_was_called)
         self.assertIs(self.view_spy.view_model, self.presenter_spy.view_model)
+
+
+class ListBookmarkBatchTest(UseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        context.user_repo.save(entities.User('user'))
+        for day in range(1, 4):
+            context.bookmark_repo.save(entities.Bookmark(
+                'id{}'.format(day), 'user', 'name', 'http://www.test.com/page',
+                date_created=datetime(2017, 1, day)))
+        self.usecase = list_bookmarks.ListBookmarksUseCase()
+        self.presenter = list_bookmarks.ListBookmarksPresenter()
+
+    def test_presenter_formats_columns(self):
+        self.usecase.list_bookmark_batch('user', self.presenter, limit=2)
+        view_model = self.presenter.get_view_model()
+
+        self.assertIsInstance(view_model, list_bookmarks.BookmarkBatchViewModel)
+        self.assertEqual(view_model.bookmark_ids, ['id3', 'id2'])
+        self.assertEqual(view_model.hosts, ['www.test.com', 'www.test.com'])
+        self.assertEqual(view_model.dates, ['Jan 3, 2017', 'Jan 2, 2017'])
+        self.assertIsNotNone(view_model.next_cursor)
+
+    def test_rows_match_the_row_based_listing(self):
+        self.usecase.list_bookmark_batch('user', self.presenter)
+        batch_rows = self.presenter.get_view_model().as_dicts()
+        self.usecase.list_bookmarks('user', self.presenter)
+        rows = [vm.as_dict() for vm in self.presenter.get_view_model()]
+        self.assertEqual(batch_rows, rows)
+
+    def test_rows_match_on_aware_and_legacy_dates(self):
+        bookmarks = Page([
+            entities.Bookmark('id1', 'user', 'name', 'http://test.com',
+                              date_created='2017-01-02T10:00:00+02:00'),
+            entities.Bookmark('id2', 'user', 'name', 'http://test.com',
+                              date_created='2017-01-01T23:30:00-02:00'),
+            entities.Bookmark('id3', 'user', 'name', 'http://test.com',
+                              date_created='Jan 2, 2017 10:00'),
+        ])
+        self.presenter.present(BookmarkBatch.from_entities('user', bookmarks))
+        batch_rows = self.presenter.get_view_model().as_dicts()
+        self.presenter.present(
+            Page([bookmark_details.make_response_model(bm) for bm in bookmarks]))
+        rows = [vm.as_dict() for vm in self.presenter.get_view_model()]
+        self.assertEqual(batch_rows, rows)
+
+    def test_unknown_user_raises_exception(self):
+        with self.assertRaises(exceptions.UserNotFound):
+            self.usecase.list_bookmark_batch('unknown', self.presenter)
+
+
+class StreamBookmarksUseCaseTest(UseCaseTest):
+
+    def setUp(self):
+        super().setUp()
+        self.user = entities.User('user')
+        context.user_repo.save(self.user)
+        for day in range(1, 4):
+            context.bookmark_repo.save(entities.Bookmark(
+                'id{}'.format(day), self.user.id, 'name', 'http://test.com',
+                date_created=datetime(2017, 1, day)))
+
+        self.presenter_spy = PresenterSpy()
+        self.usecase = list_bookmarks.ListBookmarksUseCase()
+
+    def test_response_is_lazy(self):
+        with mock.patch.object(context.bookmark_repo, 'get_by_user') as get_by_user:
+            self.usecase.stream_bookmarks(self.user.id, self.presenter_spy)
+            get_by_user.assert_not_called()
+
+    def test_all_bookmarks_are_streamed(self):
+        self.usecase.stream_bookmarks(self.user.id, self.presenter_spy)
+        response = list(self.presenter_spy.response_model)
+        self.assertEqual([bm.bookmark_id for bm in response], ['id3', 'id2', 'id1'])
+        self.assertEqual(response[0].host, 'test.com')
+
+    def test_unknown_user_raises_exception(self):
+        with self.assertRaises(exceptions.UserNotFound):
+            self.usecase.stream_bookmarks('unknownuser', self.presenter_spy)
+
+
+class StreamBookmarksPresenterTest(TestCase):
+
+    def test_view_models_are_formatted_on_iteration(self):
+        dt = datetime(year=2017, month=1, day=1)
+        bookmark = entities.Bookmark('id1', 'user', 'test1', 'http://test.com', dt)
+        response = (list_bookmarks.make_response_model(bm) for bm in [bookmark])
+
+        presenter = list_bookmarks.StreamBookmarksPresenter()
+        presenter.present(response)
+        view_model = list(presenter.get_view_model())
+
+        self.assertEqual(len(view_model), 1)
+        self.assertEqual(view_model[0].bookmark_id, 'id1')
+        self.assertEqual(view_model[0].date_created_iso, dt.isoformat())